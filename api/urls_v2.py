@@ -9,6 +9,7 @@ import course.api.views
 import exercise.api.views
 import exercise.api.csv.views
 import external_services.api.views
+import threshold.api.views
 import authorization.api.views
 
 
@@ -51,6 +52,9 @@ with api.register(r'courses',
     courses.register(r'submissiondata',
                      exercise.api.csv.views.CourseSubmissionDataViewSet,
                      basename='course-submissiondata')
+    courses.register(r'submissionfiles',
+                     exercise.api.csv.views.CourseSubmissionFilesViewSet,
+                     basename='course-submissionfiles')
     courses.register(r'aggregatedata',
                      exercise.api.csv.views.CourseAggregateDataViewSet,
                      basename='course-aggregatedata')
@@ -66,6 +70,9 @@ with api.register(r'courses',
     courses.register(r'news',
                      course.api.views.CourseNewsViewSet,
                      basename='course-news')
+    courses.register(r'grades',
+                     threshold.api.views.CourseGradesViewSet,
+                     basename='course-grades')
 
 with api.register(r'exercises',
                   exercise.api.views.ExerciseViewSet,
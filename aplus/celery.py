@@ -14,6 +14,12 @@ app.autodiscover_tasks()
 def setup_periodic_tasks(sender, **kwargs):
     if hasattr(settings, 'SIS_ENROLL_SCHEDULE'):
         sender.add_periodic_task(settings.SIS_ENROLL_SCHEDULE, enroll.s(), name='enroll')
+    if hasattr(settings, 'CACHE_PREBUILD_SCHEDULE'):
+        sender.add_periodic_task(
+            settings.CACHE_PREBUILD_SCHEDULE,
+            sender.signature('exercise.tasks.prebuild_caches'),
+            name='prebuild_caches',
+        )
 
 @app.task
 def enroll():
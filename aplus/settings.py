@@ -97,6 +97,12 @@ EXCEL_CSV_DEFAULT_DELIMITER = ';'
 # Exercise loading settings
 EXERCISE_HTTP_TIMEOUT = 15
 EXERCISE_HTTP_RETRIES = (5,5,5)
+# Stream the submitted files to the grader instead of building the whole
+# multipart request body in memory.
+EXERCISE_HTTP_STREAM_FILES = True
+# Send the files that were uploaded in the same request to the grader from the
+# uploads instead of reading them back from the storage.
+EXERCISE_FORWARD_UPLOADS = True
 EXERCISE_ERROR_SUBJECT = """A+ exercise error in {course}: {exercise}"""
 EXERCISE_ERROR_DESCRIPTION = """
 As a course teacher or technical contact you were automatically emailed by A+ about the error incident. A student could not access or submit an exercise because the grading service used is offline or unable to produce valid response.
@@ -224,6 +230,26 @@ SOCIAL_AUTH_USERNAME_IS_FULL_EMAIL = True
 # SIS_ENROLL_SCHEDULE = crontab(hour=1, minute=0) -- every night at 1:00
 # If variable is not set, no automatic enrollment takes place
 
+# Set up schedule for prebuilding the cached points of students before
+# the submission feedback of exercises is revealed at a certain time.
+# The prebuilding starts CACHE_PREBUILD_AHEAD seconds before the reveal time
+# and generates at most CACHE_PREBUILD_RATE cache entries per second.
+# For example:
+# CACHE_PREBUILD_SCHEDULE = 60.0  -- every minute
+# If variable is not set, the cached points are generated on demand.
+CACHE_PREBUILD_AHEAD = 300
+CACHE_PREBUILD_RATE = 10
+
+# Views of learning objects that are stored in the display log:
+# 'all' stores every view, 'daily' the first view of a learning object by
+# a user in 24 hours, 'sampled' a random LEARNING_OBJECT_DISPLAY_SAMPLE_RATE
+# fraction of the views, and 'none' nothing. The last viewed learning object
+# of each user in each course is stored separately in any case.
+# Old views can be removed with the management command
+# prune_learning_object_displays.
+LEARNING_OBJECT_DISPLAY_LOG = 'all'
+LEARNING_OBJECT_DISPLAY_SAMPLE_RATE = 0.1
+
 ##########################################################################
 
 ## Celery
@@ -239,6 +265,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'course.roles.CourseRoleMiddleware',
     'lib.middleware.LocaleMiddleware',
     'social_django.middleware.SocialAuthExceptionMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -309,6 +336,20 @@ CACHES = {
         'OPTIONS': {'MAX_SIZE': 1000000}, # simulate memcached value limit
     }
 }
+# The compressed course content and points that are larger than this many
+# bytes are split into several cache keys. Keep it below the value limit.
+CACHE_CHUNK_SIZE = 900000
+# Metrics of the cached data are collected by CACHE_METRICS_SINK:
+# 'lib.cache.metrics.LocalSink' keeps them in each process, and
+# 'lib.cache.metrics.SharedSink' also publishes them to the cache every
+# CACHE_METRICS_FLUSH_INTERVAL seconds, so that the snapshot covers all
+# processes. None disables the metrics, because measuring the sizes of the
+# values serializes them once more. The metrics are served in the
+# Prometheus format at /metrics/cache/ to superusers and to requests with
+# the header "Authorization: Bearer <CACHE_METRICS_TOKEN>".
+CACHE_METRICS_SINK = None
+CACHE_METRICS_FLUSH_INTERVAL = 10
+CACHE_METRICS_TOKEN = None
 # The default SESSION_ENGINE is 'django.contrib.sessions.backends.db' (database)
 # Cache-based sessions require the Memcached cache backend.
 #SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
@@ -343,6 +384,15 @@ STATIC_ROOT = join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = join(BASE_DIR, 'media')
 
+# Submitted files are streamed by Django by default. The sending can be
+# offloaded to the web server instead:
+# FILE_SERVE_OFFLOAD = 'x-sendfile'  -- Apache mod_xsendfile, absolute path
+# FILE_SERVE_OFFLOAD = 'x-accel-redirect'  -- nginx, FILE_SERVE_ACCEL_PREFIX
+#   followed by the path relative to MEDIA_ROOT, which must be mapped to an
+#   internal location in nginx.
+FILE_SERVE_OFFLOAD = None
+FILE_SERVE_ACCEL_PREFIX = '/protected-media/'
+
 # Django REST Framework settings
 # http://www.django-rest-framework.org/api-guide/settings/
 REST_FRAMEWORK = {
@@ -364,7 +414,7 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_CONTENT_NEGOTIATION_CLASS': 'lib.api.core.APlusContentNegotiation',
     'DEFAULT_VERSIONING_CLASS': 'lib.api.core.APlusVersioning',
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'lib.api.pagination.APlusPagination',
     'PAGE_SIZE': 100,
     'DEFAULT_VERSION': '2',
     'ALLOWED_VERSIONS': {
@@ -18,6 +18,7 @@ import diploma.urls
 import apps.urls
 import api.urls_v2
 import redirect_old_urls.urls
+import lib.cache.views
 
 
 admin.autodiscover()
@@ -46,6 +47,7 @@ urlpatterns = [
     url(r'^', include(notification.urls)),
     url(r'^', include(exercise.urls)),
     url(r'^', include(course.urls)),
+    path('metrics/cache/', lib.cache.views.cache_metrics, name='cache-metrics'),
     path('sitemap.xml', sitemap, { 'sitemaps': all_sitemaps },
         name='django.contrib.sitemaps.views.sitemap'),
 ]
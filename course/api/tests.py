@@ -1,7 +1,10 @@
+from unittest.mock import patch
+
 from django.contrib.auth.models import User
 from django.test import TestCase
 from rest_framework.test import APIClient
 from course.models import CourseInstance
+from lib.api.pagination import KeysetPagination
 
 class CourseInstanceAPITest(TestCase):
     # use same setUp as for normal tests
@@ -144,3 +147,36 @@ class CourseInstanceAPITest(TestCase):
         t = map(lambda x: x.user.username, course.teachers)
         self.assertIn('staff', t)
         self.assertIn('newteacher', t)
+
+    def test_students_cursor_pagination(self):
+        instance = self.current_course_instance
+        users = [self.user, self.user1, self.user2]
+        for user in users:
+            instance.enroll_student(user)
+        url = '/api/v2/courses/{}/students/'.format(instance.id)
+        client = APIClient()
+        client.force_authenticate(user=self.superuser)
+
+        # The page number mode is the default.
+        response = client.get(url)
+        self.assertEqual(response.data['count'], 3)
+
+        with patch.object(KeysetPagination, 'page_size', 2):
+            response = client.get(url, {'pagination': 'cursor'})
+            self.assertNotIn('count', response.data)
+            self.assertIsNone(response.data['previous'])
+            usernames = [s['username'] for s in response.data['results']]
+            response = client.get(response.data['next'])
+            self.assertIsNone(response.data['next'])
+            usernames.extend(s['username'] for s in response.data['results'])
+            self.assertEqual(usernames, [u.username for u in users])
+
+            response = client.get(url, {'pagination': 'cursor', 'ordering': '-id', 'count': 'true'})
+            self.assertEqual(response.data['count'], 3)
+            self.assertEqual(
+                [s['username'] for s in response.data['results']],
+                [self.user2.username, self.user1.username],
+            )
+
+        response = client.get(url, {'pagination': 'cursor', 'ordering': 'email'})
+        self.assertEqual(response.status_code, 400)
@@ -254,6 +254,14 @@ class CourseStudentsViewSet(NestedViewSetMixin,
     `GET /courses/<course_id>/students/`:
         returns a list of all students.
 
+    - URL parameters:
+        - `pagination`: `cursor` to page with cursors instead of page
+            numbers. Deep pages are faster to fetch, and the results are not
+            counted unless `count` is `true`. The `next` and `previous`
+            links contain the cursor.
+        - `ordering`: the order of the results in the cursor pagination,
+            one of `id`. Prefix with `-` for the descending order.
+
     `GET /courses/<course_id>/students/<user_id>/`:
         returns the details of a specific student.
 
@@ -281,6 +289,7 @@ class CourseStudentsViewSet(NestedViewSetMixin,
     lookup_url_kwarg = 'user_id'
     lookup_value_regex = REGEX_INT_ME
     serializer_class = StudentBriefSerializer
+    cursor_orderings = {'id': ('id',)}
 
     def get_queryset(self):
         return self.instance.students
@@ -398,6 +407,14 @@ class CourseUsertaggingsViewSet(NestedViewSetMixin,
     `GET /courses/<course_id>/taggings/`:
         returns a list of all student taggings.
 
+    - URL parameters:
+        - `pagination`: `cursor` to page with cursors instead of page
+            numbers. Deep pages are faster to fetch, and the results are not
+            counted unless `count` is `true`. The `next` and `previous`
+            links contain the cursor.
+        - `ordering`: the order of the results in the cursor pagination,
+            one of `id`. Prefix with `-` for the descending order.
+
     `GET /courses/<course_id>/taggings/<usertag_id>/`:
         returns the details of a specific student tagging.
 
@@ -441,6 +458,7 @@ class CourseUsertaggingsViewSet(NestedViewSetMixin,
         .all()
     )
     parent_lookup_map = {'course_id': 'course_instance_id'}
+    cursor_orderings = {'id': ('id',)}
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -1,9 +1,8 @@
 from django.db.models.signals import post_save, post_delete, m2m_changed
-from django.utils import timezone
 
 from lib.cache import CachedAbstract
-from ..models import StudentGroup, Enrollment, CourseInstance, Course
-from ..renders import render_group_info
+from ..models import StudentGroup, Enrollment, CourseInstance
+from ..renders import render_cached_group_info, render_group_info
 
 
 class CachedTopMenu(CachedAbstract):
@@ -13,6 +12,12 @@ class CachedTopMenu(CachedAbstract):
         self.user = user
         super().__init__(user)
 
+    def _needs_generation(self, data):
+        # Entries of older versions stored the rendered group info.
+        return data is None or any(
+            not isinstance(entry, dict) for entry in data['groups'].values()
+        )
+
     def _generate_data(self, user, data=None):
         profile = user.userprofile if user and user.is_authenticated else None
         return {
@@ -35,16 +40,16 @@ class CachedTopMenu(CachedAbstract):
             }
 
         enrolled = []
-        for instance in CourseInstance.objects.get_enrolled(profile).all():
+        for instance in CourseInstance.objects.get_enrolled(profile).select_related('course'):
             if instance.visible_to_students:
                enrolled.append(course_entry(instance))
 
         teaching = []
-        for instance in CourseInstance.objects.get_teaching(profile).all():
+        for instance in CourseInstance.objects.get_teaching(profile).select_related('course'):
             teaching.append(course_entry(instance))
 
         assisting = []
-        for instance in CourseInstance.objects.get_assisting(profile).all():
+        for instance in CourseInstance.objects.get_assisting(profile).select_related('course'):
             assisting.append(course_entry(instance))
 
         courses = []
@@ -61,35 +66,47 @@ class CachedTopMenu(CachedAbstract):
         if not profile:
             return {}
 
-        def group_entry(group):
-            return {
-                'id': group.id,
-                'size': group.members.count(),
-                'collaborators': group.collaborator_names(profile),
+        # The enrollments, groups and members are fetched with three queries
+        # regardless of the number of courses. The group info of the selected
+        # group is rendered in groups() only for the course being viewed.
+        group_map = {
+            instance_id: {
+                'groups': [],
+                'selected': selected_group_id,
             }
-
-        group_map = {}
-        for enrollment in Enrollment.objects\
+            for instance_id, selected_group_id in Enrollment.objects
                 .filter(user_profile=profile,
-                    status=Enrollment.ENROLLMENT_STATUS.ACTIVE)\
-                .select_related('selected_group')\
-                .prefetch_related('selected_group__members'):
-            instance_id = enrollment.course_instance_id
-            group_map[instance_id] = (
-                [
-                    group_entry(g) for g in profile.groups\
-                        .filter(course_instance_id=instance_id)\
-                        .prefetch_related('members')
-                ],
-                render_group_info(enrollment.selected_group, profile)
-            )
+                    status=Enrollment.ENROLLMENT_STATUS.ACTIVE)
+                .values_list('course_instance_id', 'selected_group_id')
+        }
+        # The members of the groups are prefetched by the default manager.
+        for group in StudentGroup.objects.filter(
+                members=profile, course_instance_id__in=list(group_map)):
+            members = list(group.members.all())
+            group_map[group.course_instance_id]['groups'].append({
+                'id': group.id,
+                'size': len(members),
+                'collaborators': StudentGroup.format_collaborator_names(members, profile),
+                'avatars': [p.avatar_url for p in members],
+            })
         return group_map
 
     def courses(self):
         return self.data['courses']
 
     def groups(self, instance):
-        return self.data['groups'].get(instance.id, ([],None))
+        entry = self.data['groups'].get(instance.id)
+        if not entry or not entry['groups']:
+            return ([], None)
+        selected_id = entry['selected']
+        for group in entry['groups']:
+            if group['id'] == selected_id:
+                return (entry['groups'], render_cached_group_info(group))
+        if selected_id is None:
+            return (entry['groups'], render_cached_group_info(None))
+        # The selected group should be one of the groups of the user.
+        selected = StudentGroup.objects.filter(id=selected_id).first()
+        return (entry['groups'], render_group_info(selected, self.user.userprofile))
 
 
 def invalidate_content(sender, instance, **kwargs):
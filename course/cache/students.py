@@ -1,3 +1,5 @@
+from time import time
+
 from django.contrib.auth import get_user_model
 from django.db.models.signals import post_save, post_delete
 from django.urls import reverse
@@ -14,6 +16,8 @@ from ..models import (
 
 class CachedStudent(CachedAbstract):
     KEY_PREFIX = "student"
+    # Tag changes invalidate the entries of all students in the course instance
+    GENERATION_SCOPE = 1
 
     def __init__(self, course_instance, user):
         super().__init__(course_instance, user)
@@ -25,10 +29,48 @@ class CachedStudent(CachedAbstract):
             user = User.objects.get(id=user)
         tags = (UserTagging.objects.get_all(user.userprofile, course_instance)
                 if user else [])
+        return self._tags_data(tags)
+
+    @staticmethod
+    def _tags_data(tags):
         return {
             'tag_slugs': [t.slug for t in tags],
         }
 
+    @classmethod
+    def get_many(cls, course_instance, profiles):
+        """
+        Returns the cached data of the given students of the course instance
+        as a dict keyed by the user id. The cache is read with one round trip,
+        and the data of the students that were not cached is generated with
+        one query and stored in the cache.
+        """
+        keys = {
+            cls._key(course_instance, profile.user, modifiers=[]): profile
+            for profile in profiles
+        }
+        found, missing = cls.get_many_cached(
+            keys.keys(),
+            generation_key=cls._generation_key(course_instance),
+        )
+        result = {keys[key].user.id: data for key, data in found.items()}
+        if not missing:
+            return result
+
+        gen_start = time()
+        # The taggings of the whole course are fetched instead of filtering
+        # by the possibly thousands of missing students.
+        taggings = {}
+        for tagging in UserTagging.objects.filter(course_instance=course_instance).select_related('tag'):
+            taggings.setdefault(tagging.user_id, []).append(tagging)
+        for key in missing:
+            profile = keys[key]
+            profile.instance_taggings = taggings.get(profile.id, [])
+            data = cls._tags_data(UserTagging.objects.get_all(profile, course_instance))
+            cls.add_generated(key, gen_start, data)
+            result[profile.user.id] = data
+        return result
+
 
 def invalidate_student(sender, instance: UserTagging, **kwargs):
     CachedStudent.invalidate(
@@ -40,11 +82,7 @@ post_delete.connect(invalidate_student, sender=UserTagging)
 
 
 def invalidate_students(sender, instance: UserTag, **kwargs):
-    course = instance.course_instance
-    for student in course.students.all():
-        CachedStudent.invalidate(
-            course,
-            student.user)
+    CachedStudent.invalidate_generation(instance.course_instance)
 
 post_save.connect(invalidate_students, sender=UserTag)
 post_delete.connect(invalidate_students, sender=UserTag)
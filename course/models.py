@@ -16,7 +16,7 @@ from django.core.exceptions import ValidationError
 from django.urls import reverse
 from django.db import models
 from django.db.models import F, Q, Count
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.utils import timezone
 from django.utils.functional import cached_property
 from django.utils.text import format_lazy
@@ -41,6 +41,7 @@ from lib.models import UrlMixin
 from lib.typing import AnyUser
 from lib.validators import generate_url_key_validator
 from userprofile.models import User, UserProfile, GraderUser
+from .roles import CourseRoleContext
 
 logger = logging.getLogger('aplus.course')
 
@@ -283,9 +284,14 @@ def pseudonymize(sender, instance, created, **kwargs):
         instance.anon_name = codename
         instance.save(update_fields=['anon_name'])
 
+def invalidate_course_roles(sender, instance, **kwargs):
+    CourseRoleContext.invalidate_enrollment(instance.course_instance_id, instance.user_profile_id)
+
 post_save.connect(create_enrollment_code, sender=Enrollment)
 post_save.connect(create_anon_id, sender=Enrollment)
 post_save.connect(pseudonymize, sender=Enrollment)
+post_save.connect(invalidate_course_roles, sender=Enrollment)
+post_delete.connect(invalidate_course_roles, sender=Enrollment)
 
 
 class UserTag(UrlMixin, ColorTag):
@@ -782,12 +788,20 @@ class CourseInstance(UrlMixin, models.Model):
         if self.image:
             resize_image(self.image.path, (800,600))
 
+    def _has_enrollment(self, user, role, status=Enrollment.ENROLLMENT_STATUS.ACTIVE):
+        enrollment = self.get_enrollment_for(user)
+        return (
+            enrollment is not None and
+            enrollment.role == role and
+            enrollment.status == status
+        )
+
     def is_assistant(self, user):
         return (
             user and
             user.is_authenticated and
             isinstance(user, User) and
-            self.assistants.filter(id=user.userprofile.id).exists()
+            self._has_enrollment(user, Enrollment.ENROLLMENT_ROLE.ASSISTANT)
         )
 
     def is_teacher(self, user):
@@ -796,7 +810,7 @@ class CourseInstance(UrlMixin, models.Model):
             user.is_authenticated and (
                 user.is_superuser or (
                     isinstance(user, User) and
-                    self.teachers.filter(id=user.userprofile.id).exists()
+                    self._has_enrollment(user, Enrollment.ENROLLMENT_ROLE.TEACHER)
                 ) or (
                     isinstance(user, GraderUser) and
                     (Permission.WRITE, self.course) in user.permissions.courses
@@ -812,7 +826,7 @@ class CourseInstance(UrlMixin, models.Model):
             user and
             user.is_authenticated and
             isinstance(user, User) and
-            self.students.filter(id=user.userprofile.id).exists()
+            self._has_enrollment(user, Enrollment.ENROLLMENT_ROLE.STUDENT)
         )
 
     def is_banned(self, user):
@@ -820,10 +834,11 @@ class CourseInstance(UrlMixin, models.Model):
             user and
             user.is_authenticated and
             isinstance(user, User) and
-            self.all_students.filter(
-                enrollment__status=Enrollment.ENROLLMENT_STATUS.BANNED,
-                id=user.userprofile.id,
-            ).exists()
+            self._has_enrollment(
+                user,
+                Enrollment.ENROLLMENT_ROLE.STUDENT,
+                Enrollment.ENROLLMENT_STATUS.BANNED,
+            )
         )
 
     def is_enrollable(self, user):
@@ -883,6 +898,7 @@ class CourseInstance(UrlMixin, models.Model):
         -------
         Number of students enrolled based on this call. -1 if there was problem accessing SIS.
         """
+        from exercise.cache.stats import CachedSubmitterStats
         from .sis import get_sis_configuration, StudentInfoSystem
         from .cache.menu import invalidate_content
 
@@ -917,6 +933,9 @@ class CourseInstance(UrlMixin, models.Model):
         qs.update(status=Enrollment.ENROLLMENT_STATUS.REMOVED)
         for e in qs:
             invalidate_content(Enrollment, e)
+            invalidate_course_roles(Enrollment, e)
+        # The bulk update does not send signals that would update the counts.
+        CachedSubmitterStats.invalidate(self)
 
         logger.info(f"{self}: enrolled {count} students from SIS")
         return count
@@ -968,10 +987,20 @@ class CourseInstance(UrlMixin, models.Model):
         UserTagging.objects.create(tag=tag, user=user.userprofile, course_instance=self)
 
     def get_enrollment_for(self, user):
-        try:
-            return Enrollment.objects.get(course_instance=self, user_profile=user.userprofile)
-        except Enrollment.DoesNotExist:
-            return None
+        """
+        Returns the enrollment of the user or None. The enrollment is memoized
+        for the rest of the request, if there is an active CourseRoleContext.
+        """
+        profile = user.userprofile
+        def load():
+            try:
+                return Enrollment.objects.get(course_instance=self, user_profile=profile)
+            except Enrollment.DoesNotExist:
+                return None
+        context = CourseRoleContext.current()
+        if context is None:
+            return load()
+        return context.get_enrollment(self.id, profile.id, load)
 
     def get_user_tags(self, user):
         return self.taggings.filter(user=user.uesrprofile).select_related('tag')
@@ -17,6 +17,7 @@ from authorization.permissions import (
 from exercise.cache.points import CachedPoints
 from exercise.models import BaseExercise
 from exercise.submission_models import Submission
+from threshold.models import are_requirements_passed
 from userprofile.models import GraderUser, UserProfile
 from .models import (
     Course,
@@ -257,9 +258,10 @@ class CourseModulePermissionBase(MessageMixin, Permission):
             )
             return False
 
-        if module.requirements.exists():
+        entry = view.content.find(module)[0]
+        if entry['requirement_checks']:
             points = CachedPoints(module.course_instance, request.user, view.content, view.is_course_staff)
-            return module.are_requirements_passed(points)
+            return are_requirements_passed(entry['requirement_checks'], points)
         return True
 
 CourseModulePermission = CourseModulePermissionBase | JWTInstanceReadPermission
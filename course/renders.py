@@ -21,3 +21,17 @@ def group_info_context(group, profile):
 def render_group_info(group, profile):
     template = loader.get_template("course/_group_info.html")
     return template.render(group_info_context(group, profile))
+
+
+def render_cached_group_info(group):
+    """
+    Renders the group info of a group entry of the cached top menu.
+    """
+    template = loader.get_template("course/_group_info.html")
+    if not group:
+        return template.render({ 'id': None })
+    return template.render({
+        'id': group['id'],
+        'collaborators': group['collaborators'],
+        'avatars': render_avatars({ 'avatar_url': url } for url in group['avatars']),
+    })
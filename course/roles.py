@@ -0,0 +1,81 @@
+"""
+Request-scoped memoization of the enrollments of users in course instances.
+
+The enrollment of a user decides their role in a course instance, and the
+roles are checked many times during one request: in the view mixins, in the
+permission classes, in the templates and in the models. CourseRoleMiddleware
+attaches a CourseRoleContext to each request so that the enrollment of a user
+is queried only once per course instance and request. The `CourseInstance`
+role helpers, e.g. `is_student` and `is_course_staff`, read the memoized
+enrollments when a context is active. Outside of requests, e.g. in management
+commands, every lookup queries the database as before.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Callable, Dict, Iterator, Optional, Tuple
+
+from django.http.request import HttpRequest
+from django.http.response import HttpResponseBase
+
+if TYPE_CHECKING:
+    from .models import Enrollment
+
+
+_current_context: ContextVar[Optional['CourseRoleContext']] = ContextVar('course_role_context', default=None)
+
+
+class CourseRoleContext(object):
+    """
+    Memoized enrollments of users, keyed by the course instance id and the
+    user profile id. A missing enrollment is memoized as None.
+    """
+    def __init__(self) -> None:
+        self.enrollments: Dict[Tuple[int, int], Optional['Enrollment']] = {}
+
+    @classmethod
+    def current(cls) -> Optional['CourseRoleContext']:
+        return _current_context.get()
+
+    @classmethod
+    def invalidate_enrollment(cls, instance_id: int, profile_id: int) -> None:
+        """
+        Forgets the memoized enrollment in the active context, if any. Called
+        whenever an enrollment is saved or deleted.
+        """
+        context = cls.current()
+        if context is not None:
+            context.enrollments.pop((instance_id, profile_id), None)
+
+    @contextmanager
+    def activate(self) -> Iterator['CourseRoleContext']:
+        token = _current_context.set(self)
+        try:
+            yield self
+        finally:
+            _current_context.reset(token)
+
+    def get_enrollment(
+            self,
+            instance_id: int,
+            profile_id: int,
+            load: Callable[[], Optional['Enrollment']],
+            ) -> Optional['Enrollment']:
+        key = (instance_id, profile_id)
+        if key not in self.enrollments:
+            self.enrollments[key] = load()
+        return self.enrollments[key]
+
+
+class CourseRoleMiddleware(object):
+    """
+    Activates a new CourseRoleContext for each request. The context is also
+    available as `request.course_roles`.
+    """
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponseBase]) -> None:
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponseBase:
+        context = CourseRoleContext()
+        request.course_roles = context
+        with context.activate():
+            return self.get_response(request)
@@ -60,11 +60,12 @@ class ParticipantsView(CourseInstanceBaseView):
             for k in Enrollment.ENROLLMENT_STATUS.keys()
         }
 
-        participants = ci.all_students.prefetch_tags(ci)
+        participants = list(ci.all_students)
+        student_tags = CachedStudent.get_many(ci, participants)
         data = []
         for participant in participants:
             user_id = participant.user.id
-            user_tags = CachedStudent(ci, participant.user).data
+            user_tags = student_tags[user_id]
             user_tags_html = ' '.join(tags[slug].html_label for slug in user_tags['tag_slugs'] if slug in tags)
             data.append({
                 'id': participant.student_id or '',
@@ -1,14 +1,18 @@
 from datetime import timedelta
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.conf import settings
 from django.urls import reverse
 from django.test import TestCase, override_settings
 from django.test.client import Client
 from django.utils import timezone
 
+from course.cache.menu import CachedTopMenu
+from course.cache.students import CachedStudent
 from course.models import Course, CourseInstance, CourseHook, CourseModule, \
-    LearningObjectCategory, StudentGroup
+    Enrollment, LearningObjectCategory, StudentGroup, UserTag, UserTagging
+from course.roles import CourseRoleContext
 from exercise.models import BaseExercise, Submission
 from exercise.exercise_models import LearningObject
 
@@ -208,6 +212,61 @@ class CourseTest(TestCase):
         self.assertFalse(self.current_course_instance.is_course_staff(self.user))
         self.assertEqual(0, len(self.current_course_instance.get_course_staff_profiles()))
 
+    def test_course_roles_memoized_in_context(self):
+        instance = self.current_course_instance
+        user = User.objects.get(id=self.user.id)
+        profile = user.userprofile
+        with CourseRoleContext().activate():
+            with self.assertNumQueries(1):
+                self.assertIsNone(instance.get_enrollment_for(user))
+                self.assertFalse(instance.is_student(user))
+                self.assertFalse(instance.is_assistant(user))
+                self.assertFalse(instance.is_teacher(user))
+                self.assertFalse(instance.is_course_staff(user))
+                self.assertFalse(instance.is_banned(user))
+
+            # Enrolling and unenrolling invalidate the memoized enrollment.
+            instance.enroll_student(user)
+            self.assertTrue(instance.is_student(user))
+            self.assertFalse(instance.is_course_staff(user))
+            enrollment = Enrollment.objects.get(course_instance=instance, user_profile=profile)
+            enrollment.status = Enrollment.ENROLLMENT_STATUS.REMOVED
+            enrollment.save()
+            self.assertFalse(instance.is_student(user))
+            instance.add_assistant(profile)
+            self.assertTrue(instance.is_assistant(user))
+            self.assertTrue(instance.is_course_staff(user))
+            enrollment.delete()
+            self.assertIsNone(instance.get_enrollment_for(user))
+            self.assertFalse(instance.is_course_staff(user))
+
+        # Without an active context, the enrollment is queried every time.
+        with self.assertNumQueries(2):
+            instance.is_student(user)
+            instance.is_assistant(user)
+
+    def test_cached_student_get_many(self):
+        cache.clear()
+        instance = self.current_course_instance
+        tag = UserTag.objects.create(course_instance=instance, name="tag")
+        UserTagging.objects.create(tag=tag, user=self.user1.userprofile, course_instance=instance)
+        profiles = [self.user1.userprofile, self.user2.userprofile]
+
+        # The missing entries are generated with one query.
+        with self.assertNumQueries(1):
+            tags = CachedStudent.get_many(instance, profiles)
+        self.assertEqual(tags[self.user1.id]['tag_slugs'], ['user-internal', tag.slug])
+        self.assertEqual(tags[self.user2.id]['tag_slugs'], ['user-internal'])
+
+        # The generated entries were cached.
+        with self.assertNumQueries(0):
+            self.assertEqual(CachedStudent.get_many(instance, profiles), tags)
+            self.assertEqual(CachedStudent(instance, self.user1).data, tags[self.user1.id])
+
+        UserTagging.objects.create(tag=tag, user=self.user2.userprofile, course_instance=instance)
+        tags = CachedStudent.get_many(instance, profiles)
+        self.assertEqual(tags[self.user2.id]['tag_slugs'], ['user-internal', tag.slug])
+
     def test_course_instance_submitters(self):
         students = self.current_course_instance.get_submitted_profiles()
         self.assertEqual(1, len(students))
@@ -373,6 +432,48 @@ class CourseTest(TestCase):
         self.assertEqual(StudentGroup.get_exact(self.current_course_instance,
             [self.user.userprofile,self.superuser.userprofile]), None)
 
+    def test_top_menu_groups(self):
+        self.user1.first_name = "Teemu"
+        self.user1.last_name = "Teekkari"
+        self.user1.save()
+        profile = self.user.userprofile
+        instances = [
+            self.past_course_instance,
+            self.current_course_instance,
+            self.future_course_instance,
+        ]
+        for instance in instances:
+            instance.enroll_student(self.user)
+            group = StudentGroup.objects.create(course_instance=instance)
+            group.members.add(profile, self.user1.userprofile)
+        selected = StudentGroup.objects.get(course_instance=self.current_course_instance)
+        Enrollment.objects.filter(course_instance=self.current_course_instance, user_profile=profile)\
+            .update(selected_group=selected)
+
+        # The number of queries does not depend on the number of courses.
+        cache.clear()
+        user = User.objects.select_related('userprofile').get(id=self.user.id)
+        with self.assertNumQueries(6):
+            menu = CachedTopMenu(user)
+        self.assertEqual(len(menu.courses()), 3)
+
+        with self.assertNumQueries(0):
+            groups, info = menu.groups(self.current_course_instance)
+        self.assertEqual(groups, [{
+            'id': selected.id,
+            'size': 2,
+            'collaborators': "Teemu Teekkari",
+            'avatars': [p.avatar_url for p in selected.members.all()],
+        }])
+        self.assertIn('data-group-id="{}"'.format(selected.id), info)
+        self.assertIn("Teemu Teekkari", info)
+        self.assertIn(self.user1.userprofile.avatar_url, info)
+
+        groups, info = menu.groups(self.past_course_instance)
+        self.assertEqual(len(groups), 1)
+        self.assertIn('data-group-id="0"', info)
+        self.assertEqual(menu.groups(self.hidden_course_instance), ([], None))
+
     def test_student_enroll(self):
         self.assertFalse(self.current_course_instance.is_student(self.user1))
         self.assertFalse(self.current_course_instance.is_student(self.user2))
@@ -1,5 +1,5 @@
 from datetime import datetime, timedelta
-from typing import TYPE_CHECKING, Any, Dict, Generic, Iterable, Optional, TypeVar, Union
+from typing import TYPE_CHECKING, Any, Dict, Generic, Iterable, Optional, Tuple, TypeVar, Union
 
 from django.db import models
 from django.utils.translation import gettext_lazy as _
@@ -101,6 +101,10 @@ class SubmissionRuleDeviation(UrlMixin, models.Model):
         null=True,
     )
 
+    # Names of the fields that must be equal for two deviations to be
+    # groupable. See `is_groupable`.
+    groupable_fields: Tuple[str, ...] = ()
+
     if TYPE_CHECKING:
         id: models.AutoField
 
@@ -124,7 +128,10 @@ class SubmissionRuleDeviation(UrlMixin, models.Model):
         """
         Whether this deviation can be grouped with another deviation in tables.
         """
-        raise NotImplementedError()
+        return all(
+            getattr(self, field) == getattr(other, field)
+            for field in self.groupable_fields
+        )
 
     @classmethod
     def get_list_url(cls, instance: CourseInstance) -> str:
@@ -156,6 +163,8 @@ class DeadlineRuleDeviation(SubmissionRuleDeviation):
 
     objects = DeadlineRuleDeviationManager()
 
+    groupable_fields = ('extra_minutes', 'without_late_penalty')
+
     class Meta(SubmissionRuleDeviation.Meta):
         verbose_name = _('MODEL_NAME_DEADLINE_RULE_DEVIATION')
         verbose_name_plural = _('MODEL_NAME_DEADLINE_RULE_DEVIATION_PLURAL')
@@ -188,12 +197,6 @@ class DeadlineRuleDeviation(SubmissionRuleDeviation):
         self.extra_minutes = minutes
         self.without_late_penalty = bool(form_data.get('without_late_penalty'))
 
-    def is_groupable(self, other: 'DeadlineRuleDeviation') -> bool:
-        return (
-            self.extra_minutes == other.extra_minutes
-            and self.without_late_penalty == other.without_late_penalty
-        )
-
     @classmethod
     def get_list_url(cls, instance: CourseInstance) -> str:
         return instance.get_url('deviations-list-dl')
@@ -214,6 +217,8 @@ class MaxSubmissionsRuleDeviation(SubmissionRuleDeviation):
 
     objects = MaxSubmissionsRuleDeviationManager()
 
+    groupable_fields = ('extra_submissions',)
+
     class Meta(SubmissionRuleDeviation.Meta):
         verbose_name = _('MODEL_NAME_MAX_SUBMISSIONS_RULE_DEVIATION')
         verbose_name_plural = _('MODEL_NAME_MAX_SUBMISSIONS_RULE_DEVIATION_PLURAL')
@@ -221,9 +226,6 @@ class MaxSubmissionsRuleDeviation(SubmissionRuleDeviation):
     def update_by_form(self, form_data: Dict[str, Any]) -> None:
         self.extra_submissions = int(form_data['extra_submissions'])
 
-    def is_groupable(self, other: 'MaxSubmissionsRuleDeviation') -> bool:
-        return self.extra_submissions == other.extra_submissions
-
     @classmethod
     def get_list_url(cls, instance: CourseInstance) -> str:
         return instance.get_url('deviations-list-submissions')
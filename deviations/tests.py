@@ -1,4 +1,5 @@
 from datetime import timedelta
+from unittest.mock import patch
 
 from django.test import TestCase
 from django.test.client import Client
@@ -17,7 +18,8 @@ from exercise.models import ExerciseWithAttachment, Submission
 from userprofile.models import User
 
 from .models import DeadlineRuleDeviation, MaxSubmissionsRuleDeviation
-from .viewbase import get_deviation_groups
+from .viewbase import get_deviation_group_rows, get_deviation_groups
+from .views import ListDeadlinesView
 
 
 class DeviationsTest(TestCase):
@@ -367,6 +369,57 @@ class DeviationsTest(TestCase):
         self.deadline_rule_deviation_u2_e1.save()
         extra_exercise.delete()
 
+    def test_get_deviation_group_rows(self):
+        rows = get_deviation_group_rows(DeadlineRuleDeviation.objects.all())
+        self.assertEqual(rows, [
+            (
+                [self.deadline_rule_deviation_u1_e1.id, self.deadline_rule_deviation_u1_e2.id],
+                False,
+                None,
+            ),
+            ([self.deadline_rule_deviation_u2_e1.id], False, None),
+        ])
+
+        self.deadline_rule_deviation_u1_e2.extra_minutes = 1440
+        self.deadline_rule_deviation_u1_e2.save()
+        rows = get_deviation_group_rows(DeadlineRuleDeviation.objects.all())
+        ids, can_group, group_id = rows[0]
+        self.assertTrue(can_group)
+        self.assertEqual(group_id, f'{self.user.userprofile.id}.{self.course_module.id}')
+
+        # The loaded deviations match the rows and their relations are
+        # loaded with them.
+        groups = get_deviation_groups(DeadlineRuleDeviation.objects.all())
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [[d.id for d in deviations] for deviations, _, _ in groups],
+                [ids for ids, _, _ in rows],
+            )
+            self.assertEqual(groups[0][0][0].submitter.user, self.user)
+
+        self.deadline_rule_deviation_u1_e2.extra_minutes = 2880
+        self.deadline_rule_deviation_u1_e2.save()
+
+    def test_list_deadline_deviations_pagination(self):
+        self.client.login(username="staff", password="staffPassword")
+        list_deadline_deviations_url = self.course_instance.get_url("deviations-list-dl")
+
+        with patch.object(ListDeadlinesView, 'groups_per_page', 1):
+            response = self.client.get(list_deadline_deviations_url)
+            self.assertEqual(response.status_code, 200)
+            groups = response.context['deviation_groups']
+            self.assertEqual(len(groups), 1)
+            self.assertEqual(groups[0][0][0], self.deadline_rule_deviation_u1_e1)
+            self.assertEqual(response.context['page_obj'].paginator.num_pages, 2)
+
+            response = self.client.get(list_deadline_deviations_url + '?page=2')
+            groups = response.context['deviation_groups']
+            self.assertEqual(len(groups), 1)
+            self.assertEqual(groups[0][0], [self.deadline_rule_deviation_u2_e1])
+
+        response = self.client.get(list_deadline_deviations_url)
+        self.assertEqual(len(response.context['deviation_groups']), 2)
+
     def test_add_deadline_deviations(self):
         self.client.login(username="staff", password="staffPassword")
         list_deadline_deviations_url = self.course_instance.get_url("deviations-list-dl")
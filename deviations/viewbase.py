@@ -1,6 +1,7 @@
 from itertools import groupby
 from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
 
+from django.core.paginator import Paginator
 from django.db import models
 from django.http import HttpRequest, HttpResponse
 from django.contrib import messages
@@ -21,14 +22,21 @@ from userprofile.models import UserProfile
 class ListDeviationsView(CourseInstanceBaseView):
     access_mode = ACCESS.TEACHER
     deviation_model: Type[SubmissionRuleDeviation]
+    # Number of deviation groups (user and module pairs) shown on one page.
+    groups_per_page = 500
 
     def get_common_objects(self) -> None:
         super().get_common_objects()
         all_deviations = self.deviation_model.objects.filter(
             exercise__course_module__course_instance=self.instance
         )
-        self.deviation_groups = get_deviation_groups(all_deviations)
-        self.note("deviation_groups")
+        paginator = Paginator(get_deviation_group_rows(all_deviations), self.groups_per_page)
+        self.page_obj = paginator.get_page(self.request.GET.get('page'))
+        self.deviation_groups = load_deviation_groups(
+            self.deviation_model,
+            self.page_obj.object_list,
+        )
+        self.note("deviation_groups", "page_obj")
 
 
 class AddDeviationsView(CourseInstanceMixin, BaseFormView):
@@ -208,22 +216,28 @@ class RemoveDeviationsView(CourseInstanceMixin, BaseFormView):
         return super().form_valid(form)
 
 
-def get_deviation_groups(
+DeviationGroupRow = Tuple[List[int], bool, Optional[str]]
+
+
+def get_deviation_group_rows(
         all_deviations: models.QuerySet[SubmissionRuleDeviation],
-        ) -> Iterable[Tuple[List[SubmissionRuleDeviation], bool, Optional[str]]]:
+        ) -> List[DeviationGroupRow]:
     """
-    Group the deviations by user and module.
+    Group the deviations by user and module without loading model instances.
 
-    Grouping condition: deviations can be grouped if the user has been
-    granted the same deviation (based on the `is_equal` method) for all
-    exercises in the module.
+    The grouping is computed from a `values_list` projection that contains
+    only the ids and the fields listed in the model's `groupable_fields`.
+    The returned rows are lightweight tuples that can be paginated cheaply
+    and then passed to `load_deviation_groups`.
 
     The returned tuples contain the following values:
-    1. List of deviations with the same user and module.
+    1. List of deviation ids with the same user and module.
     2. Boolean representing whether the deviations in the list can be
     displayed as a group (i.e. the grouping condition is satisfied).
     3. An id that uniquely identifies the group of deviations.
     """
+    groupable_fields = all_deviations.model.groupable_fields
+
     # Find the number of exercises in each module.
     course_instances = all_deviations.values_list('exercise__course_module__course_instance', flat=True)
     exercise_counts = (
@@ -236,45 +250,86 @@ def get_deviation_groups(
     )
     exercise_count_by_module = {row['course_module_id']: row['count'] for row in exercise_counts}
 
-    ordered_deviations = (
+    rows = (
         all_deviations
-        .select_related(
-            'submitter', 'submitter__user',
-            'granter', 'granter__user',
-            'exercise', 'exercise__course_module',
-        )
-        # parent is prefetched because there may be multiple ancestors, and
-        # they are needed for building the deviation's URL.
-        .prefetch_related('exercise__parent')
         .order_by('submitter', 'exercise__course_module')
+        .values_list(
+            'id',
+            'submitter_id',
+            'exercise__course_module_id',
+            'exercise_id',
+            *groupable_fields,
+        )
     )
 
-    deviation_groups = groupby(
-        ordered_deviations,
-        lambda obj: (obj.submitter, obj.exercise.course_module),
-    )
-    for (submitter, module), deviations_iter in deviation_groups:
-        deviations = list(deviations_iter)
-        can_group = True
-        if len(deviations) < 2:
+    groups = []
+    for (submitter_id, module_id), group_iter in groupby(rows, lambda row: (row[1], row[2])):
+        group = list(group_iter)
+        ids = [row[0] for row in group]
+        can_group = (
             # Group must have at least 2 deviations.
-            can_group = False
-        else:
-            group_exercises = set()
+            len(group) >= 2
             # Check that the same deviation has been granted for all exercises.
-            for deviation in deviations:
-                if not deviation.is_groupable(deviations[0]):
-                    can_group = False
-                    break
-                group_exercises.add(deviation.exercise.id)
-            else:
-                if len(group_exercises) != exercise_count_by_module[module.id]:
-                    # The number of exercises that have deviations doesn't
-                    # match the number of exercises in the module, so there
-                    # are some exercises that don't have a deviation.
-                    can_group = False
-        group_id = f"{deviations[0].submitter.id}.{module.id}" if can_group else None
-        yield (deviations, can_group, group_id)
+            and len({row[4:] for row in group}) == 1
+            # Check that every exercise in the module has a deviation.
+            and len({row[3] for row in group}) == exercise_count_by_module[module_id]
+        )
+        group_id = f"{submitter_id}.{module_id}" if can_group else None
+        groups.append((ids, can_group, group_id))
+    return groups
+
+
+def load_deviation_groups(
+        model: Type[SubmissionRuleDeviation],
+        group_rows: Iterable[DeviationGroupRow],
+        ) -> List[Tuple[List[SubmissionRuleDeviation], bool, Optional[str]]]:
+    """
+    Load the model instances for the given rows returned by
+    `get_deviation_group_rows`. Only the deviations in the given rows are
+    fetched from the database.
+    """
+    group_rows = list(group_rows)
+    ids = [i for ids, _can_group, _group_id in group_rows for i in ids]
+    deviations_by_id = {}
+    if ids:
+        deviations_by_id = (
+            model.objects
+            .select_related(
+                'submitter', 'submitter__user',
+                'granter', 'granter__user',
+                'exercise', 'exercise__course_module',
+            )
+            # parent is prefetched because there may be multiple ancestors, and
+            # they are needed for building the deviation's URL.
+            .prefetch_related('exercise__parent')
+            .in_bulk(ids)
+        )
+    return [
+        ([deviations_by_id[i] for i in ids if i in deviations_by_id], can_group, group_id)
+        for ids, can_group, group_id in group_rows
+    ]
+
+
+def get_deviation_groups(
+        all_deviations: models.QuerySet[SubmissionRuleDeviation],
+        ) -> Iterable[Tuple[List[SubmissionRuleDeviation], bool, Optional[str]]]:
+    """
+    Group the deviations by user and module.
+
+    Grouping condition: deviations can be grouped if the user has been
+    granted the same deviation (based on the `is_groupable` method) for all
+    exercises in the module.
+
+    The returned tuples contain the following values:
+    1. List of deviations with the same user and module.
+    2. Boolean representing whether the deviations in the list can be
+    displayed as a group (i.e. the grouping condition is satisfied).
+    3. An id that uniquely identifies the group of deviations.
+    """
+    return load_deviation_groups(
+        all_deviations.model,
+        get_deviation_group_rows(all_deviations),
+    )
 
 
 def get_exercises(form_data: Dict[str, Any]) -> models.QuerySet[BaseExercise]:
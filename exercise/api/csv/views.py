@@ -2,6 +2,7 @@ from typing import Any, Dict, Optional, Set, Union
 
 from django.db.models.aggregates import Count
 from django.db.models.query import Prefetch, QuerySet
+from django.http.response import HttpResponseBase
 from rest_framework import viewsets
 from rest_framework.request import Request
 from rest_framework.response import Response
@@ -9,15 +10,17 @@ from rest_framework.settings import api_settings
 from rest_framework_csv.renderers import CSVRenderer
 from rest_framework_extensions.mixins import NestedViewSetMixin
 
-from lib.api.renderers import CSVExcelRenderer
+from lib.api.renderers import CSVExcelRenderer, ZipRenderer
 from lib.api.mixins import MeUserMixin
 from lib.api.constants import REGEX_INT_ME
+from lib.file_serving import serve_stream
 from course.api.mixins import CourseResourceMixin
 from course.permissions import IsCourseAdminOrUserObjIsSelf
 from userprofile.models import UserProfile
 
 from ...cache.points import CachedPoints
 from ...models import BaseExercise, Submission
+from ...submission_archive import submission_files_archive
 from .submission_sheet import filter_best_submissions, submissions_sheet
 from .aggregate_sheet import aggregate_sheet
 from .aggregate_points import aggregate_points
@@ -156,6 +159,65 @@ class CourseSubmissionDataViewSet(NestedViewSetMixin,
         return context
 
 
+class CourseSubmissionFilesViewSet(CourseSubmissionDataViewSet):
+    """
+    The `submissionfiles` endpoint returns the files submitted by the users
+    to the exercises in the course as a ZIP archive. The archive is streamed,
+    and it can be downloaded in parts with HTTP range requests. Each file is
+    stored as `exercise_<id>/submission_<id>_users_<user ids>/<file name>`.
+
+    Operations
+    ----------
+
+    `GET /courses/<course_id>/submissionfiles/`:
+        returns the submitted files of all users.
+
+    `GET /courses/<course_id>/submissionfiles/<user_id>`:
+        returns the submitted files of a specific user.
+
+    `GET /courses/<course_id>/submissionfiles/me`:
+        returns the submitted files of the current user.
+
+    All operations support the following URL parameters for filtering:
+
+    - `filter`: the exercise number as a string, including module and chapter numbers
+        (format N.N.N)
+    - `category_id`: id of the exercise category
+    - `module_id`: id of the course module
+    - `exercise_id`: id of the exercise
+    - `best`: "yes" or "no"; "no" includes all different submissions from same submitters
+    """
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [
+        ZipRenderer,
+    ]
+
+    def serialize_submissions(
+            self,
+            request: Request,
+            queryset: QuerySet[Submission],
+            revealed_ids: Set[int],
+            best: bool = False
+            ) -> HttpResponseBase:
+        submissions = list(
+            queryset
+            .distinct()
+            .prefetch_related('submitters')
+            .order_by('exercise_id', 'id')
+        )
+        if best:
+            submissions = filter_best_submissions(submissions, revealed_ids)
+        archive = submission_files_archive(submissions)
+        return serve_stream(
+            request,
+            archive.size,
+            archive.iter_range,
+            content_type='application/zip',
+            filename='submissions.zip',
+            as_attachment=True,
+            etag=archive.etag,
+        )
+
+
 class CourseAggregateDataViewSet(NestedViewSetMixin,
                                  MeUserMixin,
                                  CourseResourceMixin,
@@ -4,7 +4,6 @@ from django.core.exceptions import PermissionDenied
 from django.http.response import HttpResponse
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
-from wsgiref.util import FileWrapper
 from rest_framework import mixins, permissions, viewsets
 from rest_framework import status
 from rest_framework.authentication import TokenAuthentication
@@ -18,6 +17,7 @@ from django.db import DatabaseError
 from authorization.permissions import ACCESS
 from lib.api.mixins import MeUserMixin, ListSerializerMixin
 from lib.api.constants import REGEX_INT, REGEX_INT_ME
+from lib.file_serving import serve_file
 from userprofile.models import UserProfile, GraderUser
 from userprofile.permissions import IsAdminOrUserObjIsSelf, GraderUserCanOnlyRead
 from course.permissions import (
@@ -151,6 +151,14 @@ class ExerciseSubmissionsViewSet(NestedViewSetMixin,
     `GET /exercises/<exercise_id>/submissions/`:
         returns a list of all submissions.
 
+    - URL parameters:
+        - `pagination`: `cursor` to page with cursors instead of page
+            numbers. Deep pages are faster to fetch, and the results are not
+            counted unless `count` is `true`. The `next` and `previous`
+            links contain the cursor.
+        - `ordering`: the order of the results in the cursor pagination,
+            one of `id` (default) and `submission_time`. Prefix with `-` for the descending order.
+
     `GET /exercises/<exercise_id>/submissions/<user_id>/`:
         returns a list of a specific user's submissions.
 
@@ -192,6 +200,10 @@ class ExerciseSubmissionsViewSet(NestedViewSetMixin,
     }
     serializer_class = SubmissionBriefSerializer
     queryset = Submission.objects.all()
+    cursor_orderings = {
+        'id': ('id',),
+        'submission_time': ('submission_time', 'id'),
+    }
 
     def filter_queryset(self, queryset):
         lookup_field = self.lookup_field
@@ -458,14 +470,16 @@ class SubmissionFileViewSet(NestedViewSetMixin,
     def retrieve(self, request, version=None, submission_id=None, submittedfile_id=None):
         sfile = self.get_object()
         try:
-            f = sfile.file_object.open()
+            return serve_file(
+                request,
+                sfile.file_object,
+                content_type='application/octet-stream',
+                filename=sfile.filename,
+                as_attachment=True,
+            )
         except OSError:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
-        response = HttpResponse(FileWrapper(f), content_type='application/octet-stream')
-        response['Content-Disposition'] = 'attachment; filename="{}"'.format(sfile.filename)
-        return response
-
 
 class CoursePointsViewSet(ListSerializerMixin,
                           NestedViewSetMixin,
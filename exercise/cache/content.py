@@ -14,6 +14,7 @@ from .hierarchy import ContentMixin
 class CachedContent(ContentMixin, CachedAbstract):
     """ Course content hierarchy for template presentations """
     KEY_PREFIX = 'content'
+    COMPACT = True
 
     def __init__(self, course_instance: CourseInstance) -> None:
         self.instance = course_instance
@@ -65,6 +66,7 @@ class CachedContent(ContentMixin, CachedAbstract):
                     'submittable': False,
                     'submissions_link': o.get_submission_list_url(),
                     'requirements': module['requirements'],
+                    'requirement_checks': module['requirement_checks'],
                     'opening_time': module['opening_time'],
                     'reading_opening_time': module['reading_opening_time'],
                     'closing_time': module['closing_time'],
@@ -118,6 +120,7 @@ class CachedContent(ContentMixin, CachedAbstract):
                 'introduction': module.introduction,
                 'link': module.get_absolute_url(),
                 'requirements': [str(r) for r in module.requirements.all()],
+                'requirement_checks': [r.compile() for r in module.requirements.all()],
                 'opening_time': module.opening_time,
                 'reading_opening_time': module.reading_opening_time,
                 'closing_time': module.closing_time,
@@ -0,0 +1,47 @@
+from typing import Any, Dict, Optional, Type
+
+from django.db.models import Max
+from django.db.models.base import Model
+from django.db.models.signals import post_save, post_delete
+
+from course.models import CourseInstance
+from deviations.models import DeadlineRuleDeviation
+from lib.cache import CachedAbstract
+
+
+class CachedMaxDeadlineDeviations(CachedAbstract):
+    """
+    The largest deadline extension (in minutes) granted to anyone in each
+    exercise of the course. Used for evaluating the latest deadline of the
+    exercises in reveal rules without querying the deviations separately for
+    each exercise.
+    """
+    KEY_PREFIX = 'maxdeadlinedeviations'
+
+    def __init__(self, course_instance: CourseInstance) -> None:
+        super().__init__(course_instance)
+
+    def _generate_data(
+            self,
+            instance: CourseInstance,
+            data: Optional[Dict[int, int]] = None,
+            ) -> Dict[int, int]:
+        return {
+            row['exercise_id']: row['max_extra_minutes']
+            for row in (
+                DeadlineRuleDeviation.objects
+                .filter(exercise__course_module__course_instance=instance)
+                .values('exercise_id')
+                .annotate(max_extra_minutes=Max('extra_minutes'))
+                .order_by()
+            )
+        }
+
+
+def invalidate_deviations(sender: Type[Model], instance: DeadlineRuleDeviation, **kwargs: Any) -> None:
+    CachedMaxDeadlineDeviations.invalidate(instance.exercise.course_instance)
+
+
+# Automatically invalidate the maximum deviations when deviations change.
+post_save.connect(invalidate_deviations, sender=DeadlineRuleDeviation)
+post_delete.connect(invalidate_deviations, sender=DeadlineRuleDeviation)
@@ -1,4 +1,5 @@
 import logging
+import pickle
 import time
 from typing import Any, Dict, List, Optional, TYPE_CHECKING
 
@@ -7,25 +8,18 @@ from django.db.models.signals import post_save, post_delete
 from django.http.request import HttpRequest
 
 from lib.cache import CachedAbstract
+from lib.cache.packed import compress, decompress
 from lib.remote_page import RemotePageNotModified
 from ..protocol.aplus import load_exercise_page
+from ..protocol.form_template import FormTemplate
 
 if TYPE_CHECKING:
     from course.models import CourseInstance
     from userprofile.models import UserProfile
     from ..models import BaseExercise
 
-logger = logging.getLogger('aplus.cached')
 
-try:
-    from lz4.block import compress as _compress, decompress
-    def compress(data):
-        return _compress(data, compression=1)
-except ImportError:
-    logger.warning("Unable to import lz4, using a slower zlib instead")
-    from zlib import compress as _compress, decompress
-    def compress(data):
-        return _compress(data, level=1)
+logger = logging.getLogger('aplus.cached')
 
 
 class ExerciseCache(CachedAbstract):
@@ -57,18 +51,32 @@ class ExerciseCache(CachedAbstract):
             )
 
             content = compress(page.content.encode('utf-8'))
+            expires = page.expires if page.is_loaded else 0
 
             return {
                 'head': page.head,
                 'content': content,
+                # The page is loaded again on the next view, if it expires
+                # immediately, so compiling the form would not pay off.
+                'form': self._compile_form(page.content) if expires > time.time() else None,
                 'last_modified': page.last_modified,
-                'expires': page.expires if page.is_loaded else 0,
+                'expires': expires,
             }
         except RemotePageNotModified as e:
             if e.expires:
                 data['expires'] = e.expires
             return data
 
+    def _compile_form(self, content: str) -> Optional[bytes]:
+        # The form is compiled once, so that the submissions and the drafts
+        # can be filled in without parsing the page, see FormTemplate.
+        try:
+            template = FormTemplate.compile(content)
+        except ValueError:
+            logger.warning("Failed to compile the form of the exercise %s", self.exercise.id)
+            return None
+        return compress(pickle.dumps(template, pickle.HIGHEST_PROTOCOL))
+
     def head(self) -> str:
         return self.data['head']
 
@@ -76,6 +84,12 @@ class ExerciseCache(CachedAbstract):
         content = decompress(self.data['content']).decode('utf-8')
         return content
 
+    def form_template(self) -> Optional[FormTemplate]:
+        form = self.data.get('form')
+        if form is None:
+            return None
+        return pickle.loads(decompress(form))
+
 
 def invalidate_instance(instance: 'CourseInstance') -> None:
     for module in instance.course_modules.all():
@@ -1,5 +1,6 @@
 import datetime
 from copy import deepcopy
+from time import time
 from typing import (
     Any,
     Callable,
@@ -13,6 +14,7 @@ from typing import (
 )
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.db.models.base import Model
 from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.utils import timezone
@@ -21,12 +23,14 @@ from course.models import CourseInstance
 from deviations.models import DeadlineRuleDeviation, MaxSubmissionsRuleDeviation, SubmissionRuleDeviation
 from lib.cache import CachedAbstract
 from lib.helpers import format_points
-from notification.models import Notification
+from notification.models import Notification, notifications_created, notifications_seen
 from userprofile.models import UserProfile
-from ..models import BaseExercise, Submission, RevealRule
+from ..models import BaseExercise, LearningObject, Submission, RevealRule
 from ..reveal_states import ExerciseRevealState
 from .content import CachedContent
+from .deviations import CachedMaxDeadlineDeviations
 from .hierarchy import ContentMixin
+from .reveal import CachedRevealRule
 
 
 def has_more_points(submission: Submission, current_best_submission: Optional[Submission]) -> bool:
@@ -54,8 +58,27 @@ class CachedPoints(ContentMixin, CachedAbstract):
     exercise results are hidden when the reveal rule does not evaluate to true.
     When `is_staff` is `True`, reveal rules are ignored and the results are
     always revealed.
+
+    The reveal rules used for the student version are recorded in the data.
+    If a rule has been changed since, the student version is rebuilt from the
+    staff version with the current rules when the data is read, instead of
+    invalidating the points of every student of the exercise. See
+    `CachedRevealRule`.
+
+    The data that becomes valid at an upcoming reveal time can be generated
+    beforehand with `prebuild`. It is stored next to the current data and
+    taken into use by the first read after the reveal time, instead of
+    generating the data again at that moment.
+
+    The modules are stored in separate cache keys (shards), and the main key
+    holds the rest of the data. Reading the whole data assembles the shards
+    with one `get_many`, while `find_entry` reads only the shard of the
+    module that contains the requested learning object. The main key, the
+    shards and the prebuilt data are stored in the compact format.
     """
     KEY_PREFIX = 'points'
+    COMPACT = True
+    PREBUILT_MODIFIER = 'prebuilt'
 
     def __init__(
             self,
@@ -67,8 +90,202 @@ class CachedPoints(ContentMixin, CachedAbstract):
         self.content = content
         self.instance = course_instance
         self.user = user
+        # The time for which the reveal rules are evaluated, None for now.
+        self.generation_time: Optional[datetime.datetime] = None
         super().__init__(course_instance, user)
-        self._extract_tuples(self.data, 0 if is_staff else 1)
+        # The overlay extracts the staff version when it rebuilds the data.
+        if is_staff or not self._apply_reveal_overlay():
+            self._extract_tuples(self.data, 0 if is_staff else 1)
+
+    @classmethod
+    def find_entry(
+            cls,
+            course_instance: CourseInstance,
+            user: User,
+            content: CachedContent,
+            learning_object: Union[LearningObject, Dict[str, Any]],
+            is_staff: bool = False,
+            ) -> Dict[str, Any]:
+        """
+        Returns the entry of a learning object, same as `find(...)[0]`. Only
+        the main key and the shard of the module are read from the cache, if
+        they are up to date. Otherwise, the whole data is read or generated.
+        """
+        entry = cls._find_cached_entry(course_instance, user, content, learning_object, is_staff)
+        if entry is None:
+            entry, _, _, _ = cls(course_instance, user, content, is_staff).find(learning_object)
+        return entry
+
+    @classmethod
+    def _find_cached_entry(
+            cls,
+            course_instance: CourseInstance,
+            user: User,
+            content: CachedContent,
+            learning_object: Union[LearningObject, Dict[str, Any]],
+            is_staff: bool,
+            ) -> Optional[Dict[str, Any]]:
+        cache_key = cls._key(course_instance, user, modifiers=[])
+        raw = cache.get(cache_key)
+        updated, data = raw if isinstance(raw, tuple) and len(raw) == 2 else (None, None)
+        if updated is None or data is None:
+            return None
+        data = cls._unpack_value(cache_key, data)
+        if data is None:
+            return None
+        points = cls.__new__(cls)
+        points.content = content
+        points.instance = course_instance
+        points.user = user
+        points.generation_time = None
+        if points._needs_generation(data):
+            return None
+
+        object_id = learning_object['id'] if isinstance(learning_object, dict) else learning_object.id
+        idx = data['exercise_index'].get(object_id)
+        if idx is None:
+            return None
+        if not is_staff:
+            # The whole data is needed for applying a changed reveal rule.
+            used_rule = data['reveal_rules'].get(object_id)
+            if (
+                used_rule is not None
+                and CachedRevealRule.get_many([object_id]).get(object_id, used_rule) != used_rule
+            ):
+                return None
+
+        shard_key = cls._shard_key(cache_key, idx[0])
+        shard = cache.get(shard_key)
+        if not isinstance(shard, tuple) or len(shard) != 2 or shard[0] != data['points_created']:
+            return None
+        module = cls._unpack_value(shard_key, shard[1])
+        if module is None:
+            return None
+        entry = cls._by_idx([module], [0, *idx[1:]])[-1]
+        points._extract_tuples(entry, 0 if is_staff else 1)
+        return entry
+
+    @staticmethod
+    def _shard_key(cache_key: str, module_idx: int) -> str:
+        return '%s:m%d' % (cache_key, module_idx)
+
+    @staticmethod
+    def _shard_count_key(cache_key: str) -> str:
+        return '%s:mcount' % cache_key
+
+    @classmethod
+    def _store_value(cls, cache_key: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        return dict(data, modules=len(data['modules']))
+
+    @classmethod
+    def _store_parts(cls, cache_key: str, data: Dict[str, Any]) -> None:
+        # The shards are tagged with the generation time of the data, so that
+        # shards from another generation are not mixed with the main key.
+        # They are kept as long as the main key, and the shards of removed
+        # modules are deleted.
+        token = data['points_created']
+        count_key = cls._shard_count_key(cache_key)
+        previous_count = cache.get(count_key) or 0
+        shards = {count_key: len(data['modules'])}
+        shard_chunks = {}
+        for i, module in enumerate(data['modules']):
+            shard_key = cls._shard_key(cache_key, i)
+            packed, shard_chunks[shard_key] = cls._pack_value(shard_key, module)
+            shards[shard_key] = (token, packed)
+        cache.set_many(shards, None)
+        stale = [cls._shard_key(cache_key, i) for i in range(len(data['modules']), previous_count)]
+        if stale:
+            cache.delete_many(stale)
+            # The chunks of the removed shards are deleted as well.
+            shard_chunks.update((shard_key, {}) for shard_key in stale)
+        cls._store_chunks(shard_chunks)
+
+    @classmethod
+    def _load_value(cls, cache_key: str, value: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        keys = [cls._shard_key(cache_key, i) for i in range(value['modules'])]
+        shards = cache.get_many(keys) if keys else {}
+        modules = []
+        for key in keys:
+            shard = shards.get(key)
+            if not isinstance(shard, tuple) or len(shard) != 2 or shard[0] != value['points_created']:
+                return None
+            module = cls._unpack_value(key, shard[1])
+            if module is None:
+                return None
+            modules.append(module)
+        return dict(value, modules=modules)
+
+    @classmethod
+    def invalidate(cls, *models, modifiers=[]):
+        super().invalidate(*models, modifiers=modifiers)
+        # The prebuilt data is outdated as well.
+        super().invalidate(*models, modifiers=[cls.PREBUILT_MODIFIER])
+
+    @classmethod
+    def invalidate_many(cls, models_list, modifiers=[]):
+        models_list = list(models_list)
+        super().invalidate_many(models_list, modifiers=modifiers)
+        super().invalidate_many(models_list, modifiers=[cls.PREBUILT_MODIFIER])
+
+    @classmethod
+    def prebuild(
+            cls,
+            course_instance: CourseInstance,
+            user: User,
+            content: CachedContent,
+            when: datetime.datetime,
+            ) -> bool:
+        """
+        Generates the data as it will be at the given time, and stores it to
+        be taken into use once the time has passed. Returns False, if the
+        user's points were invalidated during the generation.
+        """
+        points = cls.__new__(cls)
+        points.content = content
+        points.instance = course_instance
+        points.user = user
+        # The reveal rules compare the time strictly, so they are evaluated
+        # just after the given time.
+        points.generation_time = when + datetime.timedelta(microseconds=1)
+        gen_start = time()
+        data = points._generate_data(course_instance, user)
+        data['valid_from'] = points.generation_time
+
+        cache_key = cls._key(course_instance, user, modifiers=[cls.PREBUILT_MODIFIER])
+        current = cache.get(cache_key)
+        if (
+            isinstance(current, tuple)
+            and len(current) == 2
+            and current[0] is None
+            and current[1] > gen_start
+        ):
+            return False
+        packed, chunks = cls._pack_value(cache_key, data)
+        cache.set(cache_key, (gen_start, packed), None)
+        cls._store_chunks({cache_key: chunks})
+        return True
+
+    def _get_prebuilt(self, instance: CourseInstance, user: User) -> Optional[Dict[str, Any]]:
+        """
+        Returns the prebuilt data, if it has become valid and it is still up
+        to date.
+        """
+        cache_key = self._key(instance, user, modifiers=[self.PREBUILT_MODIFIER])
+        raw = cache.get(cache_key)
+        updated, data = raw if isinstance(raw, tuple) and len(raw) == 2 else (None, None)
+        if updated is None or data is None:
+            return None
+        data = self._unpack_value(cache_key, data)
+        if data is None:
+            return None
+        now = timezone.now()
+        if (
+            data['valid_from'] > now
+            or data['created'] < self.content.created()
+            or (data['invalidate_time'] is not None and now >= data['invalidate_time'])
+        ):
+            return None
+        return data
 
     def _needs_generation(self, data: Dict[str, Any]) -> bool:
         return (
@@ -86,6 +303,11 @@ class CachedPoints(ContentMixin, CachedAbstract):
             user: User,
             data: Optional[Dict[str, Any]] = None,
             ) -> Dict[str, Any]:
+        if self.generation_time is None and user.is_authenticated:
+            prebuilt = self._get_prebuilt(instance, user)
+            if prebuilt is not None:
+                return prebuilt
+
         # Perform all database queries before generating the cache.
         if user.is_authenticated:
             submissions = list(
@@ -105,13 +327,23 @@ class CachedPoints(ContentMixin, CachedAbstract):
                 MaxSubmissionsRuleDeviation.objects
                 .get_max_deviations(user.userprofile, exercises)
             )
+            # The largest deadline extensions of all students are needed for
+            # the reveal rules.
+            max_deviations = CachedMaxDeadlineDeviations(instance).data
         else:
             submissions = []
             deadline_deviations = []
             submission_deviations = []
+            max_deviations = {}
 
         # Generate the staff and student version of the cache, and merge them.
-        generate_args = (user.is_authenticated, submissions, deadline_deviations, submission_deviations)
+        generate_args = (
+            user.is_authenticated,
+            submissions,
+            deadline_deviations,
+            submission_deviations,
+            max_deviations,
+        )
         staff_data = self._generate_data_internal(True, *generate_args)
         student_data = self._generate_data_internal(False, *generate_args)
         self._pack_tuples(staff_data, student_data) # Now staff_data is the final, combined data.
@@ -137,6 +369,7 @@ class CachedPoints(ContentMixin, CachedAbstract):
             submissions: Iterable[Submission],
             deadline_deviations: Iterable[DeadlineRuleDeviation],
             submission_deviations: Iterable[MaxSubmissionsRuleDeviation],
+            max_deviations: Dict[int, int],
             ) -> Dict[str, Any]:
         """
         Handles the generation of one version of the cache (staff or student).
@@ -147,9 +380,10 @@ class CachedPoints(ContentMixin, CachedAbstract):
         module_index = data['module_index']
         exercise_index = data['exercise_index']
         modules = data['modules']
-        categories = data['categories']
-        total = data['total']
         data['invalidate_time'] = None
+        # The reveal rules of the exercises, whose submissions are included.
+        data['reveal_rules'] = {}
+        now = self.generation_time or timezone.now()
 
         # Augment submission parameters.
         def r_augment(children: List[Dict[str, Any]]) -> None:
@@ -173,32 +407,8 @@ class CachedPoints(ContentMixin, CachedAbstract):
                     })
                 r_augment(entry.get('children'))
         for module in modules:
-            module.update({
-                'submission_count': 0,
-                'points': 0,
-                'formatted_points': '0',
-                'points_by_difficulty': {},
-                'unconfirmed_points_by_difficulty': {},
-                'passed': module['points_to_pass'] == 0,
-                'feedback_revealed': True,
-            })
             r_augment(module['children'])
-        for entry in categories.values():
-            entry.update({
-                'submission_count': 0,
-                'points': 0,
-                'formatted_points': '0',
-                'points_by_difficulty': {},
-                'unconfirmed_points_by_difficulty': {},
-                'passed': entry['points_to_pass'] == 0,
-                'feedback_revealed': True,
-            })
-        total.update({
-            'submission_count': 0,
-            'points': 0,
-            'points_by_difficulty': {},
-            'unconfirmed_points_by_difficulty': {},
-        })
+        self._reset_points(data)
 
         if is_authenticated:
             # Augment deviation data.
@@ -237,34 +447,19 @@ class CachedPoints(ContentMixin, CachedAbstract):
                 Evaluate the reveal rule of the current exercise and ensure
                 that feedback is hidden appropriately.
                 """
-                rule = exercise.active_submission_feedback_reveal_rule
-                state = ExerciseRevealState(entry)
-                is_revealed = rule.is_revealed(state)
-                reveal_time = rule.get_reveal_time(state)
-
-                entry.update({
-                    'best_submission': entry['best_submission'] if is_revealed else last_submission.id,
-                    'points': entry['points'] if is_revealed else 0,
-                    'formatted_points': format_points(entry['points'], is_revealed, False),
-                    'passed': entry['passed'] if is_revealed else False,
-                    'feedback_revealed': is_revealed,
-                    'feedback_reveal_time': reveal_time,
-                })
-
-                for submission in entry['submissions']:
-                    submission.update({
-                        'points': submission['points'] if is_revealed else 0,
-                        'formatted_points': format_points(submission['points'], is_revealed, False),
-                        'passed': submission['passed'] if is_revealed else False,
-                        'feedback_revealed': is_revealed,
-                        'feedback_reveal_time': reveal_time,
-                    })
+                reveal_time = self._reveal_entry(
+                    entry,
+                    exercise.active_submission_feedback_reveal_rule,
+                    max_deviations,
+                    now,
+                    last_submission.id,
+                )
 
                 # If the reveal rule depends on time, update the cache's
                 # invalidation time.
                 if (
                     reveal_time is not None
-                    and reveal_time > timezone.now()
+                    and reveal_time > now
                     and (
                         data['invalidate_time'] is None
                         or reveal_time < data['invalidate_time']
@@ -291,6 +486,9 @@ class CachedPoints(ContentMixin, CachedAbstract):
                         self.dirty = True
                         continue
                     entry = tree[-1]
+                    data['reveal_rules'][exercise.id] = CachedRevealRule.rule_data(
+                        exercise.active_submission_feedback_reveal_rule
+                    )
                     if exercise.grading_mode == BaseExercise.GRADING_MODE.BEST:
                         is_better_than = has_more_points
                     elif exercise.grading_mode == BaseExercise.GRADING_MODE.LAST:
@@ -378,6 +576,136 @@ class CachedPoints(ContentMixin, CachedAbstract):
             if exercise is not None and not is_staff:
                 check_reveal_rule()
 
+        self._collect_points(data)
+        return data
+
+    @staticmethod
+    def _reveal_entry(
+            entry: Dict[str, Any],
+            rule: RevealRule,
+            max_deviations: Dict[int, int],
+            now: datetime.datetime,
+            last_submission_id: int,
+            ) -> Optional[datetime.datetime]:
+        """
+        Evaluates the reveal rule of an exercise entry and hides the feedback
+        of the entry and its submissions, if the rule does not reveal it at
+        the given time. Returns the reveal time of the rule.
+        """
+        state = ExerciseRevealState(entry, max_deviations=max_deviations)
+        is_revealed = rule.is_revealed(state, now)
+        reveal_time = rule.get_reveal_time(state)
+
+        entry.update({
+            'best_submission': entry['best_submission'] if is_revealed else last_submission_id,
+            'points': entry['points'] if is_revealed else 0,
+            'formatted_points': format_points(entry['points'], is_revealed, False),
+            'passed': entry['passed'] if is_revealed else False,
+            'feedback_revealed': is_revealed,
+            'feedback_reveal_time': reveal_time,
+        })
+
+        for submission in entry['submissions']:
+            submission.update({
+                'points': submission['points'] if is_revealed else 0,
+                'formatted_points': format_points(submission['points'], is_revealed, False),
+                'passed': submission['passed'] if is_revealed else False,
+                'feedback_revealed': is_revealed,
+                'feedback_reveal_time': reveal_time,
+            })
+        return reveal_time
+
+    def _apply_reveal_overlay(self) -> bool:
+        """
+        Rebuilds the student version of the data from the staff version, if
+        any of the reveal rules recorded in the data has changed since the
+        data was generated. Returns False, if the recorded rules are current.
+        """
+        used_rules = self.data.get('reveal_rules')
+        if not used_rules:
+            return False
+        rules = CachedRevealRule.get_many(used_rules.keys())
+        if all(rules.get(exercise_id, rule) == rule for exercise_id, rule in used_rules.items()):
+            return False
+
+        # The rules are evaluated against the actual points.
+        self._extract_tuples(self.data, 0)
+        modules = self.data['modules']
+        exercise_index = self.data['exercise_index']
+        max_deviations = CachedMaxDeadlineDeviations(self.instance).data
+        now = timezone.now()
+        for exercise_id, rule in used_rules.items():
+            entry = self._by_idx(modules, exercise_index[exercise_id])[-1]
+            self._reveal_entry(
+                entry,
+                CachedRevealRule.to_rule(rules.get(exercise_id, rule)),
+                max_deviations,
+                now,
+                self._last_submission_id(entry),
+            )
+        self._reset_points(self.data)
+        self._collect_points(self.data)
+        return True
+
+    @staticmethod
+    def _last_submission_id(entry: Dict[str, Any]) -> int:
+        # The submissions are ordered by descending time. The last official
+        # submission is preferred, like in the generation.
+        for submission in entry['submissions']:
+            if not submission['unofficial']:
+                return submission['id']
+        return entry['submissions'][0]['id']
+
+    def _reset_points(self, data: Dict[str, Any]) -> None:
+        """
+        Resets the points of the modules, the categories and the total, and
+        the level confirmation flags of the entries, so that the points can
+        be collected from the exercise entries with `_collect_points`.
+        """
+        content = self.content.data
+        def r_reset(children: List[Dict[str, Any]], content_children: List[Dict[str, Any]]) -> None:
+            for entry, content_entry in zip(children, content_children):
+                entry.pop('confirmable_points', None)
+                if content_entry.get('unconfirmed', False):
+                    entry['unconfirmed'] = True
+                r_reset(entry.get('children', []), content_entry.get('children', []))
+        for module, content_module in zip(data['modules'], content['modules']):
+            if content_module.get('unconfirmed', False):
+                module['unconfirmed'] = True
+            module.update({
+                'submission_count': 0,
+                'points': 0,
+                'formatted_points': '0',
+                'points_by_difficulty': {},
+                'unconfirmed_points_by_difficulty': {},
+                'passed': module['points_to_pass'] == 0,
+                'feedback_revealed': True,
+            })
+            r_reset(module['children'], content_module['children'])
+        data['categories'] = deepcopy(content['categories'])
+        for entry in data['categories'].values():
+            entry.update({
+                'submission_count': 0,
+                'points': 0,
+                'formatted_points': '0',
+                'points_by_difficulty': {},
+                'unconfirmed_points_by_difficulty': {},
+                'passed': entry['points_to_pass'] == 0,
+                'feedback_revealed': True,
+            })
+        data['total'] = deepcopy(content['total'])
+        data['total'].update({
+            'submission_count': 0,
+            'points': 0,
+            'points_by_difficulty': {},
+            'unconfirmed_points_by_difficulty': {},
+        })
+
+    def _collect_points(self, data: Dict[str, Any]) -> None:
+        """
+        Confirms the points of the levels and sums up the points of the
+        exercise entries to the modules, the categories and the total.
+        """
         # Confirm points.
         def r_check(parent: Dict[str, Any], children: List[Dict[str, Any]]) -> None:
             for entry in children:
@@ -391,7 +719,7 @@ class CachedPoints(ContentMixin, CachedAbstract):
                         child.pop('unconfirmed', None)
                         # TODO: should recurse to all descendants
                 r_check(entry, entry.get('children', []))
-        for module in modules:
+        for module in data['modules']:
             r_check(module, module['children'])
 
         # Collect points and check limits.
@@ -446,8 +774,8 @@ class CachedPoints(ContentMixin, CachedAbstract):
                         if entry['graded']:
                             points += entry['points']
                             add_to(module, entry)
-                            add_to(categories[entry['category_id']], entry)
-                            add_to(total, entry)
+                            add_to(data['categories'][entry['category_id']], entry)
+                            add_to(data['total'], entry)
                 r_passed, r_is_revealed = r_collect(module, entry, entry.get('children', []))
                 passed = r_passed and passed
                 is_revealed = r_is_revealed and is_revealed
@@ -459,19 +787,17 @@ class CachedPoints(ContentMixin, CachedAbstract):
                 parent['points'] = points
                 parent['formatted_points'] = format_points(points, is_revealed, True)
             return passed, is_revealed
-        for module in modules:
+        for module in data['modules']:
             passed, _ = r_collect(module, None, module['children'])
             module['passed'] = (
                 passed
                 and module['points'] >= module['points_to_pass']
             )
-        for category in categories.values():
+        for category in data['categories'].values():
             category['passed'] = (
                 category['points'] >= category['points_to_pass']
             )
 
-        return data
-
     def created(self) -> Tuple[datetime.datetime, datetime.datetime]:
         return self.data['points_created'], super().created()
 
@@ -494,6 +820,33 @@ class CachedPoints(ContentMixin, CachedAbstract):
             filter_for_assistant=filter_for_assistant,
             raise_404=raise_404,
         )
+        return self._submission_ids(exercises, best, fallback_to_last)
+
+    @classmethod
+    def entry_submission_ids(
+            cls,
+            entry: Dict[str, Any],
+            best: bool = True,
+            fallback_to_last: bool = False,
+            ) -> List[int]:
+        """
+        Same as `submission_ids` for an entry returned by `find_entry`.
+        """
+        exercises = []
+        def recursion(entry: Dict[str, Any]) -> None:
+            if entry['type'] == 'exercise':
+                exercises.append(entry)
+            for child in entry['children']:
+                recursion(child)
+        recursion(entry)
+        return cls._submission_ids(exercises, best, fallback_to_last)
+
+    @staticmethod
+    def _submission_ids(
+            exercises: List[Dict[str, Any]],
+            best: bool,
+            fallback_to_last: bool,
+            ) -> List[int]:
         submissions = []
         if best:
             for entry in exercises:
@@ -590,6 +943,22 @@ def invalidate_notification(sender: Type[Model], instance: Notification, **kwarg
         course = instance.submission.exercise.course_instance
     CachedPoints.invalidate(course, instance.recipient.user)
 
+def invalidate_created_notifications(sender: Type[Model], notifications: List[Notification], **kwargs: Any) -> None:
+    CachedPoints.invalidate_many(
+        (n.course_instance_id, n.recipient.user_id)
+        for n in notifications
+    )
+
+def invalidate_seen_notifications(
+        sender: Type[Model],
+        recipient: UserProfile,
+        course_instance: CourseInstance,
+        count: int,
+        **kwargs: Any,
+        ) -> None:
+    if count:
+        CachedPoints.invalidate(course_instance, recipient.user)
+
 def invalidate_deviation(sender: Type[Model], instance: SubmissionRuleDeviation, **kwargs: Any) -> None:
     # Invalidate for the student who received the deviation as well as all
     # students who have submitted this exercise with them.
@@ -603,29 +972,17 @@ def invalidate_deviation(sender: Type[Model], instance: SubmissionRuleDeviation,
         if profile != instance.submitter:
             CachedPoints.invalidate(course, profile.user)
 
-def invalidate_submission_reveal(sender: Type[Model], instance: RevealRule, **kwargs: Any) -> None:
-    # Invalidate for all students who have submitted the exercise whose
-    # submission feedback reveal rule changed.
-    try:
-        exercise = BaseExercise.objects.get(submission_feedback_reveal_rule=instance)
-    except BaseExercise.DoesNotExist:
-        return
-    course = exercise.course_instance
-    submitters = UserProfile.objects.filter(submissions__exercise=exercise).distinct()
-    for profile in submitters:
-        CachedPoints.invalidate(course, profile.user)
-
 # Automatically invalidate cached points when submissions change.
 post_save.connect(invalidate_content, sender=Submission)
 post_delete.connect(invalidate_content, sender=Submission)
 post_save.connect(invalidate_notification, sender=Notification)
 post_delete.connect(invalidate_notification, sender=Notification)
+notifications_created.connect(invalidate_created_notifications, sender=Notification)
+notifications_seen.connect(invalidate_seen_notifications, sender=Notification)
 post_save.connect(invalidate_deviation, sender=DeadlineRuleDeviation)
 post_delete.connect(invalidate_deviation, sender=DeadlineRuleDeviation)
 post_save.connect(invalidate_deviation, sender=MaxSubmissionsRuleDeviation)
 post_delete.connect(invalidate_deviation, sender=MaxSubmissionsRuleDeviation)
-post_save.connect(invalidate_submission_reveal, sender=RevealRule)
-post_delete.connect(invalidate_submission_reveal, sender=RevealRule)
 # listen to the m2m_changed signal since submission.submitters is a many-to-many
 # field and instances must be saved before the many-to-many fields may be modified,
 # that is to say, the submission post save hook may see an empty submitters list
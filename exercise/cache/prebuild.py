@@ -0,0 +1,117 @@
+"""
+Prebuilding of CachedPoints before reveal times.
+
+When the feedback of an exercise is revealed at a certain time, the
+CachedPoints of every student who has submitted to the exercise expires at
+that moment, and all of them would be generated again by the first requests
+after it. `find_upcoming_reveals` finds the reveal times in the near future,
+and `prebuild_points` generates the data of the affected students beforehand
+at a limited rate. The prebuilt data is taken into use by the first read
+after the reveal time (see `CachedPoints.prebuild`).
+
+The prebuilding is run periodically by the `prebuild_caches` Celery task when
+`CACHE_PREBUILD_SCHEDULE` is set, or by the `prebuild_caches` management
+command.
+"""
+import datetime
+import logging
+from time import sleep
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Q
+
+from course.models import CourseInstance
+from ..models import BaseExercise, RevealRule
+from ..reveal_states import ExerciseRevealState
+from .content import CachedContent
+from .deviations import CachedMaxDeadlineDeviations
+from .hierarchy import NoSuchContent
+from .points import CachedPoints
+
+logger = logging.getLogger('aplus.cached')
+
+# Deadline based reveal times are searched from the modules that have closed
+# at most this long ago, because late submissions, deviations and reveal
+# delays may move the reveal time after the closing time.
+DEADLINE_LOOKBACK = datetime.timedelta(days=60)
+
+
+def find_upcoming_reveals(
+        start: datetime.datetime,
+        end: datetime.datetime,
+        ) -> Dict[int, Dict[datetime.datetime, List[int]]]:
+    """
+    Returns the submission feedback reveal times between `start` and `end`
+    as a dict of course instance ids to dicts of reveal times to the ids of
+    the exercises revealed at that time. The personal deadline deviations
+    are not taken into account for DEADLINE rules.
+    """
+    exercises = (
+        BaseExercise.objects
+        .filter(
+            Q(
+                submission_feedback_reveal_rule__trigger=RevealRule.TRIGGER.TIME,
+                submission_feedback_reveal_rule__time__gte=start,
+                submission_feedback_reveal_rule__time__lt=end,
+            ) | Q(
+                submission_feedback_reveal_rule__trigger__in=(
+                    RevealRule.TRIGGER.DEADLINE,
+                    RevealRule.TRIGGER.DEADLINE_ALL,
+                ),
+                course_module__closing_time__lt=end,
+                course_module__closing_time__gte=start - DEADLINE_LOOKBACK,
+            )
+        )
+        .select_related('submission_feedback_reveal_rule', 'course_module')
+    )
+    contents = {}
+    max_deviations = {}
+    reveals = {}
+    for exercise in exercises:
+        instance_id = exercise.course_module.course_instance_id
+        if instance_id not in contents:
+            contents[instance_id] = CachedContent(exercise.course_module.course_instance)
+            max_deviations[instance_id] = CachedMaxDeadlineDeviations(instance_id).data
+        try:
+            entry, _, _, _ = contents[instance_id].find(exercise)
+        except NoSuchContent:
+            continue
+        # The reveal time of a student without personal deviations
+        state = ExerciseRevealState(
+            dict(entry, personal_deadline=None, personal_max_submissions=None),
+            max_deviations=max_deviations[instance_id],
+        )
+        reveal_time = exercise.submission_feedback_reveal_rule.get_reveal_time(state)
+        if reveal_time is not None and start <= reveal_time < end:
+            reveals.setdefault(instance_id, {}).setdefault(reveal_time, []).append(exercise.id)
+    return reveals
+
+
+def prebuild_points(
+        instance: CourseInstance,
+        exercise_ids: Iterable[int],
+        when: datetime.datetime,
+        ) -> int:
+    """
+    Prebuilds the CachedPoints of the users who have submitted to the given
+    exercises, as the data will be at the given time. At most
+    `CACHE_PREBUILD_RATE` entries are generated per second. Returns the
+    number of prebuilt entries.
+    """
+    rate = settings.CACHE_PREBUILD_RATE
+    content = CachedContent(instance)
+    users = (
+        User.objects
+        .filter(userprofile__submissions__exercise__in=list(exercise_ids))
+        .distinct()
+    )
+    count = 0
+    for user in users:
+        if CachedPoints.prebuild(instance, user, content, when):
+            count += 1
+        if rate:
+            sleep(1 / rate)
+    logger.debug("Prebuilt %d cached points in %s for %s", count, instance, when)
+    return count
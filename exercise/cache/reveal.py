@@ -0,0 +1,89 @@
+from time import time
+from typing import Any, Dict, Iterable, Optional, Type, Union
+
+from django.db.models.base import Model
+from django.db.models.signals import post_save, post_delete, pre_delete
+
+from lib.cache import CachedAbstract
+from ..models import BaseExercise, LearningObject, RevealRule
+
+
+class CachedRevealRule(CachedAbstract):
+    """
+    The fields of the active submission feedback reveal rule of an exercise.
+
+    `CachedPoints` records the rules it used when it generated the student
+    version of the points. When the points are read, the recorded rules are
+    compared to these records, and if a rule has changed, the new rule is
+    applied to the cached points at read time. Thus, saving a reveal rule
+    updates one record instead of invalidating the points of every student
+    who has submitted to the exercise.
+    """
+    KEY_PREFIX = 'revealrule'
+    FIELDS = ('trigger', 'delay_minutes', 'time', 'currently_revealed')
+
+    def __init__(self, exercise: Union[BaseExercise, int]) -> None:
+        super().__init__(exercise)
+
+    @classmethod
+    def rule_data(cls, rule: RevealRule) -> Dict[str, Any]:
+        return {field: getattr(rule, field) for field in cls.FIELDS}
+
+    @staticmethod
+    def to_rule(data: Dict[str, Any]) -> RevealRule:
+        return RevealRule(**data)
+
+    def _generate_data(
+            self,
+            exercise: Union[BaseExercise, int],
+            data: Optional[Dict[str, Any]] = None,
+            ) -> Dict[str, Any]:
+        if not isinstance(exercise, BaseExercise):
+            exercise = (
+                BaseExercise.objects
+                .select_related('submission_feedback_reveal_rule')
+                .get(id=exercise)
+            )
+        return self.rule_data(exercise.active_submission_feedback_reveal_rule)
+
+    @classmethod
+    def get_many(cls, exercise_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Returns the rule data of the given exercises as a dict keyed by the
+        exercise id. The cache is read with one round trip, and the data of
+        the exercises that were not cached is generated with one query.
+        Exercises that no longer exist are left out.
+        """
+        keys = {cls._key(exercise_id, modifiers=[]): exercise_id for exercise_id in exercise_ids}
+        found, missing = cls.get_many_cached(keys.keys())
+        result = {keys[key]: data for key, data in found.items()}
+        if not missing:
+            return result
+
+        gen_start = time()
+        for exercise in (
+                BaseExercise.objects
+                .filter(id__in=[keys[key] for key in missing])
+                .select_related('submission_feedback_reveal_rule')
+                ):
+            data = cls.rule_data(exercise.active_submission_feedback_reveal_rule)
+            cls.add_generated(cls._key(exercise.id, modifiers=[]), gen_start, data)
+            result[exercise.id] = data
+        return result
+
+
+def invalidate_exercise(sender: Type[Model], instance: LearningObject, **kwargs: Any) -> None:
+    # The exercise may have been assigned another reveal rule.
+    CachedRevealRule.invalidate(instance)
+
+def invalidate_rule(sender: Type[Model], instance: RevealRule, **kwargs: Any) -> None:
+    for exercise_id in BaseExercise.objects.filter(submission_feedback_reveal_rule=instance).values_list('id', flat=True):
+        CachedRevealRule.invalidate(exercise_id)
+
+
+# Automatically invalidate the cached rules when the rules change.
+post_save.connect(invalidate_exercise, sender=LearningObject)
+post_delete.connect(invalidate_exercise, sender=LearningObject)
+post_save.connect(invalidate_rule, sender=RevealRule)
+# The exercises are detached from a deleted rule before post_delete.
+pre_delete.connect(invalidate_rule, sender=RevealRule)
@@ -0,0 +1,200 @@
+import datetime
+from typing import Any, Callable, Dict, Iterable, Optional, Type, Union
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.base import Model
+from django.db.models.signals import post_save, post_delete, pre_save, m2m_changed
+from django.utils import timezone
+
+from course.models import CourseInstance, Enrollment
+from lib.cache import CachedAbstract
+from userprofile.models import UserProfile
+from ..models import Submission
+
+
+class CachedSubmitterStats(CachedAbstract):
+    """
+    The number of students in a course instance and the number of students
+    who have submitted to each exercise of the course. The staff results
+    page reads these instead of aggregating the submissions of the whole
+    course on every render.
+
+    The counts are updated in place when a student submits to an exercise
+    for the first time and when a student enrolls or unenrolls. The updates
+    are not atomic, so an update may be lost when two of them happen at the
+    same time. Thus, the counts are regenerated from the database when they
+    are older than `MAX_AGE`.
+    """
+    KEY_PREFIX = 'submitterstats'
+    MAX_AGE = datetime.timedelta(hours=1)
+
+    def __init__(self, course_instance: Union[CourseInstance, int]) -> None:
+        super().__init__(course_instance)
+
+    def _needs_generation(self, data: Optional[Dict[str, Any]]) -> bool:
+        return data is None or data['created'] + self.MAX_AGE < timezone.now()
+
+    def _generate_data(
+            self,
+            instance: Union[CourseInstance, int],
+            data: Optional[Dict[str, Any]] = None,
+            ) -> Dict[str, Any]:
+        if not isinstance(instance, CourseInstance):
+            instance = CourseInstance.objects.get(id=instance)
+        counts = (
+            instance.students
+            .filter(submissions__exercise__course_module__course_instance=instance)
+            .values('submissions__exercise_id')
+            .annotate(count=Count('id', distinct=True))
+            .order_by()
+        )
+        return {
+            'created': timezone.now(),
+            'student_count': instance.students.count(),
+            'exercise_submitter_counts': {
+                row['submissions__exercise_id']: row['count'] for row in counts
+            },
+        }
+
+    @classmethod
+    def is_cached(cls, course_instance: Union[CourseInstance, int]) -> bool:
+        raw = cache.get(cls._key(course_instance, modifiers=[]))
+        return isinstance(raw, tuple) and len(raw) == 2 and raw[0] is not None
+
+    @classmethod
+    def update(
+            cls,
+            course_instance: Union[CourseInstance, int],
+            func: Callable[[Dict[str, Any]], None],
+            ) -> None:
+        """
+        Applies `func` to the cached data and stores the result, if the data
+        is cached. Otherwise, nothing is done, because the change is included
+        when the data is generated the next time.
+        """
+        cache_key = cls._key(course_instance, modifiers=[])
+        raw = cache.get(cache_key)
+        updated, data = raw if isinstance(raw, tuple) and len(raw) == 2 else (None, None)
+        if updated is None or data is None:
+            return
+        func(data)
+        cache.set(cache_key, (updated, data), None)
+
+
+def _is_student(enrollment: Enrollment) -> bool:
+    return (
+        enrollment.role == Enrollment.ENROLLMENT_ROLE.STUDENT
+        and enrollment.status == Enrollment.ENROLLMENT_STATUS.ACTIVE
+    )
+
+
+def _add_submitters(submission: Submission, profile_ids: Iterable[int]) -> None:
+    exercise_id = submission.exercise_id
+    instance_id = submission.exercise.course_module.course_instance_id
+
+    def add(data: Dict[str, Any]) -> None:
+        students = set(
+            Enrollment.objects
+            .filter(
+                course_instance_id=instance_id,
+                user_profile_id__in=profile_ids,
+                role=Enrollment.ENROLLMENT_ROLE.STUDENT,
+                status=Enrollment.ENROLLMENT_STATUS.ACTIVE,
+            )
+            .values_list('user_profile_id', flat=True)
+        )
+        if not students:
+            return
+        # Only the students who submit to the exercise for the first time
+        # are new submitters.
+        earlier = set(
+            Submission.objects
+            .filter(exercise_id=exercise_id, submitters__in=students)
+            .exclude(id=submission.id)
+            .values_list('submitters', flat=True)
+        )
+        new = len(students - earlier)
+        if new:
+            counts = data['exercise_submitter_counts']
+            counts[exercise_id] = counts.get(exercise_id, 0) + new
+
+    CachedSubmitterStats.update(instance_id, add)
+
+
+def _change_student(instance_id: int, profile_id: int, delta: int) -> None:
+    def change(data: Dict[str, Any]) -> None:
+        data['student_count'] += delta
+        counts = data['exercise_submitter_counts']
+        for exercise_id in set(
+                Submission.objects
+                .filter(
+                    exercise__course_module__course_instance_id=instance_id,
+                    submitters=profile_id,
+                )
+                .values_list('exercise_id', flat=True)
+                ):
+            counts[exercise_id] = counts.get(exercise_id, 0) + delta
+
+    CachedSubmitterStats.update(instance_id, change)
+
+
+def update_submitters(
+        sender: Type[Model],
+        instance: Union[Submission, UserProfile],
+        action: str,
+        reverse: bool,
+        model: Type[Model],
+        pk_set: Optional[Iterable[int]],
+        **kwargs: Any,
+        ) -> None:
+    if action == 'post_add' and pk_set:
+        if reverse:
+            # instance is a UserProfile
+            for submission in Submission.objects.filter(pk__in=pk_set).select_related('exercise'):
+                _add_submitters(submission, [instance.id])
+        else:
+            _add_submitters(instance, pk_set)
+    elif action in ('post_remove', 'post_clear'):
+        # Removed submitters are rare, so the counts are just regenerated.
+        if reverse:
+            for submission in Submission.objects.filter(pk__in=pk_set or []).select_related('exercise'):
+                CachedSubmitterStats.invalidate(submission.exercise.course_instance)
+        else:
+            CachedSubmitterStats.invalidate(instance.exercise.course_instance)
+
+def invalidate_submission(sender: Type[Model], instance: Submission, **kwargs: Any) -> None:
+    CachedSubmitterStats.invalidate(instance.exercise.course_instance)
+
+def remember_enrollment(sender: Type[Model], instance: Enrollment, **kwargs: Any) -> None:
+    # Record whether the user was a student before the save. The attribute
+    # is kept for the saves nested in the post_save handlers of Enrollment.
+    if hasattr(instance, '_was_student'):
+        return
+    if not CachedSubmitterStats.is_cached(instance.course_instance_id):
+        instance._was_student = None
+    elif instance.pk is None:
+        instance._was_student = False
+    else:
+        old = Enrollment.objects.filter(pk=instance.pk).first()
+        instance._was_student = old is not None and _is_student(old)
+
+def update_enrollment(sender: Type[Model], instance: Enrollment, **kwargs: Any) -> None:
+    was_student = instance.__dict__.pop('_was_student', None)
+    if was_student is None:
+        return
+    is_student = _is_student(instance)
+    if is_student != was_student:
+        _change_student(instance.course_instance_id, instance.user_profile_id, 1 if is_student else -1)
+
+def remove_enrollment(sender: Type[Model], instance: Enrollment, **kwargs: Any) -> None:
+    if _is_student(instance):
+        _change_student(instance.course_instance_id, instance.user_profile_id, -1)
+
+
+# Automatically update the counts when students submit, enroll or unenroll.
+m2m_changed.connect(update_submitters, sender=Submission.submitters.through)
+post_delete.connect(invalidate_submission, sender=Submission)
+pre_save.connect(remember_enrollment, sender=Enrollment)
+post_save.connect(update_enrollment, sender=Enrollment)
+post_delete.connect(remove_enrollment, sender=Enrollment)
@@ -0,0 +1,97 @@
+import time
+from typing import Any, Dict, Optional, Type
+
+from django.db.models.base import Model
+from django.db.models.signals import post_save, post_delete
+
+from lib.cache import CachedAbstract
+from ..models import BaseExercise, LearningObject, Submission
+
+
+class CachedGraderToken(CachedAbstract):
+    """
+    The ids of the objects that a grader authentication token gives access
+    to. Graders may call back with the same token many times, so the ids
+    are resolved with one query and kept for `MAX_AGE` seconds. Invalid
+    tokens raise DoesNotExist and they are not cached.
+    """
+    MAX_AGE = 60
+
+    def _needs_generation(self, data: Optional[Dict[str, Any]]) -> bool:
+        return data is None or time.time() > data['expires']
+
+
+class CachedSubmissionToken(CachedGraderToken):
+    """
+    The submission, exercise, course instance and course of a submission
+    token. Raises Submission.DoesNotExist, if the hash does not match.
+    """
+    KEY_PREFIX = 'submissiontoken'
+
+    def __init__(self, submission_id: int, submission_hash: str) -> None:
+        self.submission_hash = submission_hash
+        super().__init__(submission_id, modifiers=[submission_hash])
+
+    def _generate_data(self, submission_id: int, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        exercise_id, instance_id, course_id = (
+            Submission.objects
+            .filter(id=submission_id, hash=self.submission_hash)
+            .prefetch_related(None)
+            .values_list(
+                'exercise_id',
+                'exercise__course_module__course_instance_id',
+                'exercise__course_module__course_instance__course_id',
+            )
+            .get()
+        )
+        return {
+            'expires': time.time() + self.MAX_AGE,
+            'submission': submission_id,
+            'exercise': exercise_id,
+            'instance': instance_id,
+            'course': course_id,
+        }
+
+
+class CachedExerciseToken(CachedGraderToken):
+    """
+    The exercise, course instance and course of an exercise token. The token
+    is verified before the cache is read. Raises BaseExercise.DoesNotExist,
+    if the exercise does not exist.
+    """
+    KEY_PREFIX = 'exercisetoken'
+
+    def __init__(self, exercise_id: int) -> None:
+        super().__init__(exercise_id)
+
+    def _generate_data(self, exercise_id: int, data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        instance_id, course_id = (
+            BaseExercise.objects
+            .filter(id=exercise_id)
+            .prefetch_related(None)
+            .values_list(
+                'course_module__course_instance_id',
+                'course_module__course_instance__course_id',
+            )
+            .get()
+        )
+        return {
+            'expires': time.time() + self.MAX_AGE,
+            'exercise': exercise_id,
+            'instance': instance_id,
+            'course': course_id,
+        }
+
+
+def invalidate_submission(sender: Type[Model], instance: Submission, **kwargs: Any) -> None:
+    CachedSubmissionToken.invalidate(instance.id, modifiers=[instance.hash])
+
+def invalidate_exercise(sender: Type[Model], instance: LearningObject, **kwargs: Any) -> None:
+    CachedExerciseToken.invalidate(instance.id)
+
+
+# Automatically invalidate the resolved tokens when the objects are removed
+# or the exercise is moved.
+post_delete.connect(invalidate_submission, sender=Submission)
+post_save.connect(invalidate_exercise, sender=LearningObject)
+post_delete.connect(invalidate_exercise, sender=LearningObject)
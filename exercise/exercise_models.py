@@ -1,5 +1,6 @@
 import datetime
 import json
+import random
 from typing import Any, TYPE_CHECKING, List, Optional, Tuple
 from urllib.parse import urlsplit
 
@@ -48,6 +49,7 @@ from .cache.exercise import ExerciseCache
 from .protocol.aplus import load_exercise_page, load_feedback_page
 from .protocol.exercise_page import ExercisePage
 from .reveal_models import RevealRule
+from .submission_eligibility import SubmissionEligibility
 
 if TYPE_CHECKING:
     from django.db.models.manager import RelatedManager
@@ -333,6 +335,7 @@ class LearningObject(UrlMixin, ModelWithInheritance):
         cache = ExerciseCache(self, language, request, students, url_name, ordinal)
         page.head = cache.head()
         page.content = cache.content()
+        page.load_form_template = cache.form_template
         page.is_loaded = True
         return page
 
@@ -427,6 +430,73 @@ class LearningObjectDisplay(models.Model):
         verbose_name = _('MODEL_NAME_LEARNING_OBJECT_DISPLAY')
         verbose_name_plural = _('MODEL_NAME_LEARNING_OBJECT_DISPLAY_PLURAL')
 
+    @classmethod
+    def record(cls, learning_object: LearningObject, profile: UserProfile) -> None:
+        """
+        Records a view of a learning object. The last viewed learning object
+        of the user in the course instance is updated, if the object is
+        listed, i.e. not hidden or embedded in a chapter, and the view is
+        added to the display log depending on the
+        `LEARNING_OBJECT_DISPLAY_LOG` setting: 'all' logs every view,
+        'daily' logs the first view of each learning object by each user in
+        24 hours, 'sampled' logs a random `LEARNING_OBJECT_DISPLAY_SAMPLE_RATE`
+        fraction of the views, and 'none' logs nothing.
+        """
+        now = timezone.now()
+        if learning_object.status == LearningObject.STATUS.READY:
+            instance_id = learning_object.course_module.course_instance_id
+            updated = LastLearningObjectDisplay.objects.filter(
+                profile=profile,
+                course_instance_id=instance_id,
+            ).update(learning_object=learning_object, timestamp=now)
+            if not updated:
+                LastLearningObjectDisplay.objects.get_or_create(
+                    profile=profile,
+                    course_instance_id=instance_id,
+                    defaults={'learning_object': learning_object, 'timestamp': now},
+                )
+
+        mode = settings.LEARNING_OBJECT_DISPLAY_LOG
+        if mode == 'none':
+            return
+        if mode == 'sampled' and random.random() >= settings.LEARNING_OBJECT_DISPLAY_SAMPLE_RATE:
+            return
+        if mode == 'daily' and cls.objects.filter(
+                learning_object=learning_object,
+                profile=profile,
+                timestamp__gt=now - datetime.timedelta(days=1),
+                ).exists():
+            return
+        cls.objects.create(learning_object=learning_object, profile=profile)
+
+
+class LastLearningObjectDisplay(models.Model):
+    """
+    The learning object that a user viewed last in a course instance. Kept
+    up to date by `LearningObjectDisplay.record`, so that the last visited
+    learning object can be found without searching the display log.
+    """
+    profile = models.ForeignKey(UserProfile,
+        verbose_name=_('LABEL_PROFILE'),
+        on_delete=models.CASCADE,
+    )
+    course_instance = models.ForeignKey(CourseInstance,
+        verbose_name=_('LABEL_COURSE_INSTANCE'),
+        on_delete=models.CASCADE,
+    )
+    learning_object = DefaultForeignKey(LearningObject,
+        verbose_name=_('LABEL_LEARNING_OBJECT'),
+        on_delete=models.CASCADE,
+    )
+    timestamp = models.DateTimeField(
+        verbose_name=_('LABEL_TIMESTAMP'),
+    )
+
+    class Meta:
+        verbose_name = _('MODEL_NAME_LAST_LEARNING_OBJECT_DISPLAY')
+        verbose_name_plural = _('MODEL_NAME_LAST_LEARNING_OBJECT_DISPLAY_PLURAL')
+        unique_together = ('profile', 'course_instance')
+
 
 class CourseChapter(LearningObject):
     """
@@ -609,7 +679,7 @@ class BaseExercise(LearningObject):
             or self.default_model_solutions_reveal_rule
         )
 
-    def get_timing(self, students, when):
+    def get_timing(self, students, when, eligibility=None):
         module = self.course_module
         # Check the course instance archive time first so that submissions
         # are never accepted after it.
@@ -624,7 +694,7 @@ class BaseExercise(LearningObject):
         if module.exercises_open(when=when) or category.confirm_the_level:
             return self.TIMING.OPEN, module.closing_time
 
-        deviation = self.one_has_deadline_deviation(students)
+        deviation = self.one_has_deadline_deviation(students, eligibility)
         dl = deviation.get_new_deadline() if deviation else None
         if dl and when <= dl:
             if deviation.without_late_penalty:
@@ -654,12 +724,12 @@ class BaseExercise(LearningObject):
         delta = converted - module_close
         return delta.days * 24 * 60 + delta.seconds // 60
 
-    def one_has_access(self, students, when=None):
+    def one_has_access(self, students, when=None, eligibility=None):
         """
         Checks if any of the users can submit taking the granted extra time
         in consideration.
         """
-        timing,d = self.get_timing(students, when or timezone.now())
+        timing,d = self.get_timing(students, when or timezone.now(), eligibility)
 
         formatted_time = date_format(timezone.localtime(d), "DATETIME_FORMAT")
         if timing == self.TIMING.OPEN:
@@ -703,10 +773,14 @@ class BaseExercise(LearningObject):
             ]
         return False,["ERROR"]
 
-    def one_has_deadline_deviation(self, students):
+    def one_has_deadline_deviation(self, students, eligibility=None):
         deviation = None
         for profile in students:
-            for d in self.deadlineruledeviation_set.filter(submitter=profile):
+            if eligibility is not None:
+                deviations = eligibility.get_deadline_deviations(profile)
+            else:
+                deviations = self.deadlineruledeviation_set.filter(submitter=profile)
+            for d in deviations:
                 if not deviation\
                         or d.get_new_deadline() > deviation.get_new_deadline():
                     deviation = d
@@ -723,20 +797,30 @@ class BaseExercise(LearningObject):
             submissions = user_profile.submissions
         return submissions.filter(exercise=self)
 
-    def max_submissions_for_student(self, user_profile):
+    def max_submissions_for_student(self, user_profile, eligibility=None):
         """
         Calculates student specific max_submissions considering the possible
         MaxSubmissionsRuleDeviation for this student.
         """
-        deviation = self.maxsubmissionsruledeviation_set \
-            .filter(submitter=user_profile).first()
+        if eligibility is not None:
+            deviation = eligibility.get_max_submissions_deviation(user_profile)
+        else:
+            deviation = self.maxsubmissionsruledeviation_set \
+                .filter(submitter=user_profile).first()
         if deviation:
             return self.max_submissions + deviation.extra_submissions
         return self.max_submissions
 
-    def one_has_submissions(self, students: List[UserProfile]) -> Tuple[bool, List[str]]:
+    def one_has_submissions(
+            self,
+            students: List[UserProfile],
+            eligibility: Optional[SubmissionEligibility] = None,
+            ) -> Tuple[bool, List[str]]:
         if len(students) == 1 and self.status in (self.STATUS.ENROLLMENT, self.STATUS.ENROLLMENT_EXTERNAL):
-            enrollment = self.course_instance.get_enrollment_for(students[0].user)
+            if eligibility is not None:
+                enrollment = eligibility.get_enrollment(students[0])
+            else:
+                enrollment = self.course_instance.get_enrollment_for(students[0].user)
             if not enrollment or enrollment.status != Enrollment.ENROLLMENT_STATUS.ACTIVE:
                 return True, []
         submission_count = 0
@@ -744,8 +828,11 @@ class BaseExercise(LearningObject):
             # The students are in the same group, therefore, each student should
             # have the same submission count. However, max submission deviation
             # may be set for only one group member.
-            submission_count = self.get_submissions_for_student(profile, True).count()
-            if submission_count < self.max_submissions_for_student(profile):
+            if eligibility is not None:
+                submission_count = eligibility.get_submission_count(profile, True)
+            else:
+                submission_count = self.get_submissions_for_student(profile, True).count()
+            if submission_count < self.max_submissions_for_student(profile, eligibility):
                 return True, []
         # Even in situations where the student could otherwise make an infinite
         # number of submissions, there is still a hard limit.
@@ -787,6 +874,9 @@ class BaseExercise(LearningObject):
     def _check_submission_allowed(self, profile, request=None):
         students = [profile]
         warnings = []
+        # Load the enrollments, groups, deviations and submission counts of
+        # the user and their group members at once.
+        eligibility = SubmissionEligibility(self, profile)
 
         # Let course module settings decide submissionable state.
         #if self.course_instance.ending_time < timezone.now():
@@ -794,7 +884,7 @@ class BaseExercise(LearningObject):
         #    return False, warnings, students
 
         # Check enrollment requirements.
-        enrollment = self.course_instance.get_enrollment_for(profile.user)
+        enrollment = eligibility.get_enrollment(profile)
         if self.status in (
             LearningObject.STATUS.ENROLLMENT,
             LearningObject.STATUS.ENROLLMENT_EXTERNAL,
@@ -803,12 +893,12 @@ class BaseExercise(LearningObject):
                 return (self.SUBMIT_STATUS.CANNOT_ENROLL,
                         [_('ENROLLMENT_ERROR_ENROLLMENT_NOT_OPEN')],
                         students)
-            if not self.course_instance.is_enrollable(profile.user):
+            if not eligibility.is_enrollable(profile):
                 return (self.SUBMIT_STATUS.CANNOT_ENROLL,
                         [_('CANNOT_ENROLL_IN_COURSE')],
                         students)
         elif not enrollment or enrollment.status != Enrollment.ENROLLMENT_STATUS.ACTIVE:
-            if self.course_instance.is_course_staff(profile.user):
+            if eligibility.is_course_staff(profile):
                 return (self.SUBMIT_STATUS.ALLOWED,
                         [_('STAFF_CAN_SUBMIT_WITHOUT_ENROLLING')],
                         students)
@@ -832,25 +922,23 @@ class BaseExercise(LearningObject):
             try:
                 gid = int(group_id)
                 if gid > 0:
-                    group = profile.groups.filter(
-                        course_instance=self.course_instance,
-                        id=gid).first()
+                    group = eligibility.get_group(gid)
                     if group is None:
                         warnings.append(_('EXERCISE_WARNING_NO_GROUP_WITH_ID'))
                         return self.SUBMIT_STATUS.INVALID_GROUP, warnings, students
             except ValueError:
                 pass
         elif enrollment and enrollment.status == Enrollment.ENROLLMENT_STATUS.ACTIVE and enrollment.selected_group:
-            group = enrollment.selected_group
+            group = eligibility.get_selected_group(enrollment)
 
         if self.max_group_size > 1:
             # Check groups cannot be changed after submitting.
-            submission = self.get_submissions_for_student(profile).first()
+            submission = eligibility.latest_submission
             if submission:
                 if self._detect_group_changes(profile, group, submission):
                     msg = _('EXERCISE_WARNING_GROUP_CANNOT_CHANGE_FOR_SAME_EXERCISE_MSG')
                     warning = _('EXERCISE_WARNING_HAS_PREVIOUSLY_SUBMITTED_EXERCISE -- {with_group}, {msg}')
-                    if submission.submitters.count() == 1:
+                    if len(submission.submitters.all()) == 1:
                         warning = format_lazy(warning, with_group=_('ALONE'), msg=msg)
                     else:
                         collaborators = StudentGroup.format_collaborator_names(
@@ -860,7 +948,7 @@ class BaseExercise(LearningObject):
                     warnings.append(warning)
                     return self.SUBMIT_STATUS.INVALID_GROUP, warnings, students
 
-            elif self._detect_submissions(profile, group):
+            elif self._detect_submissions(profile, group, eligibility):
                 warnings.append(
                     format_lazy(
                         _('EXERCISE_WARNING_COLLABS_HAVE_SUBMITTED_EXERCISE_WITH_DIFF_GROUP -- {collaborators}'),
@@ -888,8 +976,8 @@ class BaseExercise(LearningObject):
         if self.status in (self.STATUS.ENROLLMENT, self.STATUS.ENROLLMENT_EXTERNAL):
             access_ok, access_warnings = True, []
         else:
-            access_ok, access_warnings = self.one_has_access(students)
-        is_staff = all(self.course_instance.is_course_staff(p.user) for p in students)
+            access_ok, access_warnings = self.one_has_access(students, eligibility=eligibility)
+        is_staff = all(eligibility.is_course_staff(p) for p in students)
         ok = (access_ok and len(warnings) == 0) or is_staff
         all_warnings = warnings + access_warnings
         if not ok:
@@ -898,7 +986,7 @@ class BaseExercise(LearningObject):
                     'EXERCISE_WARNING_CANNOT_SUBMIT_UNKNOWN_REASON'))
             return self.SUBMIT_STATUS.INVALID, all_warnings, students
 
-        submit_limit_ok, submit_limit_warnings = self.one_has_submissions(students)
+        submit_limit_ok, submit_limit_warnings = self.one_has_submissions(students, eligibility)
         if not submit_limit_ok and not is_staff:
             # access_warnings are not needed here
             return (self.SUBMIT_STATUS.AMOUNT_EXCEEDED,
@@ -914,10 +1002,10 @@ class BaseExercise(LearningObject):
         else:
             return len(submitters) > 1 or submitters[0] != profile
 
-    def _detect_submissions(self, profile, group):
+    def _detect_submissions(self, profile, group, eligibility):
         if group:
             return not all((
-                len(self.get_submissions_for_student(p)) == 0
+                eligibility.get_submission_count(p) == 0
                 for p in group.members.all() if p != profile
             ))
         return False
@@ -0,0 +1,37 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from lib.cache.metrics import get_sink, render_prometheus
+
+
+class Command(BaseCommand):
+    help = (
+        "Prints a snapshot of the cache metrics. The snapshot includes the "
+        "metrics of other processes only if CACHE_METRICS_SINK publishes "
+        "them to the cache, e.g. lib.cache.metrics.SharedSink."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-f',
+            '--format',
+            choices=('prometheus', 'json'),
+            default='prometheus',
+            help="Output format (default: prometheus)",
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help="Clear the metrics after printing them",
+        )
+
+    def handle(self, *args, **options):
+        sink = get_sink()
+        snapshot = sink.snapshot()
+        if options['format'] == 'json':
+            self.stdout.write(json.dumps(snapshot, indent=2, sort_keys=True))
+        else:
+            self.stdout.write(render_prometheus(snapshot), ending='')
+        if options['reset']:
+            sink.reset()
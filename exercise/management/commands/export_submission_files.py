@@ -0,0 +1,107 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from course.models import CourseInstance
+from exercise.api.csv.submission_sheet import filter_best_submissions
+from exercise.cache.content import CachedContent
+from exercise.cache.hierarchy import NoSuchContent
+from ...models import Submission
+from ...submission_archive import submission_files_archive
+
+
+class Command(BaseCommand):
+    help = (
+        'Exports the files submitted by the students of a course instance into a ZIP archive. '
+        'The archive is written while the files are read, so it is not staged in memory.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'course_instance_id',
+            type=int,
+            help='Course instance id (from model CourseInstance) whose submitted files are exported',
+        )
+        parser.add_argument(
+            'output',
+            help='The ZIP archive is written to this file. The file is created or overwritten. '
+                 'Use "-" for the standard output.',
+        )
+        parser.add_argument(
+            '-n',
+            '--number',
+            help='Include only the exercises under this number, e.g. "3" or "3.2.1".',
+        )
+        parser.add_argument(
+            '-c',
+            '--category-id',
+            type=int,
+            help='Include only the exercises in this category.',
+        )
+        parser.add_argument(
+            '-m',
+            '--module-id',
+            type=int,
+            help='Include only the exercises in this module.',
+        )
+        parser.add_argument(
+            '-e',
+            '--exercise-id',
+            type=int,
+            help='Include only this exercise.',
+        )
+        parser.add_argument(
+            '-a',
+            '--all-submissions',
+            action='store_true',
+            help='Include all submissions instead of the best submission of each student.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            instance = CourseInstance.objects.get(id=options['course_instance_id'])
+        except CourseInstance.DoesNotExist as e:
+            raise CommandError('The course instance does not exist.') from e
+
+        content = CachedContent(instance)
+        try:
+            exercises = content.search_exercises(
+                number=options['number'],
+                category_id=options['category_id'],
+                module_id=options['module_id'],
+                exercise_id=options['exercise_id'],
+                raise_404=False,
+            )
+        except NoSuchContent as e:
+            raise CommandError('No exercises match the given options.') from e
+
+        ids = [e['id'] for e in exercises]
+        submissions = list(
+            Submission.objects
+            .filter(exercise_id__in=ids, submitters__in=instance.students)
+            .distinct()
+            .prefetch_related('exercise', 'submitters', 'files')
+            .order_by('exercise_id', 'id')
+        )
+        if not options['all_submissions']:
+            # The course staff sees the grades of all exercises.
+            submissions = filter_best_submissions(submissions, set(ids))
+        archive = submission_files_archive(submissions)
+
+        if options['output'] == '-':
+            self.write_archive(sys.stdout.buffer, archive)
+        else:
+            try:
+                with open(options['output'], 'wb') as f:
+                    self.write_archive(f, archive)
+            except OSError as e:
+                raise CommandError(f'Error in writing the file "{options["output"]}".') from e
+            self.stdout.write('Exported {:d} files ({:d} bytes) into {}'.format(
+                len(archive.entries),
+                archive.size,
+                options['output'],
+            ))
+
+    def write_archive(self, f, archive):
+        for chunk in archive.iter_range():
+            f.write(chunk)
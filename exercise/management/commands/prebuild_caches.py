@@ -0,0 +1,51 @@
+import datetime
+from time import sleep
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from course.models import CourseInstance
+from ...cache.prebuild import find_upcoming_reveals, prebuild_points
+
+
+class Command(BaseCommand):
+    help = (
+        "Prebuilds the cached points of the students whose submission "
+        "feedback is revealed in the near future. Production setups should "
+        "use CACHE_PREBUILD_SCHEDULE instead, which runs this in Celery."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-a',
+            '--ahead',
+            type=int,
+            default=settings.CACHE_PREBUILD_AHEAD,
+            help="How many seconds ahead to look for reveal times",
+        )
+        parser.add_argument(
+            '-l',
+            '--loop',
+            type=int,
+            metavar='SECONDS',
+            help="Keep running and look for reveal times every SECONDS seconds",
+        )
+
+    def handle(self, *args, **options):
+        ahead = datetime.timedelta(seconds=options['ahead'])
+        done = set()
+        while True:
+            now = timezone.now()
+            for instance_id, moments in find_upcoming_reveals(now, now + ahead).items():
+                instance = CourseInstance.objects.get(pk=instance_id)
+                for when, exercise_ids in moments.items():
+                    if (instance_id, when) in done:
+                        continue
+                    count = prebuild_points(instance, exercise_ids, when)
+                    done.add((instance_id, when))
+                    self.stdout.write("{}: prebuilt {:d} cached points for {}".format(instance, count, when))
+            if not options['loop']:
+                break
+            done = {(i, when) for i, when in done if when > now}
+            sleep(options['loop'])
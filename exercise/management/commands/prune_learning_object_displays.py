@@ -0,0 +1,57 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from ...models import LearningObjectDisplay
+
+
+class Command(BaseCommand):
+    help = (
+        'Deletes learning object displays that are older than the given number of days. '
+        'The displays are deleted in batches to avoid locking the table for a long time. '
+        'The last viewed learning objects of the users are not affected.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'days',
+            type=int,
+            help='Displays older than this many days are deleted',
+        )
+        parser.add_argument(
+            '-b',
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Number of displays deleted in one query (default: 10000)',
+        )
+        parser.add_argument(
+            '-s',
+            '--sleep',
+            type=float,
+            default=0.0,
+            help='Seconds to wait between the batches (default: 0)',
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError('The number of days may not be negative.')
+        if options['batch_size'] < 1:
+            raise CommandError('The batch size must be positive.')
+
+        before = timezone.now() - timedelta(days=options['days'])
+        old_displays = LearningObjectDisplay.objects.filter(timestamp__lt=before)
+        total = 0
+        while True:
+            ids = list(old_displays.order_by('id').values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            deleted, _ = LearningObjectDisplay.objects.filter(id__in=ids).delete()
+            total += deleted
+            if options['verbosity'] > 1:
+                self.stdout.write('Deleted {} displays'.format(total))
+            if options['sleep']:
+                time.sleep(options['sleep'])
+        self.stdout.write('Deleted {} learning object displays older than {}.'.format(total, before))
@@ -0,0 +1,65 @@
+from django.db import migrations, models
+import django.db.models.deletion
+import lib.fields
+
+
+def fill_last_displays(apps, schema_editor):
+    # The last display of each user in each course instance is the one with
+    # the largest id. Only the displays of listed learning objects are
+    # recorded, like in LearningObjectDisplay.record.
+    LearningObjectDisplay = apps.get_model('exercise', 'LearningObjectDisplay')
+    LastLearningObjectDisplay = apps.get_model('exercise', 'LastLearningObjectDisplay')
+    last_ids = (
+        LearningObjectDisplay.objects
+        .filter(learning_object__status='ready')
+        .order_by()
+        .values('profile_id', 'learning_object__course_module__course_instance_id')
+        .annotate(last_id=models.Max('id'))
+        .values('last_id')
+    )
+    displays = (
+        LearningObjectDisplay.objects
+        .filter(id__in=models.Subquery(last_ids))
+        .order_by()
+        .values_list('profile_id', 'learning_object__course_module__course_instance_id', 'learning_object_id', 'timestamp')
+    )
+    batch = []
+    for profile_id, instance_id, learning_object_id, timestamp in displays.iterator(chunk_size=10000):
+        batch.append(LastLearningObjectDisplay(
+            profile_id=profile_id,
+            course_instance_id=instance_id,
+            learning_object_id=learning_object_id,
+            timestamp=timestamp,
+        ))
+        if len(batch) >= 1000:
+            LastLearningObjectDisplay.objects.bulk_create(batch)
+            batch = []
+    LastLearningObjectDisplay.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userprofile', '0006_auto_20210812_1536'),
+        ('course', '0054_courseinstance_sis_enroll'),
+        ('exercise', '0045_auto_20220211_1540'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LastLearningObjectDisplay',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(verbose_name='LABEL_TIMESTAMP')),
+                ('course_instance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='course.courseinstance', verbose_name='LABEL_COURSE_INSTANCE')),
+                ('learning_object', lib.fields.DefaultForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exercise.learningobject', verbose_name='LABEL_LEARNING_OBJECT')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='userprofile.userprofile', verbose_name='LABEL_PROFILE')),
+            ],
+            options={
+                'verbose_name': 'MODEL_NAME_LAST_LEARNING_OBJECT_DISPLAY',
+                'verbose_name_plural': 'MODEL_NAME_LAST_LEARNING_OBJECT_DISPLAY_PLURAL',
+                'unique_together': {('profile', 'course_instance')},
+            },
+        ),
+        migrations.RunPython(fill_last_displays, migrations.RunPython.noop),
+    ]
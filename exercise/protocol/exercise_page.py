@@ -1,8 +1,28 @@
-from typing import Dict, List, Optional, cast
+from typing import Callable, Dict, List, Optional, TYPE_CHECKING, cast
 
 from bs4 import BeautifulSoup
 from bs4.element import NavigableString, Tag
 
+if TYPE_CHECKING:
+    from .form_template import FormTemplate
+
+
+def find_exercise_element(soup: BeautifulSoup) -> Optional[Tag]:
+    """
+    Finds the element that contains the exercise content. Returns `None` if
+    not found.
+    """
+    # The exercise content element may be identified by a number of
+    # different ids or classes
+    exercise_element = soup.find(id=['exercise', 'aplus', 'chapter'])
+    if not isinstance(exercise_element, Tag):
+        exercise_element = soup.find({'class': 'entry-content'})
+    if not isinstance(exercise_element, Tag):
+        exercise_element = soup.body
+
+    return exercise_element
+
+
 class ExercisePage:
     """
     Represents the pages that are received from exercise services as objects.
@@ -29,6 +49,8 @@ class ExercisePage:
             "description": exercise.description
         }
         self.errors = []
+        # Returns a FormTemplate of the content, see populate_form.
+        self.load_form_template: Optional[Callable[[], Optional['FormTemplate']]] = None
 
     def is_sane(self):
         """
@@ -49,7 +71,17 @@ class ExercisePage:
         its HTML. `field_values` are inserted into the form input fields.
         `data_values` are inserted into `data` attributes in the form element.
         If `allow_submit` is `False`, the submit button is hidden.
+
+        If the content has a precompiled form template, the values are filled
+        in the template instead of parsing the content.
         """
+        form_template = self.load_form_template() if self.load_form_template else None
+        if form_template is not None:
+            content = form_template.render(field_values, data_values, allow_submit)
+            if content is not None:
+                self.content = content
+            return
+
         soup = BeautifulSoup(self.content, 'html5lib')
 
         exercise_element = self._find_exercise_element(soup)
@@ -71,15 +103,7 @@ class ExercisePage:
         Finds the element that contains the exercise content. Returns `None` if
         not found.
         """
-        # The exercise content element may be identified by a number of
-        # different ids or classes
-        exercise_element = soup.find(id=['exercise', 'aplus', 'chapter'])
-        if not isinstance(exercise_element, Tag):
-            exercise_element = soup.find({'class': 'entry-content'})
-        if not isinstance(exercise_element, Tag):
-            exercise_element = soup.body
-
-        return exercise_element
+        return find_exercise_element(soup)
 
     def _populate_fields(self, form_element: Tag, field_values: Dict[str, List[str]]) -> None:
         """
@@ -0,0 +1,218 @@
+"""
+Precompiled exercise forms for filling in the values of previous submissions
+and drafts.
+
+`ExercisePage.populate_form` parses the exercise page and modifies the form
+elements in the parsed tree. `FormTemplate` does the parsing once: the
+exercise element is serialized into static strings and slots, which are the
+elements that `populate_form` may modify, i.e. the forms, the form fields, the
+options of the select fields and the submit buttons. Rendering the template
+only renders the start tags of the slots, so it is string concatenation
+instead of parsing. The result is the same as that of `populate_form`.
+"""
+import re
+import uuid
+from typing import Any, Dict, List, Optional, Union
+
+from bs4 import BeautifulSoup
+from bs4.element import NavigableString, Tag
+from bs4.formatter import HTMLFormatter
+
+from .exercise_page import find_exercise_element
+
+# The formatter that str(tag) uses.
+FORMATTER = HTMLFormatter.REGISTRY['minimal']
+
+Part = Union[str, 'Slot']
+
+
+def render_start_tag(name: str, attrs: Dict[str, Optional[str]], void: bool) -> str:
+    """
+    Renders the start tag in the same way as Beautiful Soup.
+    """
+    rendered = [name]
+    for key, value in sorted(attrs.items()):
+        if value is None:
+            rendered.append(key)
+        else:
+            rendered.append(key + '=' + FORMATTER.quoted_attribute_value(FORMATTER.attribute_value(value)))
+    return '<{}{}>'.format(' '.join(rendered), (FORMATTER.void_element_close_prefix or '') if void else '')
+
+
+class Slot:
+    """
+    An element of the exercise form whose start tag or content may change.
+    `kind` is one of 'form', 'value', 'check', 'option', 'textarea' and
+    'button', and `field` is the name of the form field that sets the value
+    of the element.
+    """
+    __slots__ = ('kind', 'field', 'name', 'attrs', 'void', 'submit', 'start', 'children')
+
+    def __init__(self, kind: str, field: Optional[str], tag: Tag) -> None:
+        self.kind = kind
+        self.field = field
+        self.name = tag.name
+        self.attrs = {
+            key: ' '.join(value) if isinstance(value, (list, tuple)) else value
+            for key, value in tag.attrs.items()
+        }
+        self.void = tag.is_empty_element
+        self.submit = False
+        self.start = render_start_tag(self.name, self.attrs, self.void)
+        self.children: List[Part] = []
+
+    def __getstate__(self) -> tuple:
+        return tuple(getattr(self, key) for key in self.__slots__)
+
+    def __setstate__(self, state: tuple) -> None:
+        for key, value in zip(self.__slots__, state):
+            setattr(self, key, value)
+
+
+class FormTemplate:
+    """
+    The exercise element of an exercise page split into strings and slots.
+    `parts` is None, if the page has no exercise element.
+    """
+    def __init__(self, parts: Optional[List[Part]]) -> None:
+        self.parts = parts
+
+    @classmethod
+    def compile(cls, content: str) -> 'FormTemplate':
+        soup = BeautifulSoup(content, 'html5lib')
+        exercise_element = find_exercise_element(soup)
+        if exercise_element is None:
+            return cls(None)
+
+        slots: Dict[int, Slot] = {}
+        def add_slot(kind: str, field: Optional[str], tag: Tag) -> Slot:
+            slot = slots.get(id(tag))
+            if slot is None:
+                slot = slots[id(tag)] = Slot(kind, field, tag)
+            return slot
+
+        # The same elements as in ExercisePage.populate_form.
+        tags: Dict[int, Tag] = {}
+        for form_element in exercise_element.find_all('form'):
+            add_slot('form', None, form_element)
+            tags[id(form_element)] = form_element
+            for field_element in form_element.find_all(['input', 'select', 'textarea']):
+                field_name = field_element.get('name')
+                if not isinstance(field_name, str):
+                    continue
+                if field_element.name == 'input':
+                    kind = 'check' if field_element.get('type') in ('radio', 'checkbox') else 'value'
+                    add_slot(kind, field_name, field_element)
+                    tags[id(field_element)] = field_element
+                elif field_element.name == 'select':
+                    for option_element in field_element.find_all('option'):
+                        add_slot('option', field_name, option_element)
+                        tags[id(option_element)] = option_element
+                elif field_element.name == 'textarea':
+                    add_slot('textarea', field_name, field_element)
+                    tags[id(field_element)] = field_element
+            for submit_element in form_element.find_all(['input', 'button'], type='submit'):
+                add_slot('button', None, submit_element).submit = True
+                tags[id(submit_element)] = submit_element
+
+        # Mark the slots in the serialized element: the start tags have a
+        # marker attribute and the elements end with a marker string.
+        marker = 'data-aplus-slot-' + uuid.uuid4().hex
+        end_marker = '\ue000' + marker
+        numbered: List[Slot] = []
+        for key, slot in slots.items():
+            tag = tags[key]
+            tag[marker] = str(len(numbered))
+            if not slot.void:
+                tag.append(NavigableString('{}:{:d}'.format(end_marker, len(numbered))))
+            numbered.append(slot)
+        html = str(exercise_element)
+
+        pattern = re.compile(r'(<[^<>]* {}="(\d+)"[^<>]*>)|{}:(\d+)'.format(
+            re.escape(marker), re.escape(end_marker),
+        ))
+        root: List[Part] = []
+        stack = [(None, root)]
+        position = 0
+        for match in pattern.finditer(html):
+            parts = stack[-1][1]
+            if match.start() > position:
+                parts.append(html[position:match.start()])
+            position = match.end()
+            if match.group(1):
+                slot = numbered[int(match.group(2))]
+                if slot.void:
+                    parts.append(slot)
+                else:
+                    stack.append((slot, slot.children))
+            else:
+                slot = numbered[int(match.group(3))]
+                end_tag = '</{}>'.format(slot.name)
+                if stack[-1][0] is not slot or not html.startswith(end_tag, position):
+                    raise ValueError("The form slots are not nested correctly")
+                stack.pop()
+                stack[-1][1].append(slot)
+                position += len(end_tag)
+        if len(stack) > 1:
+            raise ValueError("The form slots are not nested correctly")
+        if position < len(html):
+            root.append(html[position:])
+        return cls(root)
+
+    def render(
+            self,
+            field_values: Optional[Dict[str, List[str]]] = None,
+            data_values: Optional[Dict[str, str]] = None,
+            allow_submit: bool = True,
+            ) -> Optional[str]:
+        """
+        Returns the exercise element with the values filled in, see
+        `ExercisePage.populate_form`. Returns None, if the page has no
+        exercise element, in which case the page is not modified.
+        """
+        if self.parts is None:
+            return None
+        out: List[str] = []
+        self._render(self.parts, out, field_values or {}, data_values, allow_submit)
+        return ''.join(out)
+
+    def _render(
+            self,
+            parts: List[Part],
+            out: List[str],
+            field_values: Dict[str, List[str]],
+            data_values: Optional[Dict[str, str]],
+            allow_submit: bool,
+            ) -> None:
+        for part in parts:
+            if isinstance(part, str):
+                out.append(part)
+                continue
+            if part.submit and not allow_submit:
+                continue
+            attrs: Optional[Dict[str, Any]] = None
+            values = field_values.get(part.field) if part.field is not None else None
+            if part.kind == 'form':
+                if data_values:
+                    attrs = dict(part.attrs)
+                    for data_key, data_value in data_values.items():
+                        attrs[f'data-{data_key}'] = data_value
+            elif values is not None:
+                if part.kind == 'value':
+                    attrs = dict(part.attrs, value=values[0])
+                elif part.kind in ('check', 'option'):
+                    attribute = 'checked' if part.kind == 'check' else 'selected'
+                    attrs = dict(part.attrs)
+                    if attrs.get('value') in values:
+                        attrs[attribute] = ''
+                    else:
+                        attrs.pop(attribute, None)
+                elif part.kind == 'textarea':
+                    out.append(part.start)
+                    out.append(FORMATTER.substitute(values[0]))
+                    out.append('</textarea>')
+                    continue
+            out.append(part.start if attrs is None else render_start_tag(part.name, attrs, part.void))
+            if not part.void:
+                self._render(part.children, out, field_values, data_values, allow_submit)
+                out.append('</{}>'.format(part.name))
@@ -3,7 +3,8 @@ from typing import Any, Dict, List, Optional, overload, Union
 
 from django.contrib.auth.models import User
 
-from deviations.models import DeadlineRuleDeviation
+from course.models import CourseModule
+
 from .exercise_models import BaseExercise
 
 
@@ -36,33 +37,43 @@ class ExerciseRevealState(BaseRevealState):
     """
     BaseRevealState implementation for BaseExercise. Most of the data is
     retrieved from the CachedPoints cache.
+
+    The largest deadline extensions of the exercises in the course are needed
+    for the latest deadline. `max_deviations` maps exercise ids to the extra
+    minutes. If it is not given, it is read from CachedMaxDeadlineDeviations.
     """
     @overload
     def __init__(self, exercise: BaseExercise, student: User): ...
     @overload
-    def __init__(self, exercise: Dict[str, Any]): ...
+    def __init__(self, exercise: Dict[str, Any], max_deviations: Optional[Dict[int, int]] = None): ...
     def __init__(
             self,
             exercise: Union[BaseExercise, Dict[str, Any]],
-            student: Optional[User] = None
+            student: Optional[User] = None,
+            max_deviations: Optional[Dict[int, int]] = None,
             ):
         # Can be constructed either with a BaseExercise instance or a
         # CachedPoints exercise entry. If a BaseExercise is provided, the
         # cache entry is fetched here.
+        self.course_instance = None
         if isinstance(exercise, BaseExercise):
             from .cache.content import CachedContent
             from .cache.points import CachedPoints
+            self.course_instance = exercise.course_instance
             cached_content = CachedContent(exercise.course_instance)
             # 'True' is always passed to CachedPoints as the is_staff argument
             # because we need to know the actual points.
-            cached_points = CachedPoints(exercise.course_instance, student, cached_content, True)
-            entry,_,_,_ = cached_points.find(exercise)
-            self.cache = entry
+            self.cache = CachedPoints.find_entry(
+                exercise.course_instance,
+                student,
+                cached_content,
+                exercise,
+                True,
+            )
         else:
             self.cache = exercise
 
-        self.max_deviation_fetched: bool = False
-        self.max_deviation: Optional[DeadlineRuleDeviation] = None
+        self.max_deviations = max_deviations
 
     def get_points(self) -> Optional[int]:
         return self.cache['points']
@@ -88,19 +99,18 @@ class ExerciseRevealState(BaseRevealState):
 
     def get_latest_deadline(self) -> Optional[datetime.datetime]:
         deadlines = self._get_common_deadlines()
-        # This is the only thing that we don't get from CachedPoints. It is
-        # cached within this object, though, so it won't have to be fetched
-        # again if RevealRule.is_revealed and RevealRule.get_reveal_time are
-        # called separately.
-        if not self.max_deviation_fetched:
-            self.max_deviation = (
-                DeadlineRuleDeviation.objects
-                .filter(exercise_id=self.cache['id'])
-                .order_by('-extra_minutes').first()
-            )
-            self.max_deviation_fetched = True
-        if self.max_deviation is not None:
-            deadlines.append(self.max_deviation.get_new_deadline(self.cache['closing_time']))
+        # This is the only thing that we don't get from CachedPoints. The
+        # extensions of the whole course are cached, so that the reveal rules
+        # of all exercises can be evaluated without queries.
+        if self.max_deviations is None:
+            from .cache.deviations import CachedMaxDeadlineDeviations
+            course_instance = self.course_instance
+            if course_instance is None:
+                course_instance = CourseModule.objects.get(id=self.cache['module_id']).course_instance_id
+            self.max_deviations = CachedMaxDeadlineDeviations(course_instance).data
+        extra_minutes = self.max_deviations.get(self.cache['id'])
+        if extra_minutes is not None:
+            deadlines.append(self.cache['closing_time'] + datetime.timedelta(minutes=extra_minutes))
         return max(deadlines)
 
     def _get_common_deadlines(self) -> List[datetime.datetime]:
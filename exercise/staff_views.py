@@ -148,8 +148,8 @@ class InspectSubmitterView(ExerciseBaseView, BaseRedirectView):
         )
 
         # Find the submitter's best submission using the cache.
-        cache = CachedPoints(self.instance, user, self.content, True)
-        ids = cache.submission_ids(exercise_id=self.exercise.id, best=True, fallback_to_last=True)
+        entry = CachedPoints.find_entry(self.instance, user, self.content, self.exercise, True)
+        ids = CachedPoints.entry_submission_ids(entry, best=True, fallback_to_last=True)
         if not ids:
             raise Http404()
         del kwargs['user_id']
@@ -361,8 +361,8 @@ class NextUnassessedSubmitterView(ExerciseBaseView, BaseRedirectView):
             return self.redirect(self.exercise.get_submission_list_url())
 
         # Find the submitter's best submission using the cache.
-        cache = CachedPoints(self.instance, submitter.user, self.content, True)
-        ids = cache.submission_ids(exercise_id=self.exercise.id, best=True, fallback_to_last=True)
+        entry = CachedPoints.find_entry(self.instance, submitter.user, self.content, self.exercise, True)
+        ids = CachedPoints.entry_submission_ids(entry, best=True, fallback_to_last=True)
         if not ids:
             raise Http404()
         url = reverse(
@@ -0,0 +1,42 @@
+from typing import Iterable, List
+
+from django.utils import timezone
+
+from lib.zipstream import StreamedZip, ZipEntry
+from .submission_models import Submission, SubmittedFile
+
+
+def _opener(sfile: SubmittedFile):
+    return lambda: sfile.file_object.open('rb')
+
+
+def submission_files_archive(submissions: Iterable[Submission]) -> StreamedZip:
+    """
+    Returns a streamed ZIP archive of the files of the submissions. The files
+    are stored as exercise_<id>/submission_<id>_users_<ids>/<file name>, and
+    the entries are ordered by the exercise and the submission, so the same
+    submissions always produce the same archive. Files that are missing from
+    the disk are left out.
+
+    The submitters and the files of the submissions should be prefetched.
+    """
+    entries: List[ZipEntry] = []
+    for submission in sorted(submissions, key=lambda s: (s.exercise_id, s.id)):
+        directory = 'exercise_{:d}/submission_{:d}_users_{}'.format(
+            submission.exercise_id,
+            submission.id,
+            '-'.join(str(profile.user_id) for profile in sorted(submission.submitters.all(), key=lambda p: p.user_id)),
+        )
+        date_time = timezone.localtime(submission.submission_time).replace(tzinfo=None)
+        for sfile in sorted(submission.files.all(), key=lambda f: f.id):
+            try:
+                size = sfile.file_object.size
+            except OSError:
+                continue
+            entries.append(ZipEntry(
+                '{}/{}'.format(directory, sfile.filename),
+                size,
+                date_time,
+                _opener(sfile),
+            ))
+    return StreamedZip(entries)
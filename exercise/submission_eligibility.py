@@ -0,0 +1,158 @@
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+from django.db.models import Count, Prefetch, Q
+
+from course.models import Enrollment, StudentGroup
+from userprofile.models import UserProfile
+
+if TYPE_CHECKING:
+    from deviations.models import DeadlineRuleDeviation, MaxSubmissionsRuleDeviation
+    from .exercise_models import BaseExercise
+    from .submission_models import Submission
+
+
+class SubmissionEligibility(object):
+    """
+    SubmissionEligibility loads everything that is needed for checking
+    whether a user may submit to an exercise: the groups of the user, and the
+    enrollments, deviations and submission counts of the user and every
+    member of those groups. The data is loaded with a fixed number of queries,
+    regardless of the group sizes, and the submission rules in
+    `BaseExercise.check_submission_allowed` are evaluated against it.
+    """
+    def __init__(self, exercise: 'BaseExercise', profile: UserProfile) -> None:
+        from .submission_models import Submission
+
+        self.exercise = exercise
+        self.profile = profile
+        instance = exercise.course_instance
+
+        # The groups of the user and the group selected in the enrollment of
+        # the user, even if the user is no longer its member.
+        members = Prefetch('members', queryset=UserProfile.objects.select_related('user'))
+        self.groups: Dict[int, StudentGroup] = {
+            group.id: group
+            for group in StudentGroup.objects
+                .filter(
+                    Q(members=profile) | Q(enrollment__user_profile=profile),
+                    course_instance=instance,
+                )
+                .distinct()
+                .prefetch_related(None)
+                .prefetch_related(members)
+        }
+
+        profile_ids = {profile.id}
+        for group in self.groups.values():
+            profile_ids.update(p.id for p in group.members.all())
+
+        self.enrollments: Dict[int, Enrollment] = {
+            enrollment.user_profile_id: enrollment
+            for enrollment in Enrollment.objects.filter(
+                course_instance=instance,
+                user_profile_id__in=profile_ids,
+            )
+        }
+
+        self.deadline_deviations: Dict[int, List['DeadlineRuleDeviation']] = {}
+        for deviation in exercise.deadlineruledeviation_set.filter(submitter_id__in=profile_ids):
+            # Avoid querying the exercise again when the new deadline is calculated.
+            deviation.exercise = exercise
+            self.deadline_deviations.setdefault(deviation.submitter_id, []).append(deviation)
+
+        self.max_submissions_deviations: Dict[int, 'MaxSubmissionsRuleDeviation'] = {
+            deviation.submitter_id: deviation
+            for deviation in exercise.maxsubmissionsruledeviation_set.filter(submitter_id__in=profile_ids)
+        }
+
+        self.submission_counts: Dict[int, int] = {}
+        self.submission_counts_without_errors: Dict[int, int] = {}
+        for row in (
+                Submission.objects
+                .filter(exercise=exercise, submitters__in=profile_ids)
+                .order_by()
+                .values('submitters')
+                .annotate(
+                    count=Count('id'),
+                    count_without_errors=Count('id', filter=~Q(status__in=(
+                        Submission.STATUS.ERROR,
+                        Submission.STATUS.REJECTED,
+                    ))),
+                )
+                ):
+            self.submission_counts[row['submitters']] = row['count']
+            self.submission_counts_without_errors[row['submitters']] = row['count_without_errors']
+
+        # The latest submission of the user is needed for detecting whether
+        # the group has changed since the user last submitted.
+        self.latest_submission: Optional['Submission'] = None
+        if exercise.max_group_size > 1 and self.submission_counts.get(profile.id):
+            self.latest_submission = (
+                Submission.objects
+                .filter(exercise=exercise, submitters=profile)
+                .prefetch_related(Prefetch('submitters', queryset=UserProfile.objects.select_related('user')))
+                .first()
+            )
+
+    def get_enrollment(self, profile: UserProfile) -> Optional[Enrollment]:
+        return self.enrollments.get(profile.id)
+
+    def get_group(self, group_id: int) -> Optional[StudentGroup]:
+        """
+        Returns the group of the user with the given id, or None if the user
+        is not a member of such a group in the course.
+        """
+        group = self.groups.get(group_id)
+        if group is None or self.profile not in group.members.all():
+            return None
+        return group
+
+    def get_selected_group(self, enrollment: Enrollment) -> Optional[StudentGroup]:
+        if enrollment.selected_group_id is None:
+            return None
+        return self.groups.get(enrollment.selected_group_id)
+
+    def is_course_staff(self, profile: UserProfile) -> bool:
+        """
+        Same as `CourseInstance.is_course_staff` for the loaded users.
+        """
+        if profile.user.is_superuser:
+            return True
+        enrollment = self.enrollments.get(profile.id)
+        return bool(
+            enrollment
+            and enrollment.status == Enrollment.ENROLLMENT_STATUS.ACTIVE
+            and enrollment.role in (
+                Enrollment.ENROLLMENT_ROLE.TEACHER,
+                Enrollment.ENROLLMENT_ROLE.ASSISTANT,
+            )
+        )
+
+    def is_enrollable(self, profile: UserProfile) -> bool:
+        """
+        Same as `CourseInstance.is_enrollable` for the loaded users.
+        """
+        if self.is_course_staff(profile):
+            return True
+        enrollment = self.enrollments.get(profile.id)
+        if enrollment and enrollment.status == Enrollment.ENROLLMENT_STATUS.BANNED:
+            return False
+        instance = self.exercise.course_instance
+        if instance.visible_to_students:
+            if instance.enrollment_audience == instance.ENROLLMENT_AUDIENCE.INTERNAL_USERS:
+                return not profile.is_external
+            if instance.enrollment_audience == instance.ENROLLMENT_AUDIENCE.EXTERNAL_USERS:
+                return profile.is_external
+            return True
+        return False
+
+    def get_deadline_deviations(self, profile: UserProfile) -> List['DeadlineRuleDeviation']:
+        return self.deadline_deviations.get(profile.id, [])
+
+    def get_max_submissions_deviation(self, profile: UserProfile) -> Optional['MaxSubmissionsRuleDeviation']:
+        return self.max_submissions_deviations.get(profile.id)
+
+    def get_submission_count(self, profile: UserProfile, exclude_errors: bool = False) -> int:
+        if exclude_errors:
+            return self.submission_counts_without_errors.get(profile.id, 0)
+        return self.submission_counts.get(profile.id, 0)
@@ -341,12 +341,16 @@ class Submission(UrlMixin, models.Model):
 
         @param files: a QueryDict containing files from a POST request
         """
+        # The uploads are kept for sending them to the grader, see
+        # get_post_parameters.
+        self._uploads = {}
         for key in files:
             for uploaded_file in files.getlist(key):
-                self.files.create(
+                submitted_file = self.files.create(
                     file_object=uploaded_file,
                     param_name=key,
                 )
+                self._uploads[submitted_file.id] = uploaded_file
 
     def load(self, request: HttpRequest, allow_submit: bool = True) -> ExercisePage:
         """
@@ -384,11 +388,22 @@ class Submission(UrlMixin, models.Model):
             self._data = {}
 
         self._files = {}
+        self._forwarded_uploads = []
+        uploads = getattr(self, '_uploads', {}) if settings.EXERCISE_FORWARD_UPLOADS else {}
         for file in self.files.all().order_by("id"):
+            upload = uploads.get(file.id)
+            if upload is not None:
+                # The file was uploaded in this request, so it is sent from
+                # the upload instead of reading the stored copy.
+                upload.seek(0)
+                content = upload
+                self._forwarded_uploads.append(upload)
+            else:
+                content = open(file.file_object.path, "rb")
             # Requests supports only one file per name in a multipart post.
             self._files[file.param_name] = (
                 file.filename,
-                open(file.file_object.path, "rb")
+                content
             )
 
         students = list(self.submitters.all())
@@ -402,7 +417,11 @@ class Submission(UrlMixin, models.Model):
 
     def clean_post_parameters(self):
         for key in self._files.keys():
-            self._files[key][1].close()
+            file = self._files[key][1]
+            # Django closes the uploads at the end of the request.
+            if not any(file is upload for upload in self._forwarded_uploads):
+                file.close()
+        del self._forwarded_uploads
         del self._files
         del self._data
 
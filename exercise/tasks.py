@@ -1,7 +1,15 @@
+import datetime
 import logging
 from time import sleep
+from typing import List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
 
 from aplus.celery import app
+from course.models import CourseInstance
+from .cache.prebuild import find_upcoming_reveals, prebuild_points
 from .exercise_models import BaseExercise, ExerciseTask
 from .submission_models import Submission
 
@@ -52,3 +60,31 @@ def regrade_exercises(self, exerciseid: int, regrade_type: str) -> None:
             exercise.id)
         return
     task.delete()
+
+
+@app.task
+def prebuild_caches() -> None:
+    """
+    Finds the reveal times in the next `CACHE_PREBUILD_AHEAD` seconds and
+    schedules the prebuilding of the affected cached points.
+    """
+    now = timezone.now()
+    ahead = settings.CACHE_PREBUILD_AHEAD
+    reveals = find_upcoming_reveals(now, now + datetime.timedelta(seconds=ahead))
+    for instance_id, moments in reveals.items():
+        for when, exercise_ids in moments.items():
+            # The same reveal time is found by consecutive runs.
+            key = 'prebuild:{:d}:{}'.format(instance_id, when.isoformat())
+            if cache.add(key, True, 2 * ahead):
+                prebuild_course_points.delay(instance_id, exercise_ids, when.isoformat())
+
+
+@app.task
+def prebuild_course_points(instance_id: int, exercise_ids: List[int], when: str) -> None:
+    try:
+        instance = CourseInstance.objects.get(pk=instance_id)
+    except CourseInstance.DoesNotExist:
+        logger.warning("prebuild_course_points task: course instance id %s not found", instance_id)
+        return
+    prebuild_points(instance, exercise_ids, datetime.datetime.fromisoformat(when))
+
@@ -4,7 +4,6 @@ from typing import Any, Dict, Optional, Tuple, Union
 
 from django import template
 from django.contrib.auth.models import User
-from django.db import models
 from django.template.context import Context
 from django.template.loader import render_to_string
 from django.utils import timezone
@@ -12,13 +11,14 @@ from django.utils.formats import date_format
 from django.utils.text import format_lazy
 from django.utils.translation import gettext_lazy as _
 
-from course.models import CourseModule
 from lib.errors import TagUsageError
 from lib.helpers import format_points as _format_points
+from threshold.models import are_requirements_passed
 from ..cache.content import CachedContent
 from ..cache.points import CachedPoints
+from ..cache.stats import CachedSubmitterStats
 from ..exercise_summary import UserExerciseSummary
-from ..models import LearningObjectDisplay, LearningObject, Submission, BaseExercise
+from ..models import LastLearningObjectDisplay, LearningObject, Submission, BaseExercise
 from ..reveal_states import ExerciseRevealState
 
 
@@ -62,10 +62,9 @@ def _get_toc(context, student=None):
 def _is_accessible(context, entry, t):
     if t and t > _prepare_now(context):
         return False
-    if entry.get('requirements'):
+    if entry.get('requirement_checks'):
         points = _prepare_context(context)
-        module = CourseModule.objects.get(id=entry['id'])
-        return module.are_requirements_passed(points)
+        return are_requirements_passed(entry['requirement_checks'], points)
     return True
 
 
@@ -76,15 +75,9 @@ def user_results(context: Context, student: Optional[User] = None) -> Dict[str,
     if student:
         values['is_course_staff'] = False
     if values['is_course_staff']:
-        instance = context['instance']
-        values['student_count'] = instance.students.count()
-        counts = (instance.students
-            .values('submissions__exercise_id')
-            .annotate(count=models.Count('submissions__submitters', distinct=True))
-            .filter(submissions__exercise__course_module__course_instance=instance)
-            .order_by()
-        )
-        values['exercise_submitter_counts'] = {row['submissions__exercise_id']: row['count'] for row in counts}
+        stats = CachedSubmitterStats(context['instance']).data
+        values['student_count'] = stats['student_count']
+        values['exercise_submitter_counts'] = stats['exercise_submitter_counts']
     return values
 
 
@@ -98,11 +91,11 @@ def user_last(context):
     user = context['request'].user
     points = _prepare_context(context)
     if user.is_authenticated:
-        last = LearningObjectDisplay.objects.filter(
+        last = LastLearningObjectDisplay.objects.filter(
             profile=user.userprofile,
             learning_object__status=LearningObject.STATUS.READY,
-            learning_object__course_module__course_instance=context['instance'],
-        ).select_related('learning_object').order_by('-timestamp').first()
+            course_instance=context['instance'],
+        ).select_related('learning_object').first()
         if last:
             entry,_,_,_ = points.find(last.learning_object)
             return {
@@ -329,17 +322,15 @@ def exercise_text_stats(context: Context, exercise: Union[int, BaseExercise]) ->
         raise TagUsageError()
     instance = context['instance']
 
-    if not 'student_count' in context:
-        context['student_count'] = instance.students.count()
+    if not 'student_count' in context or not 'exercise_submitter_counts' in context:
+        stats = CachedSubmitterStats(instance).data
+        context['student_count'] = stats['student_count']
+        context['exercise_submitter_counts'] = stats['exercise_submitter_counts']
     total = context['student_count']
 
-    if isinstance(exercise, int):
-        if 'exercise_submitter_counts' in context:
-            num = context['exercise_submitter_counts'].get(exercise, 0)
-        else:
-            num = instance.students.filter(submissions__exercise_id=exercise).distinct().count()
-    else:
-        num = exercise.number_of_submitters() if exercise else 0
+    if isinstance(exercise, BaseExercise):
+        exercise = exercise.id
+    num = context['exercise_submitter_counts'].get(exercise, 0) if exercise else 0
     return {
         "number": num,
         "percentage": int(100 * num / total) if total else 0,
@@ -7,20 +7,23 @@ from io import BytesIO, StringIO
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
 from django.urls import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.test.client import RequestFactory
 from django.utils import timezone
 from django.utils.datastructures import MultiValueDict
 
 from course.models import Course, CourseInstance, CourseHook, CourseModule, \
-    LearningObjectCategory
+    Enrollment, LearningObjectCategory, StudentGroup
 from deviations.models import DeadlineRuleDeviation, \
     MaxSubmissionsRuleDeviation
 from exercise.exercise_summary import UserExerciseSummary
 from exercise.models import BaseExercise, StaticExercise, \
     ExerciseWithAttachment, Submission, SubmittedFile, LearningObject, \
-    RevealRule
+    RevealRule, LearningObjectDisplay, LastLearningObjectDisplay
 from exercise.protocol.exercise_page import ExercisePage
 from exercise.reveal_states import ExerciseRevealState
 from lib.helpers import build_aplus_url
@@ -432,6 +435,59 @@ class ExerciseTest(TestCase):
         )
         self.assertTrue(self.old_base_exercise.one_has_access([self.user.userprofile])[0])
 
+    def test_base_exercise_submission_allowed_query_count(self):
+        group_exercise = BaseExercise.objects.create(
+            name="test group exercise",
+            course_module=self.course_module,
+            category=self.learning_object_category,
+            url="g1",
+            max_submissions=1,
+            min_group_size=1,
+            max_group_size=10,
+        )
+
+        def create_group(size):
+            profiles = []
+            for i in range(size):
+                user = User.objects.create(username="groupUser{}-{}".format(size, i))
+                self.course_instance.enroll_student(user)
+                profiles.append(user.userprofile)
+                MaxSubmissionsRuleDeviation.objects.create(
+                    exercise=group_exercise,
+                    submitter=user.userprofile,
+                    extra_submissions=1,
+                )
+            group = StudentGroup.objects.create(course_instance=self.course_instance)
+            group.members.set(profiles)
+            Enrollment.objects.filter(
+                course_instance=self.course_instance,
+                user_profile__in=profiles,
+            ).update(selected_group=group)
+            return profiles
+
+        def check(profile):
+            exercise = BaseExercise.objects.get(id=group_exercise.id)
+            return exercise.check_submission_allowed(profile)
+
+        small_group = create_group(2)
+        with CaptureQueriesContext(connection) as queries:
+            status, errors, students = check(small_group[0])
+        self.assertEqual(status, BaseExercise.SUBMIT_STATUS.ALLOWED)
+        self.assertEqual(set(students), set(small_group))
+
+        # The number of queries does not depend on the group size.
+        large_group = create_group(8)
+        with self.assertNumQueries(len(queries)):
+            status, errors, students = check(large_group[0])
+        self.assertEqual(status, BaseExercise.SUBMIT_STATUS.ALLOWED)
+        self.assertEqual(set(students), set(large_group))
+
+        # The group members have already submitted, so the group cannot change.
+        submission = Submission.objects.create(exercise=group_exercise)
+        submission.submitters.set(large_group[1:])
+        status, errors, students = check(large_group[0])
+        self.assertEqual(status, BaseExercise.SUBMIT_STATUS.INVALID_GROUP)
+
     def test_base_exercise_total_submission_count(self):
         self.assertEqual(self.base_exercise.get_total_submitter_count(), 2)
         self.assertEqual(self.static_exercise.get_total_submitter_count(), 0)
@@ -1177,3 +1233,60 @@ class ExerciseTest(TestCase):
         self.assertEqual(draft1.submission_data, [["key", "value4"]])
         draft2 = self.base_exercise.get_submission_draft(self.user2.userprofile)
         self.assertEqual(draft2.submission_data, [["key", "value2"]])
+
+    def test_learning_object_display_record(self):
+        profile = self.user.userprofile
+        LearningObjectDisplay.record(self.base_exercise, profile)
+        LearningObjectDisplay.record(self.static_exercise, profile)
+        LearningObjectDisplay.record(self.broken_learning_object, profile)
+        self.assertEqual(LearningObjectDisplay.objects.filter(profile=profile).count(), 3)
+        last = LastLearningObjectDisplay.objects.get(profile=profile)
+        self.assertEqual(last.course_instance, self.course_instance)
+        self.assertEqual(last.learning_object_id, self.broken_learning_object.id)
+
+        with override_settings(LEARNING_OBJECT_DISPLAY_LOG='daily'):
+            LearningObjectDisplay.record(self.base_exercise, profile)
+            LearningObjectDisplay.record(self.learning_object, profile)
+            LearningObjectDisplay.record(self.learning_object, profile)
+        with override_settings(LEARNING_OBJECT_DISPLAY_LOG='none'):
+            LearningObjectDisplay.record(self.static_exercise, profile)
+        self.assertEqual(LearningObjectDisplay.objects.filter(profile=profile).count(), 4)
+        self.assertEqual(
+            LastLearningObjectDisplay.objects.get(profile=profile, course_instance=self.course_instance).learning_object_id,
+            self.static_exercise.id,
+        )
+
+        LearningObjectDisplay.objects.filter(learning_object=self.base_exercise).update(
+            timestamp=timezone.now() - timedelta(days=10),
+        )
+        call_command('prune_learning_object_displays', '7', batch_size=1, stdout=StringIO())
+        self.assertEqual(LearningObjectDisplay.objects.filter(profile=profile).count(), 3)
+        self.assertTrue(LastLearningObjectDisplay.objects.filter(profile=profile).exists())
+
+    def test_learning_object_display_embedded(self):
+        # Chapters load their embedded exercises with separate requests.
+        embedded_exercise = StaticExercise.objects.create(
+            name="embedded exercise",
+            course_module=self.course_module,
+            category=self.learning_object_category,
+            parent=self.learning_object,
+            status=LearningObject.STATUS.UNLISTED,
+            url="e1",
+            max_points=10,
+            service_url="/testServiceURL",
+            exercise_page_content="test_page_content",
+            submission_page_content="test_submission_content"
+        )
+        self.client.login(username="testUser", password="testPassword")
+        response = self.client.get(self.static_exercise.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(embedded_exercise.get_absolute_url())
+        self.assertEqual(response.status_code, 200)
+
+        profile = self.user.userprofile
+        self.assertTrue(LearningObjectDisplay.objects.filter(
+            profile=profile,
+            learning_object=embedded_exercise,
+        ).exists())
+        last = LastLearningObjectDisplay.objects.get(profile=profile, course_instance=self.course_instance)
+        self.assertEqual(last.learning_object_id, self.static_exercise.id)
@@ -1,9 +1,30 @@
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+from aplus_auth.payload import Payload, Permission
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from authorization.object_permissions import ObjectPermissions
+from lib.api.authentication import get_graderauth_exercise_params, get_graderauth_submission_params
+from lib.api.authentication.grader import GraderAuthentication
 from lib.testdata import CourseTestCase
-from course.models import CourseModule, LearningObjectCategory
+from course.models import CourseModule, Enrollment, LearningObjectCategory
+from deviations.models import DeadlineRuleDeviation
 from .cache.content import CachedContent
+from .cache.deviations import CachedMaxDeadlineDeviations
 from .cache.hierarchy import PreviousIterator
 from .cache.points import CachedPoints
-from .models import BaseExercise, StaticExercise, Submission
+from .cache.prebuild import find_upcoming_reveals
+from .cache.stats import CachedSubmitterStats
+from .cache.tokens import CachedGraderToken
+from .models import BaseExercise, RevealRule, StaticExercise, Submission
+from .reveal_states import ExerciseRevealState
 
 
 class CachedContentTest(CourseTestCase):
@@ -240,3 +261,290 @@ class CachedPointsTest(CourseTestCase):
         self.assertTrue(entry['graded'])
         self.assertFalse(entry['unofficial'])
         self.assertEqual(entry['points'], 50)
+
+    def test_prebuild(self):
+        rule = RevealRule.objects.create(trigger=RevealRule.TRIGGER.TIME, time=self.tomorrow)
+        self.exercise.submission_feedback_reveal_rule = rule
+        self.exercise.save()
+        c = CachedContent(self.instance)
+        p = CachedPoints(self.instance, self.student, c)
+        entry,_,_,_ = p.find(self.exercise)
+        self.assertFalse(entry['feedback_revealed'])
+        self.assertEqual(p.data['invalidate_time'], self.tomorrow)
+
+        reveals = find_upcoming_reveals(self.now, self.two_days_after)
+        self.assertEqual(reveals, {self.instance.id: {self.tomorrow: [self.exercise.id]}})
+        self.assertTrue(CachedPoints.prebuild(self.instance, self.student, c, self.tomorrow))
+
+        # The prebuilt data is not used before the reveal time.
+        p = CachedPoints(self.instance, self.student, c)
+        entry,_,_,_ = p.find(self.exercise)
+        self.assertFalse(entry['feedback_revealed'])
+
+        # The prebuilt data is used after the reveal time without queries.
+        later = self.tomorrow + timedelta(minutes=1)
+        with patch('django.utils.timezone.now', return_value=later), self.assertNumQueries(0):
+            p = CachedPoints(self.instance, self.student, c)
+        entry,_,_,_ = p.find(self.exercise)
+        self.assertTrue(entry['feedback_revealed'])
+        self.assertEqual(entry['points'], 50)
+
+        # Invalidating the points discards the prebuilt data.
+        self.assertTrue(CachedPoints.prebuild(self.instance, self.student, c, self.tomorrow))
+        self.submission.set_points(2,2)
+        self.submission.save()
+        with patch('django.utils.timezone.now', return_value=later):
+            p = CachedPoints(self.instance, self.student, c)
+        entry,_,_,_ = p.find(self.exercise)
+        self.assertEqual(entry['points'], 100)
+
+    def test_reveal_overlay(self):
+        rule = RevealRule.objects.create(trigger=RevealRule.TRIGGER.MANUAL, currently_revealed=True)
+        self.exercise.submission_feedback_reveal_rule = rule
+        self.exercise.save()
+        c = CachedContent(self.instance)
+        p = CachedPoints(self.instance, self.student, c)
+        created = p.created()
+        entry,_,_,_ = p.find(self.exercise)
+        self.assertTrue(entry['feedback_revealed'])
+        self.assertEqual(entry['points'], 50)
+        self.assertEqual(p.total()['points'], 50)
+
+        # Changing the rule does not regenerate the points of the students.
+        rule.currently_revealed = False
+        rule.save()
+        p = CachedPoints(self.instance, self.student, c)
+        self.assertEqual(p.created(), created)
+        entry,_,_,_ = p.find(self.exercise)
+        self.assertFalse(entry['feedback_revealed'])
+        self.assertEqual(entry['points'], 0)
+        self.assertEqual(entry['best_submission'], self.submission2.id)
+        self.assertFalse(entry['submissions'][0]['feedback_revealed'])
+        self.assertEqual(p.modules()[1]['points'], 0)
+        self.assertEqual(p.total()['points'], 0)
+
+        p = CachedPoints(self.instance, self.student, c, True)
+        entry,_,_,_ = p.find(self.exercise)
+        self.assertTrue(entry['feedback_revealed'])
+        self.assertEqual(entry['points'], 50)
+
+    def test_module_shards(self):
+        c = CachedContent(self.instance)
+        p = CachedPoints(self.instance, self.student, c)
+        cache_key = CachedPoints._key(self.instance, self.student, modifiers=[])
+        _, stored = cache.get(cache_key)
+        stored = CachedPoints._unpack_value(cache_key, stored)
+        self.assertEqual(stored['modules'], len(p.modules()))
+
+        # Only the main key and one shard are read for a single entry.
+        with self.assertNumQueries(0):
+            entry = CachedPoints.find_entry(self.instance, self.student, c, self.exercise)
+        self.assertEqual(entry, p.find(self.exercise)[0])
+        self.assertEqual(entry['points'], 50)
+        self.assertEqual(
+            CachedPoints.entry_submission_ids(entry, best=True),
+            p.submission_ids(exercise_id=self.exercise.id, best=True),
+        )
+
+        # A missing shard causes the data to be generated again.
+        created = p.created()
+        cache.delete(CachedPoints._shard_key(cache_key, p.data['exercise_index'][self.exercise.id][0]))
+        self.assertIsNone(CachedPoints._find_cached_entry(self.instance, self.student, c, self.exercise, False))
+        p = CachedPoints(self.instance, self.student, c)
+        self.assertNotEqual(p.created(), created)
+        self.assertEqual(p.find(self.exercise)[0]['points'], 50)
+
+        # A generation that lost the race does not replace the shards.
+        lost = dict(p.data, points_created=None)
+        self.assertFalse(CachedPoints.add_generated(cache_key, 0, lost))
+        with self.assertNumQueries(0):
+            entry = CachedPoints.find_entry(self.instance, self.student, c, self.exercise)
+        self.assertEqual(entry['points'], 50)
+
+        # The shards of removed modules are deleted.
+        self.assertGreater(len(p.data['modules']), 1)
+        CachedPoints._store_parts(cache_key, dict(p.data, modules=p.data['modules'][:1]))
+        self.assertIsNotNone(cache.get(CachedPoints._shard_key(cache_key, 0)))
+        self.assertIsNone(cache.get(CachedPoints._shard_key(cache_key, 1)))
+
+
+class CachedMaxDeadlineDeviationsTest(CourseTestCase):
+
+    def test_max_deviations(self):
+        self.assertEqual(CachedMaxDeadlineDeviations(self.instance).data, {})
+        deviation = DeadlineRuleDeviation.objects.create(
+            exercise=self.exercise3,
+            submitter=self.student.userprofile,
+            granter=self.teacher.userprofile,
+            extra_minutes=30,
+        )
+        DeadlineRuleDeviation.objects.create(
+            exercise=self.exercise3,
+            submitter=self.user.userprofile,
+            granter=self.teacher.userprofile,
+            extra_minutes=60,
+        )
+        self.assertEqual(CachedMaxDeadlineDeviations(self.instance).data, {self.exercise3.id: 60})
+        deviation.extra_minutes = 90
+        deviation.save()
+        self.assertEqual(CachedMaxDeadlineDeviations(self.instance).data, {self.exercise3.id: 90})
+
+        c = CachedContent(self.instance)
+        p = CachedPoints(self.instance, self.user, c, True)
+        entry,_,_,_ = p.find(self.exercise3)
+        max_deviations = CachedMaxDeadlineDeviations(self.instance).data
+        with self.assertNumQueries(0):
+            state = ExerciseRevealState(entry, max_deviations=max_deviations)
+            self.assertEqual(state.get_latest_deadline(), self.two_days_after + timedelta(minutes=90))
+            entry,_,_,_ = p.find(self.exercise)
+            state = ExerciseRevealState(entry, max_deviations=max_deviations)
+            self.assertEqual(state.get_latest_deadline(), self.two_days_after)
+
+        deviation.delete()
+        state = ExerciseRevealState(self.exercise3, self.user)
+        self.assertEqual(state.get_latest_deadline(), self.two_days_after + timedelta(minutes=60))
+
+
+class CachedSubmitterStatsTest(CourseTestCase):
+
+    def test_counts(self):
+        stats = CachedSubmitterStats(self.instance).data
+        self.assertEqual(stats['student_count'], 1)
+        self.assertEqual(stats['exercise_submitter_counts'], {self.exercise.id: 1, self.exercise2.id: 1})
+
+        # The earlier submissions of a new student are counted.
+        self.instance.enroll_student(self.user)
+        with self.assertNumQueries(0):
+            stats = CachedSubmitterStats(self.instance).data
+        self.assertEqual(stats['student_count'], 2)
+        self.assertEqual(stats['exercise_submitter_counts'], {self.exercise.id: 1, self.exercise2.id: 2})
+
+        # Only the first submission to an exercise is counted.
+        for _ in range(2):
+            submission = Submission.objects.create(exercise=self.exercise3)
+            submission.submitters.add(self.user.userprofile)
+        stats = CachedSubmitterStats(self.instance).data
+        self.assertEqual(stats['exercise_submitter_counts'][self.exercise3.id], 1)
+
+        enrollment = Enrollment.objects.get(course_instance=self.instance, user_profile=self.student.userprofile)
+        enrollment.status = Enrollment.ENROLLMENT_STATUS.REMOVED
+        enrollment.save()
+        stats = CachedSubmitterStats(self.instance).data
+        self.assertEqual(stats['student_count'], 1)
+        self.assertEqual(
+            stats['exercise_submitter_counts'],
+            {self.exercise.id: 0, self.exercise2.id: 1, self.exercise3.id: 1},
+        )
+
+        # The updated counts match the regenerated counts.
+        CachedSubmitterStats.invalidate(self.instance)
+        regenerated = CachedSubmitterStats(self.instance).data
+        self.assertEqual(regenerated['student_count'], stats['student_count'])
+        self.assertEqual(
+            {k: v for k, v in regenerated['exercise_submitter_counts'].items() if v},
+            {k: v for k, v in stats['exercise_submitter_counts'].items() if v},
+        )
+
+
+class FakeGrader:
+    """
+    Calls back to the grader API with the grader authentication token of a
+    submission, like a grader that polls while it grades the submission.
+    """
+    def __init__(self, submission):
+        self.url = '/api/v2/submissions/{:d}/grader/'.format(submission.id)
+        self.params = dict(get_graderauth_submission_params(submission))
+        self.factory = APIRequestFactory()
+
+    def callback(self):
+        request = Request(self.factory.get(self.url, self.params))
+        user, _payload = GraderAuthentication().authenticate(request)
+        return user
+
+    def run(self, count):
+        """
+        Returns the number of queries and the seconds that the
+        authentication of `count` callbacks took.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            for _ in range(count):
+                self.callback()
+            elapsed = time.perf_counter() - start
+        return len(queries), elapsed
+
+
+class CachedGraderTokenTest(CourseTestCase):
+
+    def authenticate(self, token):
+        permissions = ObjectPermissions()
+        payload = Payload()
+        GraderAuthentication().add_token_permissions(token, permissions, payload)
+        return permissions, payload
+
+    def test_submission_token(self):
+        cache.clear()
+        token = get_graderauth_submission_params(self.submission)[0][1]
+        with self.assertNumQueries(1):
+            permissions, payload = self.authenticate(token)
+        self.assertTrue(permissions.submissions.has(self.submission, Permission.WRITE))
+        self.assertFalse(permissions.submissions.has(self.submission2))
+        self.assertTrue(permissions.courses.has(self.course, Permission.READ))
+        self.assertTrue(permissions.instances.has(self.instance, Permission.READ))
+        self.assertEqual(
+            list(payload.permissions.exercises),
+            [('exercise', Permission.READ, {'id': self.exercise.id})],
+        )
+
+        # A grader calling back repeatedly with the same token.
+        with self.assertNumQueries(0):
+            for _ in range(100):
+                permissions, _payload = self.authenticate(token)
+        self.assertTrue(permissions.submissions.has(self.submission, Permission.WRITE))
+        with self.assertNumQueries(1):
+            self.assertEqual(permissions.submissions.instances[0][1].exercise_id, self.exercise.id)
+            self.assertEqual(permissions.instances.instances[0][1].course, self.course)
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate("s{:x}.{}".format(self.submission.id, "wrong"))
+        self.submission.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_exercise_token(self):
+        cache.clear()
+        token = get_graderauth_exercise_params(self.exercise, self.student)[0][1]
+        with self.assertNumQueries(1):
+            permissions, payload = self.authenticate(token)
+        self.assertEqual(
+            permissions.submissions.creates,
+            [(Permission.CREATE, {'exercise_id': self.exercise.id, 'user_id': str(self.student.id)})],
+        )
+        self.assertTrue(permissions.courses.has(self.course, Permission.READ))
+        with self.assertNumQueries(0):
+            self.authenticate(token)
+
+        # The exercise is resolved again after it has changed.
+        self.exercise.save()
+        with self.assertNumQueries(1):
+            self.authenticate(token)
+        self.exercise.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_grader_load(self):
+        grader = FakeGrader(self.submission)
+        user = grader.callback()
+        self.assertTrue(user.permissions.submissions.has(self.submission))
+        count = 500
+
+        # Every callback resolves the token, if it is not cached.
+        cache.clear()
+        with patch.object(CachedGraderToken, '_needs_generation', return_value=True):
+            uncached_queries, uncached_seconds = grader.run(count)
+        self.assertEqual(uncached_queries, count)
+
+        cache.clear()
+        cached_queries, cached_seconds = grader.run(count)
+        self.assertEqual(cached_queries, 1)
+        self.assertLess(cached_seconds, uncached_seconds)
@@ -0,0 +1,81 @@
+import pickle
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from exercise.protocol.exercise_page import ExercisePage
+from exercise.protocol.form_template import FormTemplate
+
+
+PAGE = '''<html><head><title>Exercise</title></head><body>
+<div id="exercise">
+<p class="lead info">Answer the questions &amp; submit.</p>
+<form action="/grade" method="post">
+<input type="text" name="name" value='say "hi"' class="form-control">
+<input type="checkbox" name="check" value="1" checked><input type="checkbox" name="check" value="2">
+<input type="radio" name="radio" value="a"><input type="radio" name="radio" value="b" checked>
+<select name="select" multiple>
+<optgroup label="Group"><option value="1">One</option><option value="2" selected>Two</option></optgroup>
+<option>Three</option>
+</select>
+<textarea name="text" rows="3">Old &lt;text&gt;</textarea>
+<input type="submit" value="Submit">
+<button type="submit" class="btn"><span>Submit</span></button>
+<button type="button">Other</button>
+</form>
+</div>
+<form><input name="name"></form>
+</body></html>'''
+
+
+class FormTemplateTest(SimpleTestCase):
+
+    def populated(self, content, template, *args):
+        exercise = SimpleNamespace(max_points=1, name='Exercise', description='')
+        page = ExercisePage(exercise)
+        page.content = content
+        if template is not None:
+            page.load_form_template = lambda: template
+        page.populate_form(*args)
+        return page.content
+
+    def assertSameAsParsed(self, content, *args):
+        template = pickle.loads(pickle.dumps(FormTemplate.compile(content)))
+        self.assertEqual(
+            self.populated(content, template, *args),
+            self.populated(content, None, *args),
+        )
+
+    def test_populate(self):
+        field_values = {
+            'name': ['new <"value"> & \'quotes\''],
+            'check': ['2'],
+            'radio': ['a'],
+            'select': ['1', 'Three'],
+            'text': ['<b>New</b>\n& text'],
+        }
+        for args in (
+                (),
+                ({}, None, True),
+                (field_values, None, True),
+                (field_values, {'draft-timestamp': '1634567890123'}, True),
+                (field_values, None, False),
+                ({'radio': ['c'], 'check': []}, {'a"b': '"\'<&'}, False),
+                ):
+            self.assertSameAsParsed(PAGE, *args)
+
+        content = self.populated(PAGE, FormTemplate.compile(PAGE), field_values, None, False)
+        self.assertIn('value="new &lt;&quot;value&quot;&gt; &amp; \'quotes\'"', content)
+        self.assertIn('&lt;b&gt;New&lt;/b&gt;\n&amp; text</textarea>', content)
+        self.assertNotIn('type="submit"', content)
+        self.assertIn('<button type="button">Other</button>', content)
+        self.assertNotIn('<form><input name="name"/></form>', content)
+
+    def test_other_pages(self):
+        for content in (
+                '<div class="entry-content"><form><input name="x"></form><form><textarea name="x">a</textarea></form></div>',
+                '<p>No form<input name="x"></p>',
+                '<div id="chapter"><script>var a = "<input name=\'x\'>";</script><form><input name="x"></form></div>',
+                '',
+                ):
+            self.assertSameAsParsed(content, {'x': ['1']}, {'key': 'value'}, False)
@@ -132,9 +132,13 @@ class ExerciseMixin(ExerciseRevealRuleMixin, ExerciseBaseMixin, CourseModuleMixi
         self.note("summary", "submissions")
 
     def get_cached_points(self, user: Optional[User] = None) -> None:
-        cache = CachedPoints(self.instance, user or self.request.user, self.content, self.is_course_staff)
-        entry, _, _, _ = cache.find(self.exercise)
-        self.cached_points = entry
+        self.cached_points = CachedPoints.find_entry(
+            self.instance,
+            user or self.request.user,
+            self.content,
+            self.exercise,
+            self.is_course_staff,
+        )
         self.note("cached_points")
 
 
@@ -18,6 +18,7 @@ from django.db import DatabaseError
 from authorization.permissions import ACCESS
 from course.models import CourseModule
 from course.viewbase import CourseInstanceBaseView, EnrollableViewMixin
+from lib.file_serving import serve_file, serve_text_file
 from lib.helpers import query_dict_to_list_of_tuples
 from lib.remote_page import RemotePageNotFound, request_for_response
 from lib.viewbase import BaseRedirectMixin, BaseView
@@ -127,7 +128,7 @@ class ExerciseView(BaseRedirectMixin, ExerciseBaseView, EnrollableViewMixin):
         page = self.get_page(request, students)
 
         if self.profile:
-            LearningObjectDisplay.objects.create(learning_object=self.exercise, profile=self.profile)
+            LearningObjectDisplay.record(self.exercise, self.profile)
 
         if isinstance(self.exercise, ExerciseCollection):
             exercisecollection_data = self._load_exercisecollection(request, disable_submit)
@@ -463,26 +464,24 @@ class SubmittedFileView(SubmissionMixin, BaseView):
             raise Http404()
 
     def get(self, request, *args, **kwargs):
+        file_object = self.file.file_object
         try:
-            with self.file.file_object.open() as f:
-                bytedata = f.read()
+            # Download the file.
+            if request.GET.get("download", False):
+                return serve_file(request, file_object,
+                    content_type="application/octet-stream",
+                    filename=self.file.filename,
+                    as_attachment=True)
+
+            if self.file.is_passed():
+                return serve_file(request, file_object,
+                    content_type=self.file.get_mime(),
+                    filename=self.file.filename)
+
+            return serve_text_file(file_object)
         except OSError:
             return HttpResponseNotFound()
 
-        # Download the file.
-        if request.GET.get("download", False):
-            response = HttpResponse(bytedata,
-                content_type="application/octet-stream")
-            response["Content-Disposition"] = 'attachment; filename="{}"'\
-                .format(self.file.filename)
-            return response
-
-        if self.file.is_passed():
-            return HttpResponse(bytedata, content_type=self.file.get_mime())
-
-        return HttpResponse(bytedata.decode('utf-8', 'ignore'),
-            content_type='text/plain; charset="UTF-8"')
-
 
 class SubmissionDraftView(SubmissionDraftBaseView):
     """
@@ -1,17 +1,20 @@
 import logging
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple, Type, TypeVar
 
 from aplus_auth import settings as auth_settings
 from aplus_auth.payload import Payload, Permission
 from aplus_auth.auth import get_token_from_headers
 from aplus_auth.auth.django import ServiceAuthentication
 from django.conf import settings
+from django.db import models
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.request import Request
 
 from authorization.object_permissions import ObjectPermissions
+from course.models import Course, CourseInstance
 from lib.crypto import get_valid_message
+from exercise.cache.tokens import CachedExerciseToken, CachedSubmissionToken
 from exercise.models import BaseExercise, Submission
 from userprofile.models import GraderUser
 from . import GRADER_AUTH_TOKEN
@@ -19,6 +22,20 @@ from . import GRADER_AUTH_TOKEN
 
 logger = logging.getLogger('aplus.authentication')
 
+TModel = TypeVar('TModel', bound=models.Model)
+
+
+def _deferred_instance(model: Type[TModel], pk: int, **values: Any) -> TModel:
+    """
+    Returns an instance of the model with only the primary key and the given
+    field values loaded. The other fields are loaded when they are accessed,
+    like deferred fields.
+    """
+    values = dict(values, id=pk)
+    values[model._meta.pk.attname] = pk
+    field_names = [f.attname for f in model._meta.concrete_fields if f.attname in values]
+    return model.from_db(None, field_names, [values[name] for name in field_names])
+
 
 class GraderAuthentication(ServiceAuthentication[GraderUser], BaseAuthentication):
     allow_any_issuer = True
@@ -45,36 +62,38 @@ class GraderAuthentication(ServiceAuthentication[GraderUser], BaseAuthentication
 
     def add_token_permissions(self, token: str, permissions: ObjectPermissions, payload: Payload):
         if token[0] == "s":
-            submission = self.authenticate_submission_token(token[1:])
+            ids = self.authenticate_submission_token(token[1:])
+            submission = _deferred_instance(Submission, ids['submission'], exercise_id=ids['exercise'])
             payload.permissions.submissions.add(Permission.READ, id=submission.id)
             permissions.submissions.add(Permission.READ, submission)
             payload.permissions.submissions.add(Permission.WRITE, id=submission.id)
             permissions.submissions.add(Permission.WRITE, submission)
-            exercise = submission.exercise
 
             # MOOC-jutut needs this but it doesn't seem correct to give exercise read
             # permissions here. It might not _actually_ even need this but the way
             # the permissions system works, accessing the submission also requires
             # access to the exercise.
-            payload.permissions.exercises.add(Permission.READ, id=exercise.id)
-            permissions.exercises.add(Permission.READ, {"id": exercise.id})
+            payload.permissions.exercises.add(Permission.READ, id=ids['exercise'])
+            permissions.exercises.add(Permission.READ, {"id": ids['exercise']})
         elif token[0] == "e":
-            exercise, user_id = self.authenticate_exercise_token(token[1:])
-            perm_dict: Dict[str, Any] = {"exercise_id": exercise.id, "user_id": user_id}
+            ids, user_id = self.authenticate_exercise_token(token[1:])
+            perm_dict: Dict[str, Any] = {"exercise_id": ids['exercise'], "user_id": user_id}
             payload.permissions.submissions.add(Permission.CREATE, **perm_dict)
             permissions.submissions.add_create(**perm_dict)
 
-            payload.permissions.exercises.add(Permission.READ, id=exercise.id)
-            permissions.exercises.add(Permission.READ, {"id": exercise.id})
+            payload.permissions.exercises.add(Permission.READ, id=ids['exercise'])
+            permissions.exercises.add(Permission.READ, {"id": ids['exercise']})
         else:
             raise AuthenticationFailed("Authentication token is invalid.")
 
         # Same problem as above with the exercises. We need access to these to
         # access the submissions/exercises
-        payload.permissions.courses.add(Permission.READ, id=exercise.course_instance.course.id)
-        payload.permissions.instances.add(Permission.READ, id=exercise.course_instance.id)
-        permissions.courses.add(Permission.READ, exercise.course_instance.course)
-        permissions.instances.add(Permission.READ, exercise.course_instance)
+        payload.permissions.courses.add(Permission.READ, id=ids['course'])
+        payload.permissions.instances.add(Permission.READ, id=ids['instance'])
+        permissions.courses.add(Permission.READ, _deferred_instance(Course, ids['course']))
+        permissions.instances.add(Permission.READ, _deferred_instance(
+            CourseInstance, ids['instance'], course_id=ids['course'],
+        ))
 
     def get_user(self, request: Request, id: str, payload: Payload) -> GraderUser:
         # check public key is allowed access
@@ -94,9 +113,10 @@ class GraderAuthentication(ServiceAuthentication[GraderUser], BaseAuthentication
 
         return GraderUser(id, permissions)
 
-    def authenticate_submission_token(self, submission_token) -> Submission:
+    def authenticate_submission_token(self, submission_token) -> Dict[str, Any]:
         """
-        Resolve submission from authentication token
+        Resolve the ids of the submission, exercise, course instance and
+        course from authentication token
 
         Args:
             submission_token: authentication token in correct format
@@ -115,15 +135,14 @@ class GraderAuthentication(ServiceAuthentication[GraderUser], BaseAuthentication
             raise AuthenticationFailed("Submission token isn't in correct format.")
 
         try:
-            submission = Submission.objects.get(id=submission_id, hash=submission_hash)
+            return CachedSubmissionToken(submission_id, submission_hash).data
         except Submission.DoesNotExist:
             raise AuthenticationFailed("No valid submission for submission token.")
 
-        return submission
-
-    def authenticate_exercise_token(self, exercise_token) -> Tuple[BaseExercise, str]:
+    def authenticate_exercise_token(self, exercise_token) -> Tuple[Dict[str, Any], str]:
         """
-        Resolve exercise from authentication token
+        Resolve the ids of the exercise, course instance and course, and the
+        user id from authentication token
 
         Args:
             exercise_token: authentication token in correct format
@@ -143,8 +162,6 @@ class GraderAuthentication(ServiceAuthentication[GraderUser], BaseAuthentication
 
         user_id, exercise_id = identifier_parts
         try:
-            exercise = BaseExercise.objects.get(id=exercise_id)
-        except BaseExercise.DoesNotExist:
+            return CachedExerciseToken(int(exercise_id)).data, user_id
+        except (ValueError, BaseExercise.DoesNotExist):
             raise AuthenticationFailed("No valid exercise for exercise token.")
-
-        return exercise, user_id
@@ -0,0 +1,93 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from django.db.models.query import QuerySet
+from rest_framework import pagination
+from rest_framework.exceptions import ParseError
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+class KeysetPagination(pagination.CursorPagination):
+    """
+    Cursor pagination in one of the orderings that the view lists in its
+    `cursor_orderings` attribute. The attribute maps the values of the query
+    parameter `ordering` to model field orderings, e.g.
+    `{'id': ('id',), 'submission_time': ('submission_time', 'id')}`. The first
+    ordering is the default, and prefixing the value with `-` reverses it.
+
+    The pages are fetched by filtering on the first field of the ordering
+    instead of with an offset, and the collection is not counted, unless the
+    query parameter `count` is `true`.
+    """
+    ordering_query_param = 'ordering'
+    count_query_param = 'count'
+
+    def get_ordering(self, request: Request, queryset: QuerySet, view: APIView) -> Tuple[str, ...]:
+        orderings: Dict[str, Sequence[str]] = view.cursor_orderings
+        value = request.query_params.get(self.ordering_query_param)
+        if not value:
+            return tuple(next(iter(orderings.values())))
+        reverse = value.startswith('-')
+        fields = orderings.get(value[1:] if reverse else value)
+        if fields is None:
+            raise ParseError(detail='Ordering must be one of: {}.'.format(
+                ', '.join(orderings.keys())
+            ))
+        if reverse:
+            return tuple(f[1:] if f.startswith('-') else '-' + f for f in fields)
+        return tuple(fields)
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view: Optional[APIView] = None) -> Optional[List[Any]]:
+        self.count = None
+        if request.query_params.get(self.count_query_param) == 'true':
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data: List[Any]) -> Response:
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data['count'] = self.count
+            response.data.move_to_end('count', last=False)
+        return response
+
+
+class APlusPagination(pagination.PageNumberPagination):
+    """
+    Page number pagination, or keyset pagination if the view supports it,
+    i.e. it has the attribute `cursor_orderings`, and the request has the
+    query parameter `pagination=cursor` or a cursor. The page number mode
+    counts the whole collection and skips the previous pages with an offset,
+    which gets slower the deeper the client pages.
+    """
+    pagination_query_param = 'pagination'
+
+    def __init__(self) -> None:
+        self.keyset: Optional[KeysetPagination] = None
+
+    def use_keyset(self, request: Request, view: Optional[APIView]) -> bool:
+        if getattr(view, 'cursor_orderings', None) is None:
+            return False
+        return (
+            request.query_params.get(self.pagination_query_param) == 'cursor'
+            or KeysetPagination.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view: Optional[APIView] = None) -> Optional[List[Any]]:
+        if self.use_keyset(request, view):
+            self.keyset = KeysetPagination()
+            page = self.keyset.paginate_queryset(queryset, request, view)
+            self.display_page_controls = self.keyset.display_page_controls
+            return page
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data: List[Any]) -> Response:
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self) -> str:
+        if self.keyset is not None:
+            return self.keyset.to_html()
+        return super().to_html()
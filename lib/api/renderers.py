@@ -1,4 +1,5 @@
 from django.conf import settings
+from rest_framework.renderers import BaseRenderer
 from rest_framework_csv.renderers import CSVRenderer
 
 def remove_newlines(x):
@@ -24,3 +25,17 @@ class CSVExcelRenderer(CSVRenderer):
                 renderer_context.update(new_writer_opts)
         response = super().render(data, media_type, renderer_context, writer_opts)
         return '\uFEFF'.encode('UTF-8') + response
+
+
+class ZipRenderer(BaseRenderer):
+    """
+    Accepts requests for ZIP archives. The views return the archives as
+    streamed responses, so there is nothing to render, except for errors.
+    """
+    media_type = 'application/zip'
+    format = 'zip'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, media_type=None, renderer_context=None):
+        return b''
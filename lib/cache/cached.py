@@ -2,13 +2,25 @@ from datetime import datetime
 from django.core.cache import cache
 from time import time
 import logging
+import pickle
 
+from . import metrics
+from .packed import PackedValue, chunk_count_key, chunk_key, pack, unpack
 
 logger = logging.getLogger('aplus.cached')
 
 
 class CachedAbstract(object):
     KEY_PREFIX = 'abstract'
+    # The number of leading models that form a generation scope, e.g. 1 for
+    # caches keyed by a course instance and a user. When set, all entries in a
+    # scope can be invalidated with one cache write using
+    # `invalidate_generation`. The entries are then validated lazily against
+    # the generation timestamp of their scope when they are read.
+    GENERATION_SCOPE = 0
+    # When set, the values are stored compressed and split into chunks, if
+    # they are too big for one cache key. See `lib.cache.packed`.
+    COMPACT = False
 
     @classmethod
     def _key(cls, *models, modifiers):
@@ -21,12 +33,208 @@ class CachedAbstract(object):
     def invalidate(cls, *models, modifiers=[]):
         cache_key = cls._key(*models, modifiers=modifiers)
         logger.debug("Invalidating cached data for %s", cache_key)
+        metrics.increment(cls.__name__, 'invalidations')
         # The cache is invalid, if the time field is None
         # The invalidation time is stored in the data field for debug messages
         # Keep this value in the cache for an hour, so it will be removed from
         # the memory at some point, but not before all generations have finished.
         cache.set(cache_key, (None, time()), 60*60)
 
+    @classmethod
+    def invalidate_many(cls, models_list, modifiers=[]):
+        """
+        Invalidates the entries of each tuple of models in `models_list`
+        with one cache write. Duplicate entries are invalidated once.
+        """
+        cache_keys = {cls._key(*models, modifiers=modifiers) for models in models_list}
+        if not cache_keys:
+            return
+        logger.debug("Invalidating cached data for %s", ', '.join(sorted(cache_keys)))
+        metrics.increment(cls.__name__, 'invalidations', len(cache_keys))
+        invalidated = (None, time())
+        cache.set_many({cache_key: invalidated for cache_key in cache_keys}, 60*60)
+
+    @classmethod
+    def _generation_key(cls, *models):
+        if not cls.GENERATION_SCOPE:
+            return None
+        return cls._key(*models[:cls.GENERATION_SCOPE], modifiers=['generation'])
+
+    @classmethod
+    def invalidate_generation(cls, *models):
+        """
+        Invalidates all entries in the generation scope given by the models,
+        e.g. the entries of every user in a course instance. Entries generated
+        before this call are regenerated when they are read the next time.
+        """
+        generation_key = cls._generation_key(*models)
+        if generation_key is None:
+            raise TypeError("%s does not define GENERATION_SCOPE" % cls.__name__)
+        logger.debug("Invalidating cached data generation %s", generation_key)
+        metrics.increment(cls.__name__, 'invalidations')
+        # The generation is kept as long as the entries it validates
+        cache.set(generation_key, time(), None)
+
+    @classmethod
+    def _store_value(cls, cache_key, data):
+        """
+        Returns the value that is stored in the cache key for the data.
+        Subclasses may leave parts of the data out of the value and store
+        them in other keys with `_store_parts`, see `_load_value`.
+        """
+        return data
+
+    @classmethod
+    def _store_parts(cls, cache_key, data):
+        """
+        Stores the parts of the data that `_store_value` leaves out. Called
+        only after the value has been stored in the cache key, so that a
+        generation that lost a race does not overwrite the parts.
+        """
+        pass
+
+    @classmethod
+    def _load_value(cls, cache_key, value):
+        """
+        Returns the data from the value stored by `_store_value`, or None, if
+        the data can not be assembled and must be generated again.
+        """
+        return value
+
+    @classmethod
+    def _pack_value(cls, cache_key, value):
+        """
+        Returns the value in the compact format, if `COMPACT` is set, and a
+        dict of its chunks. The chunks are not stored here, but with
+        `_store_chunks` once the value has been stored in the cache key.
+        """
+        if not cls.COMPACT:
+            return value, {}
+        packed, chunks = pack(cache_key, value)
+        if chunks:
+            size = sum(len(chunk) for _, chunk in chunks.values())
+        else:
+            size = len(packed.payload)
+        metrics.observe(cls.__name__, 'value_bytes', size)
+        return packed, chunks
+
+    @classmethod
+    def _store_chunks(cls, chunks_by_key):
+        """
+        Stores the chunks returned by `_pack_value` for each cache key, and
+        deletes the chunks that a previous, larger value of the key left
+        behind. The chunk counts are kept in separate keys for that.
+        """
+        if not cls.COMPACT or not chunks_by_key:
+            return
+        count_keys = {chunk_count_key(key): key for key in chunks_by_key}
+        previous_counts = cache.get_many(list(count_keys))
+        values = {}
+        stale = []
+        for count_key, key in count_keys.items():
+            chunks = chunks_by_key[key]
+            previous_count = previous_counts.get(count_key) or 0
+            if chunks or previous_count:
+                values.update(chunks)
+                values[count_key] = len(chunks)
+            stale.extend(chunk_key(key, i) for i in range(len(chunks), previous_count))
+        if values:
+            cache.set_many(values, None)
+        if stale:
+            cache.delete_many(stale)
+
+    @classmethod
+    def _unpack_value(cls, cache_key, value):
+        """
+        Returns the value packed by `_pack_value`, or None, if it can not be
+        unpacked. Values that are not packed are returned as is.
+        """
+        if not isinstance(value, PackedValue):
+            return value
+        keys = value.chunk_keys(cache_key)
+        return unpack(cache_key, value, cache.get_many(keys) if keys else {})
+
+    @classmethod
+    def _dump_data(cls, cache_key, data):
+        """
+        Returns the value that is stored in the cache key for the data, and
+        the chunks of the value that are stored after it, see `_pack_value`.
+        """
+        value = cls._store_value(cache_key, data)
+        if cls.COMPACT:
+            return cls._pack_value(cache_key, value)
+        if metrics.get_sink().enabled:
+            metrics.observe(cls.__name__, 'value_bytes', len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)))
+        return value, {}
+
+    @classmethod
+    def _store_dumped(cls, cache_key, chunks, data):
+        # Called after the value of the data has been stored in the cache key
+        cls._store_chunks({cache_key: chunks})
+        cls._store_parts(cache_key, data)
+
+    @classmethod
+    def _load_data(cls, cache_key, value):
+        value = cls._unpack_value(cache_key, value)
+        return None if value is None else cls._load_value(cache_key, value)
+
+    @staticmethod
+    def _is_valid(updated, generation):
+        # An entry is valid, if it was not invalidated and it was generated
+        # after the latest invalidation of its generation scope
+        return updated is not None and (generation is None or updated > generation)
+
+    @classmethod
+    def get_many_cached(cls, cache_keys, generation_key=None):
+        """
+        Reads the given cache keys with a single cache round trip.
+        Returns a tuple of a dict mapping the valid keys to their data and
+        a list of the keys that are missing or invalidated.
+        Invalidated keys are removed from the cache, so that the caller can
+        store newly generated data for them with `add_generated`.
+        The keys must share the generation scope of `generation_key`, if given.
+        """
+        cache_keys = list(cache_keys)
+        found = {}
+        invalid = []
+        raw_values = cache.get_many(cache_keys + [generation_key] if generation_key else cache_keys)
+        generation = raw_values.get(generation_key) if generation_key else None
+        for cache_key in cache_keys:
+            raw = raw_values.get(cache_key)
+            updated, data = raw if isinstance(raw, tuple) and len(raw) == 2 else (None, None)
+            if cls._is_valid(updated, generation) and data is not None:
+                data = cls._load_data(cache_key, data)
+            else:
+                data = None
+            if data is None:
+                invalid.append(cache_key)
+            else:
+                found[cache_key] = data
+        if found:
+            metrics.increment(cls.__name__, 'hits', len(found))
+        if invalid:
+            metrics.increment(cls.__name__, 'misses', len(invalid))
+        stale = [k for k in invalid if k in raw_values]
+        if stale:
+            cache.delete_many(stale)
+        return found, invalid
+
+    @classmethod
+    def add_generated(cls, cache_key, gen_start, data):
+        """
+        Stores data that was generated outside of the constructor, e.g. in
+        bulk for the keys returned by `get_many_cached`. Like in the
+        constructor, the value is not stored if another process has set or
+        invalidated the key in the meantime.
+        """
+        stored, chunks = cls._dump_data(cache_key, data)
+        added = cache.add(cache_key, (gen_start, stored), None)
+        if added:
+            cls._store_dumped(cache_key, chunks, data)
+        else:
+            metrics.increment(cls.__name__, 'lost_races')
+        return added
+
     def __init__(self, *models, modifiers=[]):
         self.__models = models
         self.__cache_key = self.__class__._key(*models, modifiers=modifiers)
@@ -36,18 +244,30 @@ class CachedAbstract(object):
         cache_key = self.__cache_key
         cache_name = "%s[%s]" % (self.__class__.__name__, cache_key)
 
-        # Retrieve currently cached data
-        raw = cache.get(cache_key)
+        # Retrieve currently cached data and the generation of its scope
+        generation_key = self._generation_key(*self.__models)
+        if generation_key is None:
+            raw = cache.get(cache_key)
+            generation = None
+        else:
+            raw_values = cache.get_many([cache_key, generation_key])
+            raw = raw_values.get(cache_key)
+            generation = raw_values.get(generation_key)
         updated, data = raw if isinstance(raw, tuple) and len(raw) == 2 else (None, None)
 
-        # Cache is invalidated, if updated is None
-        if updated is None:
+        # Cache is invalidated, if updated is None or older than the generation
+        if not self._is_valid(updated, generation):
             data = None
+        elif data is not None:
+            data = self._load_data(cache_key, data)
 
         # Use the cached data, if it doesn't require regeneration
         # TODO: updated should be passed to _needs_generation
+        metrics_name = self.__class__.__name__
         if not self._needs_generation(data):
+            metrics.increment(metrics_name, 'hits')
             return data
+        metrics.increment(metrics_name, 'misses')
 
         # If the cache contains invalid value, clear it
         if raw is not None:
@@ -59,12 +279,15 @@ class CachedAbstract(object):
         gen_start_dt = str(datetime.fromtimestamp(gen_start))
         logger.debug("Generating cached data for %s with ts %s", cache_name, gen_start_dt)
         data = self._generate_data(*self.__models, data=data)
+        metrics.observe(metrics_name, 'generation_seconds', time() - gen_start)
 
         # If another process invalidated the cache or generated a newer
         # value for it during the generation time, then cache.add()
         # returns False and keeps the current value in the cache
-        cache_updated = cache.add(cache_key, (gen_start, data), None)
+        stored, chunks = self._dump_data(cache_key, data)
+        cache_updated = cache.add(cache_key, (gen_start, stored), None)
         if cache_updated:
+            self._store_dumped(cache_key, chunks, data)
             logger.debug("Set newly generated data for %s with ts %s", cache_name, gen_start_dt)
             # The generated value should be in the cache now
             return data
@@ -75,6 +298,7 @@ class CachedAbstract(object):
             # thus cache wasn't invalidated, so the data was probably too big.
             # Best we can do is to log error and return the data
             logger.error("Failed to store a value to the cache %s. It might be too big!", cache_name)
+            metrics.increment(metrics_name, 'store_failures')
             return data
 
         # Someone invalidated or updated the value in the cache before we completed
@@ -87,6 +311,7 @@ class CachedAbstract(object):
             except:
                 curr_dt = repr(curr_data)
             logger.debug("Cache %s was discarded at %s, before generation of a new data with ts %s was completed.", cache_name, curr_dt, gen_start_dt)
+            metrics.increment(metrics_name, 'lost_races')
         elif curr_updated > gen_start:
             # Cache was updated before we were ready, so use the newer value
             try:
@@ -94,7 +319,10 @@ class CachedAbstract(object):
             except:
                 curr_dt = curr_updated
             logger.debug("Cache %s was updated at %s, before generation of a new data with ts %s was completed. Using newer value from the cache.", cache_name, curr_dt, gen_start_dt)
-            data = curr_data
+            metrics.increment(metrics_name, 'lost_races')
+            curr_data = self._load_data(cache_key, curr_data)
+            if curr_data is not None:
+                data = curr_data
         else:
             # We have newer value, so force the cache to this new value
             try:
@@ -102,7 +330,8 @@ class CachedAbstract(object):
             except:
                 curr_dt = curr_updated
             logger.debug("Cache %s was updated at %s, before generation of a new data with ts %s was completed. Updating the cache with our newer value!", cache_name, curr_dt, gen_start_dt)
-            cache.set(cache_key, (gen_start, data), None)
+            cache.set(cache_key, (gen_start, stored), None)
+            self._store_dumped(cache_key, chunks, data)
             # NOTE: there is a chance that the cache was invalidated between
             # get and this set. To fix that, we would require operation
             # check-and-set (CAS), which is not supported by Django
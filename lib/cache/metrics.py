@@ -0,0 +1,257 @@
+"""
+Metrics of the cached data, collected per `CachedAbstract` subclass.
+
+`CachedAbstract` reports the following events to the metrics sink selected
+with the `CACHE_METRICS_SINK` setting:
+
+- counters: `hits`, `misses`, `invalidations`, `lost_races` (the generated
+  value was not stored, because another process invalidated or updated the
+  key during the generation) and `store_failures` (the value was too big),
+- histograms: `generation_seconds` and `value_bytes` (the size of the
+  serialized value).
+
+`LocalSink` keeps the metrics in the memory of the process. `SharedSink`
+also publishes them to the cache at most every `CACHE_METRICS_FLUSH_INTERVAL`
+seconds, so that a snapshot contains the metrics of all processes that share
+the cache. The snapshot can be rendered in the Prometheus text format.
+"""
+import os
+import threading
+from time import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+
+
+COUNTERS = {
+    'hits': "Reads that returned valid cached data",
+    'misses': "Reads that generated the data",
+    'invalidations': "Invalidations of cached data",
+    'lost_races': "Generated data that was not stored due to a concurrent update",
+    'store_failures': "Generated data that could not be stored",
+}
+HISTOGRAMS = {
+    'generation_seconds': (
+        "Time spent generating the data",
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+    ),
+    'value_bytes': (
+        "Size of the serialized data",
+        (1000, 10000, 50000, 100000, 250000, 500000, 1000000, 2500000, 5000000),
+    ),
+}
+
+# {'counters': {cache: {name: value}},
+#  'histograms': {cache: {name: {'buckets': [count], 'sum': sum, 'count': count}}}}
+Snapshot = Dict[str, Dict[str, Dict[str, Any]]]
+
+
+def empty_snapshot() -> Snapshot:
+    return {'counters': {}, 'histograms': {}}
+
+
+def merge_snapshots(snapshots: Iterable[Snapshot]) -> Snapshot:
+    result = empty_snapshot()
+    for snapshot in snapshots:
+        for cache_name, counters in snapshot['counters'].items():
+            target = result['counters'].setdefault(cache_name, {})
+            for name, value in counters.items():
+                target[name] = target.get(name, 0) + value
+        for cache_name, histograms in snapshot['histograms'].items():
+            target = result['histograms'].setdefault(cache_name, {})
+            for name, histogram in histograms.items():
+                if name not in target:
+                    target[name] = {'buckets': list(histogram['buckets']), 'sum': histogram['sum'], 'count': histogram['count']}
+                    continue
+                t = target[name]
+                t['buckets'] = [a + b for a, b in zip(t['buckets'], histogram['buckets'])]
+                t['sum'] += histogram['sum']
+                t['count'] += histogram['count']
+    return result
+
+
+class MetricsSink(object):
+    """
+    The interface of the metrics sinks. This one discards everything.
+    """
+    # Whether the metrics are collected. The sizes of values that are not
+    # serialized anyway are measured only when this is set.
+    enabled = False
+
+    def increment(self, cache_name: str, name: str, amount: int = 1) -> None:
+        pass
+
+    def observe(self, cache_name: str, name: str, value: float) -> None:
+        pass
+
+    def snapshot(self) -> Snapshot:
+        return empty_snapshot()
+
+    def reset(self) -> None:
+        pass
+
+
+class LocalSink(MetricsSink):
+    """
+    Keeps the metrics in the memory of the process.
+    """
+    enabled = True
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._data = empty_snapshot()
+
+    def increment(self, cache_name: str, name: str, amount: int = 1) -> None:
+        with self._lock:
+            counters = self._data['counters'].setdefault(cache_name, {})
+            counters[name] = counters.get(name, 0) + amount
+
+    def observe(self, cache_name: str, name: str, value: float) -> None:
+        bounds = HISTOGRAMS[name][1]
+        with self._lock:
+            histograms = self._data['histograms'].setdefault(cache_name, {})
+            histogram = histograms.get(name)
+            if histogram is None:
+                histogram = histograms[name] = {'buckets': [0] * len(bounds), 'sum': 0, 'count': 0}
+            # The buckets are not cumulative here, see `render_prometheus`.
+            for i, bound in enumerate(bounds):
+                if value <= bound:
+                    histogram['buckets'][i] += 1
+                    break
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def snapshot(self) -> Snapshot:
+        with self._lock:
+            return merge_snapshots([self._data])
+
+    def reset(self) -> None:
+        with self._lock:
+            self._data = empty_snapshot()
+
+
+class SharedSink(LocalSink):
+    """
+    Keeps the metrics in the memory of the process and publishes them to the
+    cache periodically. The snapshot merges the published metrics of all
+    processes, including the unpublished metrics of this process.
+    """
+    PROCESSES_KEY = 'cachemetrics:processes'
+    # The metrics of a process that has stopped are dropped after this time.
+    TIMEOUT = 24*60*60
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._process_key = 'cachemetrics:process:%d:%s' % (os.getpid(), uuid4().hex[:8])
+        self._flushed = 0.0
+
+    def _maybe_flush(self) -> None:
+        interval = getattr(settings, 'CACHE_METRICS_FLUSH_INTERVAL', 10)
+        if time() - self._flushed >= interval:
+            self.flush()
+
+    def increment(self, cache_name: str, name: str, amount: int = 1) -> None:
+        super().increment(cache_name, name, amount)
+        self._maybe_flush()
+
+    def observe(self, cache_name: str, name: str, value: float) -> None:
+        super().observe(cache_name, name, value)
+        self._maybe_flush()
+
+    def flush(self) -> None:
+        self._flushed = time()
+        cache.set(self._process_key, super().snapshot(), self.TIMEOUT)
+        # The list of processes is not updated atomically, so a lost update
+        # is fixed by the next flush of the process.
+        processes = cache.get(self.PROCESSES_KEY) or []
+        if self._process_key not in processes:
+            cache.set(self.PROCESSES_KEY, processes + [self._process_key], None)
+
+    def snapshot(self) -> Snapshot:
+        processes = cache.get(self.PROCESSES_KEY) or []
+        published = cache.get_many(processes) if processes else {}
+        if len(published) < len(processes):
+            # Forget the processes whose metrics have expired.
+            cache.set(self.PROCESSES_KEY, [key for key in processes if key in published or key == self._process_key], None)
+        published[self._process_key] = super().snapshot()
+        return merge_snapshots(published.values())
+
+    def reset(self) -> None:
+        super().reset()
+        processes = cache.get(self.PROCESSES_KEY) or []
+        cache.delete_many(processes)
+        cache.delete(self.PROCESSES_KEY)
+
+
+_sink: Optional[MetricsSink] = None
+
+
+def get_sink() -> MetricsSink:
+    global _sink
+    if _sink is None:
+        path = getattr(settings, 'CACHE_METRICS_SINK', None)
+        _sink = import_string(path)() if path else MetricsSink()
+    return _sink
+
+
+def set_sink(sink: Optional[MetricsSink]) -> None:
+    """
+    Replaces the sink. None loads the sink from the settings when it is
+    used the next time.
+    """
+    global _sink
+    _sink = sink
+
+
+def increment(cache_name: str, name: str, amount: int = 1) -> None:
+    get_sink().increment(cache_name, name, amount)
+
+
+def observe(cache_name: str, name: str, value: float) -> None:
+    get_sink().observe(cache_name, name, value)
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def render_prometheus(snapshot: Snapshot) -> str:
+    """
+    Returns the snapshot in the Prometheus text exposition format.
+    """
+    lines: List[str] = []
+    for name, description in COUNTERS.items():
+        metric = 'aplus_cache_%s_total' % name
+        samples = [
+            (cache_name, counters[name])
+            for cache_name, counters in sorted(snapshot['counters'].items())
+            if name in counters
+        ]
+        lines.append('# HELP %s %s' % (metric, description))
+        lines.append('# TYPE %s counter' % metric)
+        for cache_name, value in samples:
+            lines.append('%s{cache="%s"} %s' % (metric, cache_name, _format_value(value)))
+    for name, (description, bounds) in HISTOGRAMS.items():
+        metric = 'aplus_cache_%s' % name
+        lines.append('# HELP %s %s' % (metric, description))
+        lines.append('# TYPE %s histogram' % metric)
+        for cache_name, histograms in sorted(snapshot['histograms'].items()):
+            histogram = histograms.get(name)
+            if histogram is None:
+                continue
+            cumulative = 0
+            buckets: List[Tuple[str, int]] = []
+            for bound, count in zip(bounds, histogram['buckets']):
+                cumulative += count
+                buckets.append((_format_value(bound), cumulative))
+            buckets.append(('+Inf', histogram['count']))
+            for bound, count in buckets:
+                lines.append('%s_bucket{cache="%s",le="%s"} %d' % (metric, cache_name, bound, count))
+            lines.append('%s_sum{cache="%s"} %s' % (metric, cache_name, _format_value(histogram['sum'])))
+            lines.append('%s_count{cache="%s"} %d' % (metric, cache_name, histogram['count']))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,107 @@
+"""
+Compact storage format for large cached values.
+
+The values are pickled and compressed with lz4, or with zlib if lz4 is not
+installed. Pickle stores each repeated dict key of the cached data once and
+refers to it by a memo index, and the compression removes most of the
+remaining repetition, e.g. the module fields that are copied to every entry
+of the module. A value that is still larger than `CACHE_CHUNK_SIZE` bytes
+after the compression is split into chunks that are stored in separate
+cache keys, so that it is not dropped by the item size limit of the cache.
+"""
+import logging
+import pickle
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from django.conf import settings
+
+
+logger = logging.getLogger('aplus.cached')
+
+try:
+    from lz4.block import compress as _compress, decompress
+    def compress(data):
+        return _compress(data, compression=1)
+except ImportError:
+    logger.warning("Unable to import lz4, using a slower zlib instead")
+    from zlib import compress as _compress, decompress
+    def compress(data):
+        return _compress(data, level=1)
+
+
+DEFAULT_CHUNK_SIZE = 900000
+
+
+class PackedValue(object):
+    """
+    A compressed value. The compressed bytes are either in `payload` or,
+    if the value was too big, split into `chunks` cache keys that are
+    tagged with `token`.
+    """
+    __slots__ = ('payload', 'chunks', 'token')
+
+    def __init__(self, payload: Optional[bytes], chunks: int = 0, token: Optional[str] = None) -> None:
+        self.payload = payload
+        self.chunks = chunks
+        self.token = token
+
+    def __getstate__(self) -> Tuple[Optional[bytes], int, Optional[str]]:
+        return (self.payload, self.chunks, self.token)
+
+    def __setstate__(self, state: Tuple[Optional[bytes], int, Optional[str]]) -> None:
+        self.payload, self.chunks, self.token = state
+
+    def chunk_keys(self, cache_key: str) -> List[str]:
+        return [chunk_key(cache_key, i) for i in range(self.chunks)]
+
+
+def chunk_key(cache_key: str, i: int) -> str:
+    return '%s:c%d' % (cache_key, i)
+
+
+def chunk_count_key(cache_key: str) -> str:
+    return '%s:ccount' % cache_key
+
+
+def pack(cache_key: str, value: Any, chunk_size: Optional[int] = None) -> Tuple[PackedValue, Dict[str, Any]]:
+    """
+    Returns the packed value and a dict of the chunks that must be stored
+    in the cache next to it. The dict is empty, if the value fits in one key.
+    Nothing is written to the cache here.
+    """
+    if chunk_size is None:
+        chunk_size = getattr(settings, 'CACHE_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    payload = compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+    if len(payload) <= chunk_size:
+        return PackedValue(payload), {}
+    # The chunks are tagged, so that chunks written by another process for
+    # the same key are not mixed with these.
+    token = uuid4().hex
+    chunks = {
+        chunk_key(cache_key, i): (token, payload[start:start + chunk_size])
+        for i, start in enumerate(range(0, len(payload), chunk_size))
+    }
+    return PackedValue(None, len(chunks), token), chunks
+
+
+def unpack(cache_key: str, packed: PackedValue, chunks: Dict[str, Any]) -> Optional[Any]:
+    """
+    Returns the value of the packed value and its chunks read from the cache,
+    or None, if a chunk is missing or the value can not be decoded.
+    """
+    if packed.payload is not None:
+        payload = packed.payload
+    else:
+        parts = []
+        for key in packed.chunk_keys(cache_key):
+            chunk = chunks.get(key)
+            if not isinstance(chunk, tuple) or len(chunk) != 2 or chunk[0] != packed.token:
+                return None
+            parts.append(chunk[1])
+        payload = b''.join(parts)
+    try:
+        return pickle.loads(decompress(payload))
+    except Exception:
+        logger.warning("Failed to unpack the cached value of %s", cache_key, exc_info=True)
+        return None
@@ -1,8 +1,10 @@
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, override_settings
 from threading import Thread, Event, Barrier
 from unittest.mock import patch, Mock
 
+from lib.cache import metrics
 from lib.cache.cached import CachedAbstract
+from lib.cache.packed import PackedValue, chunk_count_key
 
 
 class TestCached(CachedAbstract):
@@ -14,6 +16,22 @@ class TestCached(CachedAbstract):
         return self._fake_func(data)
 
 
+class TestCompactCached(TestCached):
+    KEY_PREFIX = 'compact'
+    COMPACT = True
+
+
+class TestScopedCached(CachedAbstract):
+    GENERATION_SCOPE = 1
+
+    def __init__(self, scope, user, func):
+        self._fake_func = func
+        super().__init__(scope, user)
+
+    def _generate_data(self, *models, data=None):
+        return self._fake_func(data)
+
+
 mock_cache = {}
 
 def mock_delete(key):
@@ -25,6 +43,16 @@ def mock_set(key, value, timeout=None):
 def mock_get(key, default=None):
     return mock_cache.get(key, default)
 
+def mock_set_many(values, timeout=None):
+    mock_cache.update(values)
+
+def mock_get_many(keys):
+    return {key: mock_cache[key] for key in keys if key in mock_cache}
+
+def mock_delete_many(keys):
+    for key in keys:
+        mock_cache.pop(key, None)
+
 def mock_add(key, value, timeout=None):
     if key not in mock_cache:
         mock_cache[key] = value
@@ -35,7 +63,8 @@ def mock_add(key, value, timeout=None):
 def cache_patcher():
     return patch.multiple('lib.cache.cached.cache',
         add=mock_add, delete=mock_delete,
-        get=mock_get, set=mock_set)
+        get=mock_get, set=mock_set, set_many=mock_set_many,
+        get_many=mock_get_many, delete_many=mock_delete_many)
 
 
 @cache_patcher()
@@ -94,6 +123,157 @@ class CachedTest(SimpleTestCase):
         cached3 = TestCached(lambda x: data3)
         self.assertEqual(cached3.data, data3)
 
+    def test_get_many_cached(self):
+        """
+        get_many_cached should return the valid values and report missing and
+        invalidated keys, which can then be filled with add_generated.
+        """
+        data = "Some data"
+        TestCached(lambda x: data)
+        key = TestCached._key(modifiers=[])
+        found, missing = TestCached.get_many_cached([key, "abstract:missing"])
+        self.assertEqual(found, {key: data})
+        self.assertEqual(missing, ["abstract:missing"])
+
+        TestCached.invalidate()
+        found, missing = TestCached.get_many_cached([key])
+        self.assertEqual(found, {})
+        self.assertEqual(missing, [key])
+
+        # Invalidated value was removed, so the new value can be added.
+        self.assertTrue(TestCached.add_generated(key, 1, "New data"))
+        self.assertEqual(TestCached(lambda x: "Ignored data").data, "New data")
+
+        # Value is not stored, if it was invalidated during the generation.
+        TestCached.invalidate()
+        found, missing = TestCached.get_many_cached([key])
+        TestCached.invalidate()
+        self.assertFalse(TestCached.add_generated(key, 2, "Wrong data"))
+
+    def test_invalidate_generation(self):
+        """
+        Invalidating a generation should invalidate all entries in its scope,
+        but not the entries in other scopes.
+        """
+        TestScopedCached(1, 1, lambda x: "Old data")
+        TestScopedCached(1, 2, lambda x: "Old data")
+        TestScopedCached(2, 1, lambda x: "Other scope")
+        TestScopedCached.invalidate_generation(1)
+        self.assertEqual(TestScopedCached(1, 1, lambda x: "New data").data, "New data")
+        self.assertEqual(TestScopedCached(1, 1, lambda x: "Ignored data").data, "New data")
+        self.assertEqual(TestScopedCached(2, 1, lambda x: "Ignored data").data, "Other scope")
+
+        keys = [TestScopedCached._key(1, user, modifiers=[]) for user in (1, 2)]
+        found, missing = TestScopedCached.get_many_cached(
+            keys,
+            generation_key=TestScopedCached._generation_key(1),
+        )
+        self.assertEqual(found, {keys[0]: "New data"})
+        self.assertEqual(missing, [keys[1]])
+
+        with self.assertRaises(TypeError):
+            TestCached.invalidate_generation()
+
+    def test_invalidate_many(self):
+        """
+        Invalidating many entries should invalidate the given entries only.
+        """
+        TestScopedCached(1, 1, lambda x: "Old data")
+        TestScopedCached(1, 2, lambda x: "Old data")
+        TestScopedCached(2, 1, lambda x: "Other data")
+        TestScopedCached.invalidate_many([(1, 1), (1, 2), (1, 1)])
+        self.assertEqual(TestScopedCached(1, 1, lambda x: "New data").data, "New data")
+        self.assertEqual(TestScopedCached(1, 2, lambda x: "New data").data, "New data")
+        self.assertEqual(TestScopedCached(2, 1, lambda x: "Ignored data").data, "Other data")
+
+    @override_settings(CACHE_CHUNK_SIZE=100)
+    def test_compact(self):
+        """
+        Compact values should be stored compressed and split into chunks,
+        if they are too big, and regenerated, if a chunk is lost.
+        """
+        data = {'rows': [{'id': i, 'name': 'row %d' % (i * 7919)} for i in range(200)]}
+        cached1 = TestCompactCached(lambda x: data)
+        self.assertEqual(cached1.data, data)
+
+        key = TestCompactCached._key(modifiers=[])
+        packed = mock_cache[key][1]
+        self.assertIsInstance(packed, PackedValue)
+        self.assertGreater(packed.chunks, 1)
+        self.assertEqual(
+            sorted(packed.chunk_keys(key)),
+            sorted(k for k in mock_cache if k not in (key, chunk_count_key(key))),
+        )
+
+        cached2 = TestCompactCached(lambda x: "Ignored data")
+        self.assertEqual(cached2.data, data)
+        found, missing = TestCompactCached.get_many_cached([key])
+        self.assertEqual(found, {key: data})
+
+        mock_cache.pop(packed.chunk_keys(key)[-1])
+        cached3 = TestCompactCached(lambda x: "New data")
+        self.assertEqual(cached3.data, "New data")
+        self.assertEqual(mock_cache[key][1].chunks, 0)
+        # The chunks of the previous value are deleted.
+        self.assertEqual(sorted(mock_cache), sorted([key, chunk_count_key(key)]))
+
+    @override_settings(CACHE_CHUNK_SIZE=100)
+    def test_compact_lost_race(self):
+        """
+        A compact value that lost the race should not replace the chunks of
+        the stored value.
+        """
+        def rows(name):
+            return {'rows': [{'id': i, 'name': '%s %d' % (name, i * 7919)} for i in range(200)]}
+        data1 = rows("wrong")
+        data2 = rows("correct")
+        key = TestCompactCached._key(modifiers=[])
+
+        # The generation that started first completes last
+        def create(data):
+            TestCompactCached(lambda x: data2)
+            return data1
+        TestCompactCached(create)
+        self.assertEqual(TestCompactCached(lambda x: "Ignored").data, data2)
+
+        # A bulk generation completes after the stored one
+        self.assertFalse(TestCompactCached.add_generated(key, 0, data1))
+        found, missing = TestCompactCached.get_many_cached([key])
+        self.assertEqual(found, {key: data2})
+
+    def test_metrics(self):
+        """
+        Cached should report hits, misses, invalidations and lost races.
+        """
+        sink = metrics.LocalSink()
+        metrics.set_sink(sink)
+        try:
+            TestCached(lambda x: "Data")
+            TestCached(lambda x: "Ignored data")
+            def create(data):
+                TestCached.invalidate()
+                return "Wrong data"
+            TestCached.invalidate()
+            TestCached(create)
+        finally:
+            metrics.set_sink(None)
+
+        snapshot = sink.snapshot()
+        self.assertEqual(snapshot['counters']['TestCached'], {
+            'hits': 1,
+            'misses': 2,
+            'invalidations': 2,
+            'lost_races': 1,
+        })
+        histograms = snapshot['histograms']['TestCached']
+        self.assertEqual(histograms['generation_seconds']['count'], 2)
+        self.assertEqual(histograms['value_bytes']['count'], 2)
+
+        text = metrics.render_prometheus(snapshot)
+        self.assertIn('aplus_cache_hits_total{cache="TestCached"} 1\n', text)
+        self.assertIn('aplus_cache_generation_seconds_count{cache="TestCached"} 2\n', text)
+        self.assertIn('aplus_cache_value_bytes_bucket{cache="TestCached",le="+Inf"} 2\n', text)
+
     def test_out_of_order_update(self):
         """
         Cached should store the data, which generation was started at the latest point in time.
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http.request import HttpRequest
+from django.http.response import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+from .metrics import get_sink, render_prometheus
+
+
+def cache_metrics(request: HttpRequest) -> HttpResponse:
+    """
+    Returns the cache metrics in the Prometheus text format. The metrics are
+    available to superusers and to requests that present the bearer token
+    set in `CACHE_METRICS_TOKEN`.
+    """
+    token = getattr(settings, 'CACHE_METRICS_TOKEN', None)
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if not (
+        request.user.is_superuser
+        or (token and constant_time_compare(authorization, 'Bearer ' + token))
+    ):
+        raise PermissionDenied()
+    return HttpResponse(
+        render_prometheus(get_sink().snapshot()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -0,0 +1,235 @@
+"""
+Streamed delivery of stored files, e.g. the files submitted by students.
+
+The files are read and sent in chunks, so the memory used by a download does
+not depend on the size of the file. Single byte range requests are supported,
+so interrupted downloads can be resumed. Alternatively, the sending can be
+offloaded to the web server with the `FILE_SERVE_OFFLOAD` setting:
+
+- 'x-sendfile': the `X-Sendfile` header contains the absolute path of the
+  file (Apache mod_xsendfile and compatible servers),
+- 'x-accel-redirect': the `X-Accel-Redirect` header contains the path of the
+  file relative to the storage, prefixed with `FILE_SERVE_ACCEL_PREFIX`
+  (an internal location in nginx).
+"""
+import codecs
+import mimetypes
+import re
+from typing import Callable, Iterator, Optional, Tuple, Union
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files import File
+from django.http.request import HttpRequest
+from django.http.response import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseBase,
+    StreamingHttpResponse,
+)
+
+
+CHUNK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^\s*bytes\s*=\s*(\d*)\s*-\s*(\d*)\s*$')
+# Returned by `parse_range` for ranges that do not overlap the file.
+UNSATISFIABLE = 'unsatisfiable'
+
+
+class StoredFileResponse(FileResponse):
+    block_size = CHUNK_SIZE
+
+
+class FileSlice:
+    """
+    A read-only file object for reading `length` bytes of `file` starting
+    from `start`.
+    """
+    def __init__(self, file: File, start: int, length: int) -> None:
+        self.file = file
+        self.remaining = length
+        if start:
+            file.seek(start)
+
+    def read(self, size: int = -1) -> bytes:
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def content_disposition(filename: str, as_attachment: bool = False) -> str:
+    disposition = 'attachment' if as_attachment else 'inline'
+    try:
+        filename.encode('ascii')
+        file_expr = 'filename="{}"'.format(filename.replace('\\', '\\\\').replace('"', r'\"'))
+    except UnicodeEncodeError:
+        file_expr = "filename*=utf-8''{}".format(quote(filename))
+    return '{}; {}'.format(disposition, file_expr)
+
+
+def parse_range(header: Optional[str], size: int) -> Union[None, str, Tuple[int, int]]:
+    """
+    Returns the first and the last byte of a single byte range in the Range
+    header, or `UNSATISFIABLE`. Returns None if the whole file should be
+    sent: there is no header, it is malformed, or it has several ranges.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header)
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            return UNSATISFIABLE
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        return UNSATISFIABLE
+    return start, min(end, size - 1)
+
+
+def serve_file(
+        request: HttpRequest,
+        file: File,
+        content_type: Optional[str] = None,
+        filename: Optional[str] = None,
+        as_attachment: bool = False,
+        ) -> HttpResponseBase:
+    """
+    Returns a response that sends the stored file, e.g. a `FieldFile`.
+    Raises OSError, if the file does not exist.
+    """
+    size = file.size
+    offload = getattr(settings, 'FILE_SERVE_OFFLOAD', None)
+    if offload:
+        # The web server replaces the body and handles the range requests.
+        if not content_type and filename:
+            content_type = mimetypes.guess_type(filename)[0]
+        response = HttpResponse(content_type=content_type or 'application/octet-stream')
+        if offload == 'x-accel-redirect':
+            prefix = getattr(settings, 'FILE_SERVE_ACCEL_PREFIX', '/protected-media/')
+            response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(file.name)
+        else:
+            response['X-Sendfile'] = file.path
+        if filename:
+            response['Content-Disposition'] = content_disposition(filename, as_attachment)
+        return response
+
+    byte_range = requested_range(request, size)
+    if byte_range == UNSATISFIABLE:
+        return _range_not_satisfiable(size)
+
+    start, end = byte_range or (0, size - 1)
+    file.open('rb')
+    # The content type is guessed from the file name, if it is not given.
+    response = StoredFileResponse(
+        FileSlice(file, start, end - start + 1),
+        content_type=content_type,
+        filename=filename or '',
+        as_attachment=as_attachment,
+    )
+    _set_range_headers(response, byte_range, size)
+    return response
+
+
+def serve_stream(
+        request: HttpRequest,
+        size: int,
+        iter_range: Callable[[int, int], Iterator[bytes]],
+        content_type: str,
+        filename: Optional[str] = None,
+        as_attachment: bool = False,
+        etag: Optional[str] = None,
+        ) -> HttpResponseBase:
+    """
+    Returns a response that sends `size` bytes of generated content, e.g. an
+    archive. `iter_range(start, end)` yields the bytes from `start` to `end`,
+    both included. The content must be the same for the same `etag`, which
+    is checked against the If-Range header of range requests.
+    """
+    byte_range = requested_range(request, size, etag)
+    if byte_range == UNSATISFIABLE:
+        return _range_not_satisfiable(size)
+
+    start, end = byte_range or (0, size - 1)
+    response = StreamingHttpResponse(iter_range(start, end) if size else iter([]), content_type=content_type)
+    if filename:
+        response['Content-Disposition'] = content_disposition(filename, as_attachment)
+    if etag:
+        response['ETag'] = etag
+    _set_range_headers(response, byte_range, size)
+    return response
+
+
+def requested_range(
+        request: HttpRequest,
+        size: int,
+        etag: Optional[str] = None,
+        ) -> Union[None, str, Tuple[int, int]]:
+    """
+    Returns the byte range requested with the Range header, see `parse_range`.
+    If the request has an If-Range header, the range is honored only if the
+    header matches `etag`.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range is not None and (not etag or if_range.strip() != etag):
+        return None
+    return parse_range(request.META.get('HTTP_RANGE'), size)
+
+
+def _range_not_satisfiable(size: int) -> HttpResponse:
+    response = HttpResponse(status=416)
+    response['Content-Range'] = 'bytes */{:d}'.format(size)
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _set_range_headers(response: HttpResponseBase, byte_range: Optional[Tuple[int, int]], size: int) -> None:
+    start, end = byte_range or (0, size - 1)
+    response['Content-Length'] = str(end - start + 1)
+    response['Accept-Ranges'] = 'bytes'
+    if byte_range:
+        response.status_code = 206
+        response['Content-Range'] = 'bytes {:d}-{:d}/{:d}'.format(start, end, size)
+
+
+def _decode_chunks(file: File, errors: str) -> Iterator[bytes]:
+    decoder = codecs.getincrementaldecoder('utf-8')(errors)
+    try:
+        for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+            text = decoder.decode(chunk)
+            if text:
+                yield text.encode('utf-8')
+        text = decoder.decode(b'', final=True)
+        if text:
+            yield text.encode('utf-8')
+    finally:
+        file.close()
+
+
+def serve_text_file(file: File, errors: str = 'ignore') -> StreamingHttpResponse:
+    """
+    Returns a response that sends the stored file as UTF-8 text. The file is
+    decoded in chunks, and the invalid bytes are handled according to
+    `errors`. Raises OSError, if the file does not exist.
+    """
+    file.open('rb')
+    return StreamingHttpResponse(
+        _decode_chunks(file, errors),
+        content_type='text/plain; charset="UTF-8"',
+    )
@@ -0,0 +1,160 @@
+"""
+Streamed multipart/form-data request bodies, e.g. for posting submissions to
+the graders.
+
+The `requests` library builds the whole multipart body in memory before it is
+sent, so a submission with large files is held in memory, possibly several
+times. `MultipartEncoder` produces the same body incrementally: the files are
+read in chunks while the body is sent, and the length of the body is
+calculated beforehand, so the request has a Content-Length header and is not
+chunked. Usage:
+
+    encoder = MultipartEncoder(data, files)
+    requests.post(url, data=encoder, headers={'Content-Type': encoder.content_type})
+"""
+import os
+from typing import IO, Any, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+from urllib3.fields import RequestField
+from urllib3.filepost import choose_boundary
+
+CHUNK_SIZE = 64 * 1024
+
+Fields = Union[Mapping[str, Any], Iterable[Tuple[str, Any]]]
+
+
+def _items(fields: Optional[Fields]) -> List[Tuple[str, Any]]:
+    if not fields:
+        return []
+    if isinstance(fields, Mapping):
+        return list(fields.items())
+    return list(fields)
+
+
+def _remaining_size(file: IO[bytes]) -> int:
+    # The number of bytes from the current position to the end of the file.
+    position = file.tell()
+    try:
+        return os.fstat(file.fileno()).st_size - position
+    except (AttributeError, OSError, ValueError):
+        end = file.seek(0, os.SEEK_END)
+        file.seek(position)
+        return end - position
+
+
+class MultipartEncoder:
+    """
+    A file-like multipart/form-data body of the form fields `data` and the
+    files `files` in the format of the `data` and `files` parameters of
+    `requests`: the values of `data` are strings or lists of strings, and the
+    values of `files` are tuples (filename, file[, content_type[, headers]]).
+    The files are read from their current position, and they must not be
+    modified while the body is read.
+
+    At most `CHUNK_SIZE` bytes of the files are buffered at a time, regardless
+    of the size asked with `read`.
+    """
+    def __init__(self, data: Optional[Fields] = None, files: Optional[Fields] = None, boundary: Optional[str] = None) -> None:
+        self.boundary = boundary or choose_boundary()
+        # Parts are bytes or (file, start, size).
+        self.parts: List[Union[bytes, Tuple[IO[bytes], int, int]]] = []
+        for name, value in _items(data):
+            if isinstance(value, (str, bytes)) or not hasattr(value, '__iter__'):
+                value = [value]
+            for item in value:
+                if item is None:
+                    continue
+                if isinstance(item, bytes):
+                    item = item.decode('utf-8')
+                field = RequestField(name, '')
+                field.make_multipart()
+                self._add_field(field, str(item).encode('utf-8'))
+        for name, value in _items(files):
+            filename, file, content_type, headers = (tuple(value) + (None, None))[:4]
+            field = RequestField(name, '', filename=filename, headers=headers)
+            field.make_multipart(content_type=content_type)
+            if isinstance(file, str):
+                file = file.encode('utf-8')
+            if isinstance(file, bytes):
+                self._add_field(field, file)
+            else:
+                self._add_field(field, (file, file.tell(), _remaining_size(file)))
+        self.parts.append('--{}--\r\n'.format(self.boundary).encode('latin-1'))
+        self.length = sum(
+            len(part) if isinstance(part, bytes) else part[2]
+            for part in self.parts
+        )
+        self.rewind()
+
+    def _add_field(self, field: RequestField, content: Union[bytes, Tuple[IO[bytes], int, int]]) -> None:
+        self.parts.append(
+            '--{}\r\n'.format(self.boundary).encode('latin-1')
+            + field.render_headers().encode('utf-8')
+        )
+        self.parts.append(content)
+        self.parts.append(b'\r\n')
+
+    @property
+    def content_type(self) -> str:
+        return 'multipart/form-data; boundary={}'.format(self.boundary)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def rewind(self) -> None:
+        """
+        Starts the body from the beginning, e.g. for retrying the request.
+        """
+        self._index = 0
+        self._offset = 0
+        for part in self.parts:
+            if not isinstance(part, bytes):
+                part[0].seek(part[1])
+
+    def _next_chunk(self, size: int) -> bytes:
+        # Returns at most `size` bytes from the current part, or b'' at the end.
+        while self._index < len(self.parts):
+            part = self.parts[self._index]
+            if isinstance(part, bytes):
+                chunk = part[self._offset:self._offset + size]
+                part_size = len(part)
+            else:
+                file, _start, part_size = part
+                chunk = file.read(min(size, CHUNK_SIZE, part_size - self._offset)) if self._offset < part_size else b''
+                if not chunk and self._offset < part_size:
+                    raise OSError("The file of the field was shorter than expected")
+            self._offset += len(chunk)
+            if self._offset >= part_size:
+                self._index += 1
+                self._offset = 0
+            if chunk:
+                return chunk
+        return b''
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Returns the next at most `size` bytes of the body, or the rest of the
+        body, if `size` is negative.
+        """
+        if size is None or size < 0:
+            return b''.join(iter(lambda: self._next_chunk(CHUNK_SIZE), b''))
+        chunks = []
+        while size > 0:
+            chunk = self._next_chunk(size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def __iter__(self) -> Iterator[bytes]:
+        return iter(lambda: self.read(CHUNK_SIZE), b'')
+
+    def to_string(self) -> bytes:
+        """
+        Returns the whole body. Meant for tests and small bodies.
+        """
+        self.rewind()
+        body = self.read()
+        self.rewind()
+        return body
@@ -1,3 +1,4 @@
+from functools import lru_cache
 import logging
 import posixpath
 import re
@@ -17,6 +18,8 @@ from django.utils.translation import gettext_lazy as _
 
 from aplus_auth.requests import post as aplus_post, get as aplus_get
 
+from lib.multipart import MultipartEncoder
+
 
 logger = logging.getLogger('aplus.remote_page')
 
@@ -56,13 +59,29 @@ def request_for_response(url,
         else:
             permissions.instances.add(Permission.READ, id=instance_id)
 
+    # The files are streamed to the grader instead of building the whole
+    # request body in memory.
+    encoder = None
+    if post and files and settings.EXERCISE_HTTP_STREAM_FILES:
+        encoder = MultipartEncoder(data, files)
+
     try:
         last_retry = len(settings.EXERCISE_HTTP_RETRIES) - 1
         n = 0
         while n <= last_retry:
             try:
                 request_time = time.time()
-                if post:
+                if encoder is not None:
+                    logger.info("POST %s", url)
+                    encoder.rewind()
+                    response = aplus_post(
+                        url,
+                        permissions=permissions,
+                        data=encoder,
+                        headers={'Content-Type': encoder.content_type},
+                        timeout=settings.EXERCISE_HTTP_TIMEOUT
+                    )
+                elif post:
                     logger.info("POST %s", url)
                     response = aplus_post(
                         url,
@@ -110,6 +129,121 @@ def request_for_response(url,
         )) from e
 
 
+# The attributes that contain the URLs to fix in RemotePage.fix_relative_urls.
+URL_ATTRIBUTES = {
+    "img": "src",
+    "script": "src",
+    "iframe": "src",
+    "link": "href",
+    "a": "href",
+    "video": "poster",
+    "source": "src",
+}
+# Starts with "#", "//" or "https:".
+ABSOLUTE_URL_RE = re.compile(r'^(#|\/\/|\w+:)', re.IGNORECASE)
+# Ends with filename extension ".html" and possibly "#anchor".
+CHAPTER_RE = re.compile(r'.*\.html(#.+)?$', re.IGNORECASE)
+# Starts with at least one "../".
+START_DOTDOT_PATH_RE = re.compile(r"^(../)+")
+# May end with the language suffix _en or _en/#anchor or _en#anchor.
+LANG_SUFFIX_RE = re.compile(r'(?P<lang>_[a-z]{2})?(?P<slash>/)?(?P<anchor>#.+)?$')
+# Detect certain A+ exercise info URLs so that they are not broken by
+# the transformations: "../../module1/chapter/module1_chapter_exercise/info/model/".
+# URLs /plain, /info, /info/model, /info/template.
+EXERCISE_INFO_RE = re.compile(r'/((plain)|(info(/model|/template)?))/?(#.+)?$')
+
+
+@lru_cache(maxsize=4096)
+def fix_url(base_url: str, value: str, chapter: bool, aplus_path: Optional[str]) -> Optional[str]:
+    """
+    Returns the fixed URL of a link or a resource in a page loaded from
+    `base_url`, or None, if the URL is not changed. `chapter` tells if the
+    element has the data-aplus-chapter attribute and `aplus_path` is the
+    value of its data-aplus-path attribute. The pages of a course repeat the
+    same URLs, so the results are cached.
+    """
+    # Custom transform for RST chapter to chapter links.
+    if chapter:
+        m = CHAPTER_RE.match(value)
+        if m:
+            i = m.start(1)
+            if i > 0:
+                without_html_suffix = value[:i-5] + value[i:] # Keep #anchor in the end.
+            else:
+                without_html_suffix = value[:-5]
+        elif not value.startswith('/'):
+            without_html_suffix = value
+        else:
+            return None
+        # Remove all ../ from the start and prepend exactly "../../".
+        # a-plus-rst-tools modifies chapter links so that the URL path
+        # begins from the html build root directory (_build/html).
+        # The path starts with "../" to match the directory depth and
+        # there are as many "../" as needed to reach the root.
+        # Chapter html files are located under module directories in
+        # the _build/html directory and some courses use subdirectories
+        # under the module directories too.
+        # In A+, the URL path must start with "../../" so that it
+        # removes the current chapter and module from the A+ chapter
+        # page URL: /course/course_instance/module/chapter/
+        # (A+ URLs do not have the same "subdirectories" as
+        # the real subdirectories in the course git repo.)
+        new_val = '../../' + START_DOTDOT_PATH_RE.sub("", without_html_suffix)
+
+        split_path = new_val.split('/')
+        if len(split_path) > 4 and not EXERCISE_INFO_RE.search(new_val):
+            # If the module directory has subdirectories in the course
+            # git repo, the subdirectory must be modified in the A+ URL.
+            # The subdirectory slash / is converted to underscore _.
+            # Convert "../../module1/subdir/chapter2_en" into "../../module1/subdir_chapter2_en".
+            # Do not convert if the URL points to an A+ page such as
+            # "../../module1/chapter2/info/model/".
+            chapter_key = '_'.join(split_path[3:])
+            new_val = '/'.join(split_path[:3]) + '/' + chapter_key
+
+        # Remove lang suffix in chapter2_en#anchor without modifying the #anchor.
+        # Add slash / to the end before the #anchor.
+        m = LANG_SUFFIX_RE.search(new_val)
+        if m:
+            anchor = m.group('anchor')
+            if anchor is None:
+                anchor = ''
+            new_val = new_val[:m.start()] + '/' + anchor
+
+        return new_val
+
+    if ABSOLUTE_URL_RE.match(value):
+        return None
+
+    # Custom transform for RST generated exercises.
+    if aplus_path is not None:
+        # If the exercise description HTML has links to static files such as images,
+        # their links can be fixed with the data-aplus-path="/static/{course}" attribute.
+        # A+ converts "{course}" into the course key used by the backend based on
+        # the exercise service URL. For example, in the MOOC-Grader, exercise service URLs
+        # follow this scheme: "http://grader.local/coursekey/exercisekey".
+        # In the exercise HTML, image <img data-aplus-path="/static/{course}" src="../_images/image.png">
+        # gets the correct URL "http://grader.local/static/coursekey/_images/image.png".
+        fix_path = aplus_path.replace(
+            '{course}',
+            urlparse(base_url).path.split('/', 2)[1]
+        )
+        fix_value = START_DOTDOT_PATH_RE.sub("/", value)
+        value = fix_path + fix_value
+
+    # url points to the exercise service, e.g., MOOC-Grader.
+    # This fixes links to static files (such as images) in RST chapters.
+    # The image URL must be absolute and refer to the grader server
+    # instead of the A+ server. A relative URL with only path
+    # "/static/course/image.png" would target the A+ server when
+    # it is included in the A+ page. The value should be a relative
+    # path in the course build directory so that it becomes the full
+    # correct URL to the target file.
+    # E.g., urljoin('http://localhost:8080/static/default/module1/chapter.html', "../_images/image.png")
+    # -> 'http://localhost:8080/static/default/_images/image.png'
+    return urljoin(base_url, value)
+
+
 class RemotePage:
     """
     Represents a page that can be loaded over HTTP for further processing.
@@ -190,116 +324,24 @@ class RemotePage:
         return self.element_or_body([])
 
     def fix_relative_urls(self):
-        url = self.base_address()
-        for tag,attr in [
-            ("img","src"),
-            ("script","src"),
-            ("iframe","src"),
-            ("link","href"),
-            ("a","href"),
-            ("video","poster"),
-            ("source","src"),
-        ]:
-            self._fix_relative_urls(url, tag, attr)
-
-    def _fix_relative_urls(self, url, tag_name, attr_name):
-        # Starts with "#", "//" or "https:".
-        test = re.compile('^(#|\/\/|\w+:)', re.IGNORECASE)
-        # Ends with filename extension ".html" and possibly "#anchor".
-        chapter = re.compile('.*\.html(#.+)?$', re.IGNORECASE)
-        # Starts with at least one "../".
-        start_dotdot_path = re.compile(r"^(../)+")
-        # May end with the language suffix _en or _en/#anchor or _en#anchor.
-        lang_suffix = re.compile(r'(?P<lang>_[a-z]{2})?(?P<slash>/)?(?P<anchor>#.+)?$')
-        # Detect certain A+ exercise info URLs so that they are not broken by
-        # the transformations: "../../module1/chapter/module1_chapter_exercise/info/model/".
-        # URLs /plain, /info, /info/model, /info/template.
-        exercise_info = re.compile(r'/((plain)|(info(/model|/template)?))/?(#.+)?$')
-
-        for element in self.soup.find_all(tag_name, {attr_name:True}):
-            value = element[attr_name]
+        url = self.base_address().geturl()
+        # The elements are visited once. Iterating the descendants is much
+        # faster than find_all, and the strings have no name.
+        for element in self.soup.descendants:
+            attr_name = URL_ATTRIBUTES.get(element.name)
+            if attr_name is None:
+                continue
+            value = element.get(attr_name)
             if not value:
                 continue
-
-            # Custom transform for RST chapter to chapter links.
-            if element.has_attr('data-aplus-chapter'):
-                m = chapter.match(value)
-                if m:
-                    i = m.start(1)
-                    if i > 0:
-                        without_html_suffix = value[:i-5] + value[i:] # Keep #anchor in the end.
-                    else:
-                        without_html_suffix = value[:-5]
-                elif not value.startswith('/'):
-                    without_html_suffix = value
-                else:
-                    continue
-                # Remove all ../ from the start and prepend exactly "../../".
-                # a-plus-rst-tools modifies chapter links so that the URL path
-                # begins from the html build root directory (_build/html).
-                # The path starts with "../" to match the directory depth and
-                # there are as many "../" as needed to reach the root.
-                # Chapter html files are located under module directories in
-                # the _build/html directory and some courses use subdirectories
-                # under the module directories too.
-                # In A+, the URL path must start with "../../" so that it
-                # removes the current chapter and module from the A+ chapter
-                # page URL: /course/course_instance/module/chapter/
-                # (A+ URLs do not have the same "subdirectories" as
-                # the real subdirectories in the course git repo.)
-                new_val = '../../' + start_dotdot_path.sub("", without_html_suffix)
-
-                split_path = new_val.split('/')
-                if len(split_path) > 4 and not exercise_info.search(new_val):
-                    # If the module directory has subdirectories in the course
-                    # git repo, the subdirectory must be modified in the A+ URL.
-                    # The subdirectory slash / is converted to underscore _.
-                    # Convert "../../module1/subdir/chapter2_en" into "../../module1/subdir_chapter2_en".
-                    # Do not convert if the URL points to an A+ page such as
-                    # "../../module1/chapter2/info/model/".
-                    chapter_key = '_'.join(split_path[3:])
-                    new_val = '/'.join(split_path[:3]) + '/' + chapter_key
-
-                # Remove lang suffix in chapter2_en#anchor without modifying the #anchor.
-                # Add slash / to the end before the #anchor.
-                m = lang_suffix.search(new_val)
-                if m:
-                    anchor = m.group('anchor')
-                    if anchor is None:
-                        anchor = ''
-                    new_val = new_val[:m.start()] + '/' + anchor
-
-                element[attr_name] = new_val
-
-            elif value and not test.match(value):
-
-                # Custom transform for RST generated exercises.
-                if element.has_attr('data-aplus-path'):
-                    # If the exercise description HTML has links to static files such as images,
-                    # their links can be fixed with the data-aplus-path="/static/{course}" attribute.
-                    # A+ converts "{course}" into the course key used by the backend based on
-                    # the exercise service URL. For example, in the MOOC-Grader, exercise service URLs
-                    # follow this scheme: "http://grader.local/coursekey/exercisekey".
-                    # In the exercise HTML, image <img data-aplus-path="/static/{course}" src="../_images/image.png">
-                    # gets the correct URL "http://grader.local/static/coursekey/_images/image.png".
-                    fix_path = element['data-aplus-path'].replace(
-                        '{course}',
-                        url.path.split('/', 2)[1]
-                    )
-                    fix_value = start_dotdot_path.sub("/", value)
-                    value = fix_path + fix_value
-
-                # url points to the exercise service, e.g., MOOC-Grader.
-                # This fixes links to static files (such as images) in RST chapters.
-                # The image URL must be absolute and refer to the grader server
-                # instead of the A+ server. A relative URL with only path
-                # "/static/course/image.png" would target the A+ server when
-                # it is included in the A+ page. The value should be a relative
-                # path in the course build directory so that it becomes the full
-                # correct URL to the target file.
-                # E.g., urljoin('http://localhost:8080/static/default/module1/chapter.html', "../_images/image.png")
-                # -> 'http://localhost:8080/static/default/_images/image.png'
-                element[attr_name] = urljoin(url.geturl(), value)
+            new_value = fix_url(
+                url,
+                value,
+                element.has_attr('data-aplus-chapter'),
+                element.get('data-aplus-path'),
+            )
+            if new_value is not None:
+                element[attr_name] = new_value
 
     def find_and_replace(self, attr_name, list_of_attributes):
         l = len(list_of_attributes)
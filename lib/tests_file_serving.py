@@ -0,0 +1,69 @@
+import tempfile
+from types import SimpleNamespace
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db.models.fields.files import FieldFile
+from django.test import SimpleTestCase, override_settings
+from django.test.client import RequestFactory
+
+from lib.file_serving import UNSATISFIABLE, parse_range, serve_file, serve_text_file
+
+
+class FileServingTest(SimpleTestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.storage = FileSystemStorage(location=self.tmpdir.name)
+        self.content = 'Hyvää päivää\n'.encode('utf-8') * 10000
+        name = self.storage.save('dir/file.txt', ContentFile(self.content))
+        self.file = FieldFile(None, SimpleNamespace(storage=self.storage), name)
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        self.file.close()
+        self.tmpdir.cleanup()
+
+    def test_parse_range(self):
+        self.assertIsNone(parse_range(None, 100))
+        self.assertIsNone(parse_range('bytes=0-1,5-6', 100))
+        self.assertIsNone(parse_range('bytes=5-1', 100))
+        self.assertEqual(parse_range('bytes=10-', 100), (10, 99))
+        self.assertEqual(parse_range('bytes=10-200', 100), (10, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=100-', 100), UNSATISFIABLE)
+
+    def test_serve_file(self):
+        response = serve_file(self.factory.get('/'), self.file, filename='file.txt', as_attachment=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="file.txt"')
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        response.close()
+
+        response = serve_file(self.factory.get('/', HTTP_RANGE='bytes=100-199'), self.file)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 100-199/{}'.format(len(self.content)))
+        self.assertEqual(b''.join(response.streaming_content), self.content[100:200])
+        response.close()
+
+        response = serve_file(self.factory.get('/', HTTP_RANGE='bytes=999999-'), self.file)
+        self.assertEqual(response.status_code, 416)
+
+    def test_serve_file_offload(self):
+        with override_settings(FILE_SERVE_OFFLOAD='x-accel-redirect', FILE_SERVE_ACCEL_PREFIX='/protected/'):
+            response = serve_file(self.factory.get('/'), self.file)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected/dir/file.txt')
+        self.assertEqual(response.content, b'')
+        with override_settings(FILE_SERVE_OFFLOAD='x-sendfile'):
+            response = serve_file(self.factory.get('/'), self.file)
+        self.assertEqual(response['X-Sendfile'], self.file.path)
+
+    def test_serve_text_file(self):
+        # The invalid bytes are dropped, also when a character is split
+        # between two chunks.
+        name = self.storage.save('broken.txt', ContentFile(b'\xff' + self.content))
+        response = serve_text_file(FieldFile(None, SimpleNamespace(storage=self.storage), name))
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        response.close()
@@ -0,0 +1,111 @@
+import io
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import requests
+from django.test import SimpleTestCase
+
+from lib.multipart import CHUNK_SIZE, MultipartEncoder
+
+
+class GraderHandler(BaseHTTPRequestHandler):
+    """
+    A stand-in grader that records the posted requests.
+    """
+    def do_POST(self):
+        length = int(self.headers['Content-Length'])
+        body = self.rfile.read(length)
+        self.server.received.append((self.headers, body))
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, format, *args): # pylint: disable=redefined-builtin
+        pass
+
+
+def parse_form(content_type, body):
+    message = BytesParser(policy=HTTP).parsebytes(
+        b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body
+    )
+    return [
+        (part.get_param('name', header='content-disposition'), part.get_filename(), part.get_payload(decode=True))
+        for part in message.iter_parts()
+    ]
+
+
+class MultipartEncoderTest(SimpleTestCase):
+
+    def setUp(self):
+        self.data = {'answer': ['42', 'ääkkönen'], 'lang': 'fi'}
+        self.large = bytes(range(256)) * 2000
+
+    def files(self):
+        return {
+            'file1': ('large.bin', io.BytesIO(self.large)),
+            'file2': ('tyhjä.txt', io.BytesIO(b'')),
+        }
+
+    def test_same_body_as_requests(self):
+        expected = requests.Request(
+            'POST',
+            'http://localhost/',
+            data=self.data,
+            files=self.files(),
+        ).prepare()
+        encoder = MultipartEncoder(self.data, self.files())
+        self.assertEqual(
+            encoder.to_string(),
+            expected.body.replace(
+                expected.headers['Content-Type'].split('boundary=')[1].encode('ascii'),
+                encoder.boundary.encode('ascii'),
+            ),
+        )
+        self.assertEqual(len(encoder), len(expected.body))
+
+    def test_bounded_reads(self):
+        encoder = MultipartEncoder(self.data, self.files())
+        body = encoder.to_string()
+        chunks = list(iter(lambda: encoder.read(len(body)), b''))
+        self.assertEqual(b''.join(chunks), body)
+        self.assertTrue(all(len(chunk) <= CHUNK_SIZE for chunk in encoder))
+        # The body can be read again from the beginning, e.g. for a retry.
+        encoder.rewind()
+        encoder.read(1000)
+        encoder.rewind()
+        self.assertEqual(encoder.read(), body)
+
+    def test_post_to_grader(self):
+        server = HTTPServer(('127.0.0.1', 0), GraderHandler)
+        server.received = []
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            encoder = MultipartEncoder(self.data, self.files())
+            response = requests.post(
+                'http://127.0.0.1:{:d}/grade'.format(server.server_port),
+                data=encoder,
+                headers={'Content-Type': encoder.content_type},
+                timeout=10,
+            )
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+        self.assertEqual(response.text, 'ok')
+        self.assertEqual(len(server.received), 1)
+        headers, body = server.received[0]
+        self.assertEqual(int(headers['Content-Length']), len(encoder))
+        self.assertIsNone(headers['Transfer-Encoding'])
+        self.assertEqual(parse_form(headers['Content-Type'], body), [
+            ('answer', None, '42'.encode('utf-8')),
+            ('answer', None, 'ääkkönen'.encode('utf-8')),
+            ('lang', None, b'fi'),
+            ('file1', 'large.bin', self.large),
+            ('file2', 'tyhjä.txt', b''),
+        ])
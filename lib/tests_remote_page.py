@@ -0,0 +1,112 @@
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup
+from django.test import SimpleTestCase, override_settings
+
+from lib.remote_page import RemotePage, fix_url
+
+
+CHAPTER_URL = 'http://grader.local/static/default/module1/chapter.html'
+EXERCISE_URL = 'http://grader.local/coursekey/exercisekey'
+
+# (page URL, tag, attribute, value, other attributes, fixed value), recorded
+# from the implementation that searched each tag separately.
+FIXED_URLS = [
+    (CHAPTER_URL, 'img', 'src', '../_images/pic.png', {}, 'http://grader.example.com/static/default/_images/pic.png'),
+    (CHAPTER_URL, 'img', 'src', '_images/pic.png', {}, 'http://grader.example.com/static/default/module1/_images/pic.png'),
+    (CHAPTER_URL, 'img', 'src', '/static/pic.png', {}, 'http://grader.example.com/static/pic.png'),
+    (CHAPTER_URL, 'img', 'src', 'http://example.com/pic.png', {}, 'http://example.com/pic.png'),
+    (CHAPTER_URL, 'img', 'src', 'data:image/png;base64,AAAA', {}, 'data:image/png;base64,AAAA'),
+    (CHAPTER_URL, 'img', 'src', '//cdn.example.com/pic.png', {}, '//cdn.example.com/pic.png'),
+    (CHAPTER_URL, 'img', 'src', '', {}, ''),
+    (CHAPTER_URL, 'img', 'src', '../../_images/pic.png', {'data-aplus-path': '/static/{course}'}, 'http://grader.example.com/static/static/_images/pic.png'),
+    (CHAPTER_URL, 'img', 'src', '_images/pic.png', {'data-aplus-path': '/static/{course}'}, 'http://grader.example.com/static/static_images/pic.png'),
+    (CHAPTER_URL, 'img', 'src', 'https://x.org/a.png', {'data-aplus-path': '/static/{course}'}, 'https://x.org/a.png'),
+    (CHAPTER_URL, 'script', 'src', '../_static/script.js', {}, 'http://grader.example.com/static/default/_static/script.js'),
+    (CHAPTER_URL, 'script', 'src', 'https://code.jquery.com/jquery.js', {}, 'https://code.jquery.com/jquery.js'),
+    (CHAPTER_URL, 'iframe', 'src', 'embed/video.html', {}, 'http://grader.example.com/static/default/module1/embed/video.html'),
+    (CHAPTER_URL, 'link', 'href', '../_static/style.css', {}, 'http://grader.example.com/static/default/_static/style.css'),
+    (CHAPTER_URL, 'link', 'href', 'Mailto:teacher@example.com', {}, 'Mailto:teacher@example.com'),
+    (CHAPTER_URL, 'a', 'href', '#section', {}, '#section'),
+    (CHAPTER_URL, 'a', 'href', 'other.html', {}, 'http://grader.example.com/static/default/module1/other.html'),
+    (CHAPTER_URL, 'a', 'href', 'other.html#part', {}, 'http://grader.example.com/static/default/module1/other.html#part'),
+    (CHAPTER_URL, 'a', 'href', '?page=2', {}, 'http://grader.example.com/static/default/module1/?page=2'),
+    (CHAPTER_URL, 'a', 'href', 'javascript:void(0)', {}, 'javascript:void(0)'),
+    (CHAPTER_URL, 'a', 'href', '../module2/chapter1.html', {'data-aplus-chapter': ''}, '../../module2/chapter1/'),
+    (CHAPTER_URL, 'a', 'href', '../module2/chapter1.html#anchor', {'data-aplus-chapter': ''}, '../../module2/chapter1/#anchor'),
+    (CHAPTER_URL, 'a', 'href', '../../module2/chapter1_en.html', {'data-aplus-chapter': ''}, '../../module2/chapter1/'),
+    (CHAPTER_URL, 'a', 'href', '../../module2/chapter1_en.html#anchor-2', {'data-aplus-chapter': ''}, '../../module2/chapter1/#anchor-2'),
+    (CHAPTER_URL, 'a', 'href', '../module2/sub/chapter3_fi.html#x', {'data-aplus-chapter': ''}, '../../module2/sub_chapter3/#x'),
+    (CHAPTER_URL, 'a', 'href', '../module2/sub/deeper/chapter3.html', {'data-aplus-chapter': ''}, '../../module2/sub_deeper_chapter3/'),
+    (CHAPTER_URL, 'a', 'href', '../../module1/chapter/module1_chapter_exercise/info/model/', {'data-aplus-chapter': ''}, '../../module1/chapter/module1_chapter_exercise/info/model/'),
+    (CHAPTER_URL, 'a', 'href', '../../module1/chapter/module1_chapter_exercise/plain', {'data-aplus-chapter': ''}, '../../module1/chapter/module1_chapter_exercise/plain/'),
+    (CHAPTER_URL, 'a', 'href', '../../module1/chapter/module1_chapter_exercise/info/template/#t', {'data-aplus-chapter': ''}, '../../module1/chapter/module1_chapter_exercise/info/template/#t'),
+    (CHAPTER_URL, 'a', 'href', 'module1/chapter2_en/', {'data-aplus-chapter': ''}, '../../module1/chapter2_en_/'),
+    (CHAPTER_URL, 'a', 'href', 'chapter2_en#anchor', {'data-aplus-chapter': ''}, '../../chapter2/#anchor'),
+    (CHAPTER_URL, 'a', 'href', '/absolute/chapter.html', {'data-aplus-chapter': ''}, '../..//absolute_chapter/'),
+    (CHAPTER_URL, 'a', 'href', '/absolute/chapter', {'data-aplus-chapter': ''}, '/absolute/chapter'),
+    (CHAPTER_URL, 'a', 'href', 'CHAPTER.HTML', {'data-aplus-chapter': ''}, '../../CHAPTER/'),
+    (CHAPTER_URL, 'a', 'href', 'https://example.com/x.html', {'data-aplus-chapter': ''}, '../../https:/_example.com_x/'),
+    (CHAPTER_URL, 'a', 'href', '', {'data-aplus-chapter': ''}, ''),
+    (CHAPTER_URL, 'a', 'name', 'no-href', {}, 'no-href'),
+    (CHAPTER_URL, 'video', 'poster', 'poster.jpg', {}, 'http://grader.example.com/static/default/module1/poster.jpg'),
+    (CHAPTER_URL, 'video', 'src', 'movie.mp4', {}, 'movie.mp4'),
+    (CHAPTER_URL, 'source', 'src', '../media/movie.webm', {}, 'http://grader.example.com/static/default/media/movie.webm'),
+    (CHAPTER_URL, 'source', 'srcset', 'x.png', {}, 'x.png'),
+    (CHAPTER_URL, 'div', 'src', 'not/fixed.png', {}, 'not/fixed.png'),
+    (CHAPTER_URL, 'a', 'href', 'ä/ö.html', {}, 'http://grader.example.com/static/default/module1/ä/ö.html'),
+    (CHAPTER_URL, 'a', 'href', 'x y.png', {}, 'http://grader.example.com/static/default/module1/x y.png'),
+    (CHAPTER_URL, 'img', 'src', '../../../too/far.png', {}, 'http://grader.example.com/too/far.png'),
+    (EXERCISE_URL, 'img', 'src', '../_images/pic.png', {}, 'http://grader.example.com/_images/pic.png'),
+    (EXERCISE_URL, 'img', 'src', '_images/pic.png', {}, 'http://grader.example.com/coursekey/_images/pic.png'),
+    (EXERCISE_URL, 'img', 'src', '../../_images/pic.png', {'data-aplus-path': '/static/{course}'}, 'http://grader.example.com/static/coursekey/_images/pic.png'),
+    (EXERCISE_URL, 'img', 'src', '_images/pic.png', {'data-aplus-path': '/static/{course}'}, 'http://grader.example.com/static/coursekey_images/pic.png'),
+    (EXERCISE_URL, 'script', 'src', '../_static/script.js', {}, 'http://grader.example.com/_static/script.js'),
+    (EXERCISE_URL, 'iframe', 'src', 'embed/video.html', {}, 'http://grader.example.com/coursekey/embed/video.html'),
+    (EXERCISE_URL, 'link', 'href', '../_static/style.css', {}, 'http://grader.example.com/_static/style.css'),
+    (EXERCISE_URL, 'a', 'href', 'other.html', {}, 'http://grader.example.com/coursekey/other.html'),
+    (EXERCISE_URL, 'a', 'href', 'other.html#part', {}, 'http://grader.example.com/coursekey/other.html#part'),
+    (EXERCISE_URL, 'a', 'href', '?page=2', {}, 'http://grader.example.com/coursekey/?page=2'),
+    (EXERCISE_URL, 'video', 'poster', 'poster.jpg', {}, 'http://grader.example.com/coursekey/poster.jpg'),
+    (EXERCISE_URL, 'source', 'src', '../media/movie.webm', {}, 'http://grader.example.com/media/movie.webm'),
+    (EXERCISE_URL, 'a', 'href', 'ä/ö.html', {}, 'http://grader.example.com/coursekey/ä/ö.html'),
+    (EXERCISE_URL, 'a', 'href', 'x y.png', {}, 'http://grader.example.com/coursekey/x y.png'),
+]
+
+
+@override_settings(REMOTE_PAGE_HOSTS_MAP={'grader.local': 'grader.example.com'})
+class FixRelativeUrlsTest(SimpleTestCase):
+
+    def page(self, url, html):
+        page = RemotePage.__new__(RemotePage)
+        page.url = urlparse(url)
+        page.soup = BeautifulSoup(html, 'html5lib')
+        return page
+
+    def test_fixed_urls(self):
+        fix_url.cache_clear()
+        for url, tag, attr, value, attrs, expected in FIXED_URLS:
+            with self.subTest(url=url, tag=tag, value=value, attrs=attrs):
+                page = self.page(url, '')
+                page.soup.body.append(page.soup.new_tag(tag, attrs={attr: value, **attrs}))
+                page.fix_relative_urls()
+                self.assertEqual(page.soup.body.contents[0][attr], expected)
+
+    def test_page(self):
+        page = self.page(CHAPTER_URL, (
+            '<html><head><link rel="stylesheet" href="../_static/style.css"></head><body>'
+            '<p><a href="#top">top</a> <a data-aplus-chapter="" href="../module2/chapter1_en.html#s">next</a>'
+            '<img src="../_images/pic.png" data-aplus-path="/static/{course}"><img src="../_images/pic.png"></p>'
+            '<video poster="poster.jpg"><source src="movie.mp4"></video><div src="x.png">text</div>'
+            '</body></html>'
+        ))
+        page.fix_relative_urls()
+        self.assertEqual(str(page.soup), (
+            '<html><head><link href="http://grader.example.com/static/default/_static/style.css" rel="stylesheet"/></head><body>'
+            '<p><a href="#top">top</a> <a data-aplus-chapter="" href="../../module2/chapter1/#s">next</a>'
+            '<img data-aplus-path="/static/{course}" src="http://grader.example.com/static/static/_images/pic.png"/>'
+            '<img src="http://grader.example.com/static/default/_images/pic.png"/></p>'
+            '<video poster="http://grader.example.com/static/default/module1/poster.jpg">'
+            '<source src="http://grader.example.com/static/default/module1/movie.mp4"/></video><div src="x.png">text</div>'
+            '</body></html>'
+        ))
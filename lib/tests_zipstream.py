@@ -0,0 +1,65 @@
+import io
+import zipfile
+from datetime import datetime
+
+from django.test import SimpleTestCase
+
+from lib.zipstream import StreamedZip, ZipEntry
+
+
+class StreamedZipTest(SimpleTestCase):
+
+    def setUp(self):
+        self.files = {
+            'exercise_1/a.txt': b'',
+            'exercise_1/b.bin': bytes(range(256)) * 1000,
+            'exercise_2/ä.txt': 'Hyvää päivää'.encode('utf-8') * 5000,
+        }
+        self.opened = []
+
+    def archive(self):
+        def opener(name):
+            def open():
+                self.opened.append(name)
+                return io.BytesIO(self.files[name])
+            return open
+        return StreamedZip([
+            ZipEntry(name, len(data), datetime(2021, 9, 1, 12, 30, 20), opener(name))
+            for name, data in self.files.items()
+        ])
+
+    def test_archive(self):
+        archive = self.archive()
+        data = b''.join(archive.iter_range())
+        self.assertEqual(len(data), archive.size)
+        # The checksums are calculated while the files are streamed.
+        self.assertEqual(self.opened, list(self.files))
+
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(zf.namelist(), list(self.files))
+            for name, content in self.files.items():
+                self.assertEqual(zf.read(name), content)
+            self.assertEqual(zf.getinfo('exercise_1/a.txt').date_time, (2021, 9, 1, 12, 30, 20))
+
+        self.assertEqual(self.archive().etag, archive.etag)
+
+    def test_ranges(self):
+        data = b''.join(self.archive().iter_range())
+        size = len(data)
+        for start, end in ((0, 10), (50, 300000), (size - 100, size - 1), (1000, 1000)):
+            self.opened = []
+            self.assertEqual(b''.join(self.archive().iter_range(start, end)), data[start:end + 1])
+
+        # Only the files that overlap the range are read, unless the range
+        # includes the checksums in the central directory.
+        self.opened = []
+        b''.join(self.archive().iter_range(size - 20000, size - 2000))
+        self.assertEqual(self.opened, ['exercise_2/ä.txt'])
+        self.opened = []
+        b''.join(self.archive().iter_range(size - 10, size - 1))
+        self.assertEqual(self.opened, [])
+        self.opened = []
+        archive = self.archive()
+        b''.join(archive.iter_range(archive.central_offset, size - 1))
+        self.assertEqual(self.opened, list(self.files))
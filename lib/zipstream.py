@@ -0,0 +1,282 @@
+"""
+ZIP archives that are streamed without staging them on disk or in memory.
+
+The files are stored without compression, and their CRC-32 checksums are
+written in data descriptors after the file data. Thus, the layout of the
+archive, i.e. the offset of every byte, is known before any file is read,
+and any byte range of the archive can be produced by reading only the files
+that overlap it. The checksums are calculated while the files are streamed,
+or by reading the files, if a range starts in the middle of a file. The
+layout is deterministic: the same entries produce the same archive, so an
+interrupted download can be resumed with a range request.
+
+ZIP64 extensions are used when the archive has too many entries or the
+sizes or offsets do not fit in the original format.
+"""
+import hashlib
+import struct
+import zlib
+from datetime import datetime
+from typing import IO, Callable, Iterator, List, Optional
+
+CHUNK_SIZE = 64 * 1024
+
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP64_COUNT_LIMIT = 0xFFFF
+VERSION = 20
+ZIP64_VERSION = 45
+# Data descriptor and UTF-8 file names
+FLAGS = 0x08 | 0x800
+# Unix, regular file rw-r--r--
+CREATE_SYSTEM = 3
+EXTERNAL_ATTR = 0o100644 << 16
+
+LOCAL_HEADER = struct.Struct('<4sHHHHHLLLHH')
+DATA_DESCRIPTOR = struct.Struct('<4sLLL')
+DATA_DESCRIPTOR64 = struct.Struct('<4sLQQ')
+CENTRAL_HEADER = struct.Struct('<4sBBHHHHHLLLHHHHHLL')
+END_RECORD = struct.Struct('<4sHHHHLLH')
+END_RECORD64 = struct.Struct('<4sQHHLLQQQQ')
+END_LOCATOR64 = struct.Struct('<4sLQL')
+
+
+class ZipEntry:
+    """
+    A file in the archive. `open` returns the file opened for reading in
+    binary mode, and the file must contain exactly `size` bytes.
+    """
+    def __init__(self, name: str, size: int, date_time: datetime, open: Callable[[], IO[bytes]]) -> None:
+        self.name = name.encode('utf-8')
+        self.size = size
+        self.open = open
+        year = min(max(date_time.year, 1980), 2107)
+        self.dos_date = (year - 1980) << 9 | date_time.month << 5 | date_time.day
+        self.dos_time = date_time.hour << 11 | date_time.minute << 5 | date_time.second // 2
+        self.offset = 0
+        self.crc: Optional[int] = None
+
+    @property
+    def zip64_size(self) -> bool:
+        return self.size >= ZIP64_LIMIT
+
+    def local_header(self) -> bytes:
+        extra = b''
+        size = self.size
+        if self.zip64_size:
+            extra = struct.pack('<HHQQ', 1, 16, self.size, self.size)
+            size = ZIP64_LIMIT
+        return LOCAL_HEADER.pack(
+            b'PK\x03\x04',
+            ZIP64_VERSION if extra else VERSION,
+            FLAGS,
+            0,
+            self.dos_time,
+            self.dos_date,
+            0,
+            size,
+            size,
+            len(self.name),
+            len(extra),
+        ) + self.name + extra
+
+    def local_header_size(self) -> int:
+        return LOCAL_HEADER.size + len(self.name) + (20 if self.zip64_size else 0)
+
+    def data_descriptor(self) -> bytes:
+        if self.zip64_size:
+            return DATA_DESCRIPTOR64.pack(b'PK\x07\x08', self.crc, self.size, self.size)
+        return DATA_DESCRIPTOR.pack(b'PK\x07\x08', self.crc, self.size, self.size)
+
+    def data_descriptor_size(self) -> int:
+        return DATA_DESCRIPTOR64.size if self.zip64_size else DATA_DESCRIPTOR.size
+
+    def central_header(self) -> bytes:
+        fields = []
+        size = offset = None
+        if self.zip64_size:
+            fields += [self.size, self.size]
+            size = ZIP64_LIMIT
+        if self.offset >= ZIP64_LIMIT:
+            fields.append(self.offset)
+            offset = ZIP64_LIMIT
+        extra = struct.pack('<HH%dQ' % len(fields), 1, 8 * len(fields), *fields) if fields else b''
+        return CENTRAL_HEADER.pack(
+            b'PK\x01\x02',
+            ZIP64_VERSION if extra else VERSION,
+            CREATE_SYSTEM,
+            ZIP64_VERSION if extra else VERSION,
+            FLAGS,
+            0,
+            self.dos_time,
+            self.dos_date,
+            self.crc,
+            self.size if size is None else size,
+            self.size if size is None else size,
+            len(self.name),
+            len(extra),
+            0,
+            0,
+            0,
+            EXTERNAL_ATTR,
+            self.offset if offset is None else offset,
+        ) + self.name + extra
+
+    def central_header_size(self) -> int:
+        fields = (2 if self.zip64_size else 0) + (1 if self.offset >= ZIP64_LIMIT else 0)
+        return CENTRAL_HEADER.size + len(self.name) + (4 + 8 * fields if fields else 0)
+
+
+class StreamedZip:
+    """
+    A ZIP archive of the given entries. The size of the archive is `size`,
+    and its bytes are produced by `iter_range`.
+    """
+    def __init__(self, entries: List[ZipEntry]) -> None:
+        self.entries = entries
+        offset = 0
+        for entry in entries:
+            entry.offset = offset
+            offset += entry.local_header_size() + entry.size + entry.data_descriptor_size()
+        self.central_offset = offset
+        self.central_size = sum(entry.central_header_size() for entry in entries)
+        self.zip64 = (
+            len(entries) >= ZIP64_COUNT_LIMIT
+            or self.central_offset >= ZIP64_LIMIT
+            or self.central_size >= ZIP64_LIMIT
+        )
+        end_size = END_RECORD.size
+        if self.zip64:
+            end_size += END_RECORD64.size + END_LOCATOR64.size
+        self.size = self.central_offset + self.central_size + end_size
+
+    @property
+    def etag(self) -> str:
+        """
+        Identifies the layout of the archive.
+        """
+        digest = hashlib.sha1()
+        for entry in self.entries:
+            digest.update(struct.pack('<QHH', entry.size, entry.dos_date, entry.dos_time))
+            digest.update(entry.name + b'\0')
+        return '"%s"' % digest.hexdigest()
+
+    def _crc(self, entry: ZipEntry) -> int:
+        if entry.crc is None:
+            crc = 0
+            with entry.open() as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    crc = zlib.crc32(chunk, crc)
+            entry.crc = crc
+        return entry.crc
+
+    def _data_descriptor(self, entry: ZipEntry) -> bytes:
+        self._crc(entry)
+        return entry.data_descriptor()
+
+    def _end_records(self) -> bytes:
+        count = len(self.entries)
+        records = b''
+        if self.zip64:
+            records += END_RECORD64.pack(
+                b'PK\x06\x06',
+                END_RECORD64.size - 12,
+                ZIP64_VERSION,
+                ZIP64_VERSION,
+                0,
+                0,
+                count,
+                count,
+                self.central_size,
+                self.central_offset,
+            )
+            records += END_LOCATOR64.pack(b'PK\x06\x07', 0, self.central_offset + self.central_size, 1)
+        return records + END_RECORD.pack(
+            b'PK\x05\x06',
+            0,
+            0,
+            min(count, ZIP64_COUNT_LIMIT),
+            min(count, ZIP64_COUNT_LIMIT),
+            min(self.central_size, ZIP64_LIMIT),
+            min(self.central_offset, ZIP64_LIMIT),
+            0,
+        )
+
+    def _iter_data(self, entry: ZipEntry, start: int, end: int) -> Iterator[bytes]:
+        # Yields bytes start...end-1 of the file. The checksum is calculated
+        # on the way, if the whole file is read.
+        whole = start == 0 and end == entry.size and entry.crc is None
+        crc = 0
+        remaining = end - start
+        with entry.open() as f:
+            if start:
+                f.seek(start)
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise OSError("The file of the archive entry %s is shorter than expected" % entry.name.decode('utf-8'))
+                if whole:
+                    crc = zlib.crc32(chunk, crc)
+                remaining -= len(chunk)
+                yield chunk
+        if whole:
+            entry.crc = crc
+
+    def iter_range(self, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+        """
+        Yields the bytes from `start` to `end` of the archive, both included,
+        in chunks of about `CHUNK_SIZE` bytes.
+        """
+        if end is None:
+            end = self.size - 1
+        # The headers are short, so they are joined with the adjacent parts.
+        buffer = []
+        buffered = 0
+        for part in self._iter_parts(start, end + 1):
+            buffer.append(part)
+            buffered += len(part)
+            if buffered >= CHUNK_SIZE:
+                yield b''.join(buffer)
+                buffer = []
+                buffered = 0
+        if buffer:
+            yield b''.join(buffer)
+
+    def _iter_parts(self, start: int, stop: int) -> Iterator[bytes]:
+
+        def part(offset: int, size: int, produce: Callable[[int, int], Iterator[bytes]]) -> Iterator[bytes]:
+            # Yields the part of the region offset...offset+size-1 that
+            # overlaps the range.
+            first = max(start, offset)
+            last = min(stop, offset + size)
+            if first < last:
+                yield from produce(first - offset, last - offset)
+
+        def static(data: Callable[[], bytes]) -> Callable[[int, int], Iterator[bytes]]:
+            return lambda a, b: iter([data()[a:b]])
+
+        for entry in self.entries:
+            if entry.offset >= stop:
+                return
+            offset = entry.offset
+            header_size = entry.local_header_size()
+            descriptor_offset = offset + header_size + entry.size
+            if descriptor_offset + entry.data_descriptor_size() <= start:
+                continue
+            yield from part(offset, header_size, static(entry.local_header))
+            yield from part(offset + header_size, entry.size, lambda a, b: self._iter_data(entry, a, b))
+            yield from part(
+                descriptor_offset,
+                entry.data_descriptor_size(),
+                static(lambda: self._data_descriptor(entry)),
+            )
+
+        offset = self.central_offset
+        for entry in self.entries:
+            size = entry.central_header_size()
+            if offset >= stop:
+                return
+            if offset + size > start:
+                self._crc(entry)
+                yield from part(offset, size, static(entry.central_header))
+            offset += size
+        yield from part(offset, self.size - offset, static(self._end_records))
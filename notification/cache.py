@@ -1,51 +1,73 @@
-from django.db.models.signals import post_save, post_delete
+import datetime
+from typing import Any, Callable, Dict, Iterable, List
+
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.utils import timezone
 
 from lib.cache import CachedAbstract
-from .models import Notification
+from .models import Notification, notifications_created, notifications_seen
+
+
+def notification_entry(n: Notification) -> Dict[str, Any]:
+    exercise = n.submission.exercise if n.submission else None
+    return {
+        'id': n.id,
+        'course_instance_id': n.course_instance_id,
+        'submission_id': n.submission.id if n.submission else 0,
+        'name': "{} {}, {}".format(
+            n.course_instance.course.code,
+            (str(exercise.parent)
+                if exercise and exercise.parent else
+             n.course_instance.instance_name),
+            (str(exercise)
+                if exercise else
+             n.subject),
+        ),
+        'link': n.get_display_url(),
+    }
 
 
 class CachedNotifications(CachedAbstract):
+    """
+    The number of unseen notifications of a user and the `MAX_LISTED` most
+    recent of them.
+
+    The data is updated in place when notifications are created, seen or
+    deleted. The updates are not atomic, so an update may be lost when two
+    of them happen at the same time. Thus, the data is regenerated when it
+    is older than `MAX_AGE` or when an update finds it inconsistent.
+    """
     KEY_PREFIX = "notifications"
+    MAX_LISTED = 20
+    MAX_AGE = datetime.timedelta(hours=1)
 
     def __init__(self, user):
         super().__init__(user)
 
+    def _needs_generation(self, data):
+        return data is None or 'created' not in data or data['created'] + self.MAX_AGE < timezone.now()
+
     def _generate_data(self, user, data=None):
         if not user or not user.is_authenticated:
             return {
+                'created': timezone.now(),
                 'count': 0,
                 'notifications': [],
             }
 
-        def notification_entry(n):
-            exercise = n.submission.exercise if n.submission else None
-            return {
-                'id': n.id,
-                'submission_id': n.submission.id if n.submission else 0,
-                'name': "{} {}, {}".format(
-                    n.course_instance.course.code,
-                    (str(exercise.parent)
-                        if exercise and exercise.parent else
-                     n.course_instance.instance_name),
-                    (str(exercise)
-                        if exercise else
-                     n.subject),
-                ),
-                'link': n.get_display_url(),
-            }
-
+        unseen = user.userprofile.received_notifications.filter(seen=False)
         notifications = list(
-            user.userprofile.received_notifications\
-                .filter(seen=False)\
-                .select_related(
-                    'submission',
-                    'submission__exercise',
-                    'course_instance',
-                    'course_instance__course',
-                )
+            unseen.select_related(
+                'submission',
+                'submission__exercise',
+                'course_instance',
+                'course_instance__course',
+            )[:self.MAX_LISTED]
         )
         return {
-            'count': len(notifications),
+            'created': timezone.now(),
+            'count': len(notifications) if len(notifications) < self.MAX_LISTED else unseen.count(),
             'notifications': [notification_entry(n) for n in notifications],
         }
 
@@ -55,11 +77,117 @@ class CachedNotifications(CachedAbstract):
     def notifications(self):
         return self.data['notifications']
 
+    @classmethod
+    def is_cached(cls, user_id: int) -> bool:
+        raw = cache.get(cls._key(user_id, modifiers=[]))
+        return isinstance(raw, tuple) and len(raw) == 2 and raw[0] is not None
+
+    @classmethod
+    def update(cls, user_id: int, func: Callable[[Dict[str, Any]], bool]) -> None:
+        """
+        Applies `func` to the cached data and stores the result, if the data
+        is cached. If `func` returns False, the data is inconsistent, and it
+        is invalidated instead.
+
+        If the data is not cached or it is due to be generated again, it is
+        invalidated, so that a generation that is in progress and may have
+        missed the change does not store its data.
+        """
+        cache_key = cls._key(user_id, modifiers=[])
+        raw = cache.get(cache_key)
+        updated, data = raw if isinstance(raw, tuple) and len(raw) == 2 else (None, None)
+        if (
+            updated is None
+            or data is None
+            or 'created' not in data
+            or data['created'] + cls.MAX_AGE < timezone.now()
+        ):
+            cls.invalidate(user_id)
+            return
+        if func(data):
+            cache.set(cache_key, (updated, data), None)
+        else:
+            cls.invalidate(user_id)
+
+
+def _add(user_id: int, notifications: List[Notification]) -> None:
+    def add(data: Dict[str, Any]) -> bool:
+        if any(n.id is None for n in notifications):
+            # The ids are not known after a bulk create in some databases.
+            return False
+        entries = [notification_entry(n) for n in notifications]
+        data['count'] += len(entries)
+        data['notifications'] = (entries + data['notifications'])[:CachedNotifications.MAX_LISTED]
+        return True
+
+    CachedNotifications.update(user_id, add)
+
+
+def _remove(user_id: int, keep: Callable[[Dict[str, Any]], bool], count: int) -> None:
+    def remove(data: Dict[str, Any]) -> bool:
+        data['count'] -= count
+        data['notifications'] = [e for e in data['notifications'] if keep(e)]
+        # The most recent notifications that were not listed are not known.
+        return (
+            len(data['notifications']) <= data['count']
+            and (len(data['notifications']) > 0 or data['count'] == 0)
+        )
+
+    CachedNotifications.update(user_id, remove)
+
+
+def remember_seen(sender, instance: Notification, **kwargs: Any) -> None:
+    # Record whether the notification was seen before the save. The value is
+    # needed only if the notifications of the recipient are cached. Otherwise,
+    # the notifications are invalidated after the save.
+    if instance.pk is None or hasattr(instance, '_was_seen'):
+        return
+    if CachedNotifications.is_cached(instance.recipient.user_id):
+        instance._was_seen = (
+            Notification.objects
+            .filter(pk=instance.pk)
+            .values_list('seen', flat=True)
+            .first()
+        )
+
+def update_notification(sender, instance: Notification, created: bool, **kwargs: Any) -> None:
+    user_id = instance.recipient.user_id
+    if created:
+        if not instance.seen:
+            _add(user_id, [instance])
+        return
+    was_seen = instance.__dict__.pop('_was_seen', None)
+    if was_seen is None:
+        # The notifications were not cached before the save, but they may be
+        # generated at the moment without the change.
+        CachedNotifications.invalidate(user_id)
+        return
+    if instance.seen and not was_seen:
+        _remove(user_id, lambda e: e['id'] != instance.id, 1)
+    elif not instance.seen:
+        # Rare changes to unseen notifications, e.g. in the admin, are not
+        # applied in place.
+        CachedNotifications.invalidate(user_id)
+
+def remove_notification(sender, instance: Notification, **kwargs: Any) -> None:
+    if not instance.seen:
+        _remove(instance.recipient.user_id, lambda e: e['id'] != instance.id, 1)
+
+def add_created_notifications(sender, notifications: Iterable[Notification], **kwargs: Any) -> None:
+    by_user: Dict[int, List[Notification]] = {}
+    for n in notifications:
+        by_user.setdefault(n.recipient.user_id, []).append(n)
+    for user_id, user_notifications in by_user.items():
+        _add(user_id, user_notifications)
 
-def invalidate_notifications(sender, instance, **kwargs):
-    CachedNotifications.invalidate(instance.recipient.user)
+def remove_seen_notifications(sender, recipient, course_instance, count: int, **kwargs: Any) -> None:
+    if count:
+        _remove(recipient.user_id, lambda e: e['course_instance_id'] != course_instance.id, count)
 
 
-# Automatically invalidate cache when notifications change.
-post_save.connect(invalidate_notifications, sender=Notification)
-post_delete.connect(invalidate_notifications, sender=Notification)
+# Automatically update the cache when notifications change.
+pre_save.connect(remember_seen, sender=Notification)
+post_save.connect(update_notification, sender=Notification)
+post_delete.connect(remove_notification, sender=Notification)
+notifications_created.connect(add_created_notifications, sender=Notification)
+notifications_seen.connect(remove_seen_notifications, sender=Notification)
@@ -1,4 +1,5 @@
 from django.db import models
+from django.dispatch import Signal
 from django.utils.translation import gettext_lazy as _
 
 from course.models import CourseInstance
@@ -7,6 +8,15 @@ from lib.models import UrlMixin
 from userprofile.models import UserProfile
 
 
+# Sent with the argument `notifications` after notifications have been
+# created in bulk, since bulk_create does not send post_save.
+notifications_created = Signal()
+# Sent with the arguments `recipient`, `course_instance` and `count` after
+# the unseen notifications of a recipient in a course instance have been
+# marked seen in bulk.
+notifications_seen = Signal()
+
+
 class Notification(UrlMixin, models.Model):
     """
     A user notification of some event, for example manual assessment.
@@ -63,19 +73,51 @@ class Notification(UrlMixin, models.Model):
 
     @classmethod
     def send(cls, sender: UserProfile, submission: Submission) -> None:
-        for recipient in submission.submitters.all():
-            if not Notification.objects.filter(
+        """
+        Notifies the submitters of the submission, who do not have an unseen
+        notification of it yet.
+        """
+        recipients = list(submission.submitters.all())
+        notified = set(
+            Notification.objects.filter(
                 submission=submission,
-                recipient=recipient,
+                recipient__in=recipients,
                 seen=False,
-            ).exists():
-                notification = Notification(
-                    sender=sender,
-                    recipient=recipient,
-                    course_instance=submission.exercise.course_instance,
-                    submission=submission,
-                )
-                notification.save()
+            ).values_list('recipient_id', flat=True)
+        )
+        recipients = [r for r in recipients if r.pk not in notified]
+        if not recipients:
+            return
+        course_instance = submission.exercise.course_instance
+        notifications = Notification.objects.bulk_create([
+            Notification(
+                sender=sender,
+                recipient=recipient,
+                course_instance=course_instance,
+                submission=submission,
+            )
+            for recipient in recipients
+        ])
+        notifications_created.send(sender=cls, notifications=notifications)
+
+    @classmethod
+    def mark_all_seen(cls, recipient: UserProfile, course_instance: CourseInstance) -> int:
+        """
+        Marks the unseen notifications of the recipient in the course
+        instance seen with one query. Returns the number of notifications.
+        """
+        count = Notification.objects.filter(
+            recipient=recipient,
+            course_instance=course_instance,
+            seen=False,
+        ).update(seen=True)
+        notifications_seen.send(
+            sender=cls,
+            recipient=recipient,
+            course_instance=course_instance,
+            count=count,
+        )
+        return count
 
     @classmethod
     def remove(cls, submission):
@@ -1,10 +1,13 @@
 from datetime import timedelta
+from unittest.mock import patch
 
 from django.contrib.auth.models import User
 from django.test import TestCase
 from django.utils import timezone
 
 from course.models import Course, CourseInstance
+from exercise.cache.content import CachedContent
+from exercise.cache.points import CachedPoints
 from lib.testdata import CourseTestCase
 from .cache import CachedNotifications
 from .models import Notification
@@ -44,3 +47,112 @@ class NotificationTest(CourseTestCase):
         Notification.remove(self.submission3)
         cn = CachedNotifications(self.student)
         self.assertEqual(cn.count(), 0)
+
+    def test_send_batched(self):
+        content = CachedContent(self.instance)
+        created = CachedPoints(self.instance, self.user, content).created()
+        self.assertEqual(CachedNotifications(self.user).count(), 0)
+
+        Notification.send(self.teacher.userprofile, self.submission3)
+        Notification.send(None, self.submission3)
+        self.assertEqual(
+            sorted(Notification.objects.filter(submission=self.submission3).values_list('recipient_id', flat=True)),
+            sorted([self.student.userprofile.id, self.user.userprofile.id]),
+        )
+        # The caches are invalidated, although bulk_create does not send post_save.
+        self.assertEqual(CachedNotifications(self.user).count(), 1)
+        self.assertEqual(CachedNotifications(self.student).count(), 1)
+        self.assertNotEqual(CachedPoints(self.instance, self.user, content).created(), created)
+
+        # Only the submitters without an unseen notification are notified.
+        Notification.objects.filter(recipient=self.user.userprofile).update(seen=True)
+        Notification.send(None, self.submission3)
+        self.assertEqual(Notification.objects.filter(submission=self.submission3, seen=False).count(), 2)
+
+    def test_incremental_updates(self):
+        Notification.send(None, self.submission)
+        Notification.send(None, self.submission3)
+        cn = CachedNotifications(self.student)
+        self.assertEqual(cn.count(), 2)
+        created = cn.data['created']
+
+        # Seen notifications are removed from the cached data in place.
+        n = Notification.objects.get(submission=self.submission, recipient=self.student.userprofile)
+        n.seen = True
+        n.save()
+        cn = CachedNotifications(self.student)
+        self.assertEqual(cn.count(), 1)
+        self.assertEqual(cn.data['created'], created)
+        self.assertEqual([e['submission_id'] for e in cn.notifications()], [self.submission3.id])
+
+        # New notifications are added in place.
+        n = Notification.objects.create(
+            subject='Hello',
+            recipient=self.student.userprofile,
+            course_instance=self.instance,
+        )
+        cn = CachedNotifications(self.student)
+        self.assertEqual(cn.count(), 2)
+        self.assertEqual(cn.data['created'], created)
+        self.assertEqual(cn.notifications()[0]['id'], n.id)
+
+        self.assertEqual(Notification.mark_all_seen(self.student.userprofile, self.instance), 2)
+        cn = CachedNotifications(self.student)
+        self.assertEqual(cn.count(), 0)
+        self.assertEqual(cn.notifications(), [])
+        self.assertEqual(CachedNotifications(self.user).count(), 1)
+
+    def test_listed_notifications_bounded(self):
+        for _ in range(CachedNotifications.MAX_LISTED + 5):
+            Notification.objects.create(
+                subject='Hello',
+                recipient=self.student.userprofile,
+                course_instance=self.instance,
+            )
+        cn = CachedNotifications(self.student)
+        self.assertEqual(cn.count(), CachedNotifications.MAX_LISTED + 5)
+        self.assertEqual(len(cn.notifications()), CachedNotifications.MAX_LISTED)
+
+    def test_concurrent_generation(self):
+        Notification.send(None, self.submission)
+        generate = CachedNotifications._generate_data
+
+        def generate_and_change(change):
+            # The notifications change after they were queried, but before
+            # the generated data is stored.
+            def generate_data(self, user, data=None):
+                data = generate(self, user, data=data)
+                change()
+                return data
+            return patch.object(CachedNotifications, '_generate_data', generate_data)
+
+        # A notification is created.
+        def create():
+            Notification.objects.create(
+                subject='Hello',
+                recipient=self.student.userprofile,
+                course_instance=self.instance,
+            )
+        with generate_and_change(create):
+            self.assertEqual(CachedNotifications(self.student).count(), 1)
+        self.assertEqual(CachedNotifications(self.student).count(), 2)
+
+        # A notification is seen.
+        def see():
+            n = Notification.objects.get(submission=self.submission, recipient=self.student.userprofile)
+            n.seen = True
+            n.save()
+        CachedNotifications.invalidate(self.student)
+        with generate_and_change(see):
+            self.assertEqual(CachedNotifications(self.student).count(), 2)
+        self.assertEqual(CachedNotifications(self.student).count(), 1)
+
+        # A notification is deleted.
+        def delete():
+            Notification.objects.get(subject='Hello').delete()
+        CachedNotifications.invalidate(self.student)
+        with generate_and_change(delete):
+            self.assertEqual(CachedNotifications(self.student).count(), 1)
+        cn = CachedNotifications(self.student)
+        self.assertEqual(cn.count(), 0)
+        self.assertEqual(cn.notifications(), [])
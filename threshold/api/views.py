@@ -0,0 +1,36 @@
+from rest_framework import viewsets
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from course.api.mixins import CourseResourceMixin
+from course.permissions import OnlyCourseTeacherPermission
+from ..grading import grade_students
+
+
+class CourseGradesViewSet(CourseResourceMixin,
+                          viewsets.ViewSet):
+    """
+    The `grades` endpoint evaluates the thresholds and the diploma grade of
+    all students in the course. The points are aggregated from the ready
+    submissions of the students like in the staff view, i.e. hidden feedback
+    is included.
+
+    Operations
+    ----------
+
+    `GET /courses/<course_id>/grades/`:
+        returns a list of students with the following attributes:
+        - `user_id`: the user id of the student
+        - `student_id`: the student id of the student
+        - `thresholds`: a dict of the threshold ids and whether the student
+            has passed them
+        - `diploma_grade`: the diploma grade of the student, `-1` if the
+            diploma is not available to the student, or `null` if the course
+            has no diploma
+    """
+    permission_classes = api_settings.DEFAULT_PERMISSION_CLASSES + [
+        OnlyCourseTeacherPermission,
+    ]
+
+    def list(self, request, *args, **kwargs):
+        return Response(grade_students(self.instance))
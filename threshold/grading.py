@@ -0,0 +1,314 @@
+"""
+Batch evaluation of thresholds and diploma grades for all students of a course.
+
+The per-student path loads a `CachedPoints` for each student and evaluates
+`Threshold.is_passed` or `diploma.grade.calculate_grade` against it. Here the
+points of all students are aggregated into a `PointsMatrix` with a couple of
+queries, and the limits are evaluated one column (a difficulty or a learning
+object) at a time for all students. The results are the same as the staff
+version of `CachedPoints` would give, i.e. the reveal rules are not applied.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from course.models import CourseInstance
+from exercise.cache.content import CachedContent
+from exercise.models import Submission
+from userprofile.models import UserProfile
+
+
+Column = List[int]
+
+
+class PointsMatrix:
+    """
+    Points of students in a course instance: one row per student, and one
+    column for the total points, for each difficulty and for the passed
+    status of each module, category and exercise.
+    """
+    def __init__(self, profiles: Sequence[UserProfile]) -> None:
+        self.profiles = list(profiles)
+        self.size = len(self.profiles)
+        self.points: Column = self.zeros()
+        self.points_by_difficulty: Dict[str, Column] = {}
+        self.unconfirmed_points_by_difficulty: Dict[str, Column] = {}
+        self.passed_modules: Dict[int, List[bool]] = {}
+        self.passed_categories: Dict[int, List[bool]] = {}
+        self.passed_exercises: Dict[int, List[bool]] = {}
+
+    def zeros(self) -> Column:
+        return [0] * self.size
+
+    def add_points(self, target: Dict[str, Column], difficulty: str, points: Column) -> None:
+        column = target.setdefault(difficulty, self.zeros())
+        for row, value in enumerate(points):
+            column[row] += value
+
+    @classmethod
+    def from_submissions(
+            cls,
+            instance: CourseInstance,
+            profiles: Sequence[UserProfile],
+            content: Optional[CachedContent] = None,
+            ) -> 'PointsMatrix':
+        """
+        Aggregates the points of the students from their ready submissions
+        with one query and builds the matrix following the course content.
+        The rules match `CachedPoints`: the best or last submission counts
+        depending on the grading mode, forced points override them, and the
+        points behind an unpassed level confirmation are unconfirmed.
+        """
+        matrix = cls(profiles)
+        content = content or CachedContent(instance)
+        rows = {profile.id: row for row, profile in enumerate(matrix.profiles)}
+
+        # Exercise id -> {row: points}, only for the rows that have a ready
+        # submission in the exercise.
+        graded: Dict[int, Dict[int, int]] = {}
+        if rows:
+            aggregate = (
+                Submission.objects
+                .filter(
+                    exercise__course_module__course_instance=instance,
+                    submitters__in=list(rows),
+                    status=Submission.STATUS.READY,
+                )
+                .values('submitters', 'exercise_id')
+                .annotate_submitter_points('points')
+                .order_by()
+            )
+            for entry in aggregate:
+                graded.setdefault(entry['exercise_id'], {})[rows[entry['submitters']]] = entry['points']
+
+        def exercise_columns(entry: Dict[str, Any]):
+            points = matrix.zeros()
+            passed = [entry['points_to_pass'] == 0] * matrix.size
+            for row, value in graded.get(entry['id'], {}).items():
+                points[row] = value
+                passed[row] = value >= entry['points_to_pass']
+            return points, passed
+
+        categories = content.data['categories']
+        category_points = {category_id: matrix.zeros() for category_id in categories}
+
+        def collect(
+                module_points: Column,
+                module_passed: List[bool],
+                children: List[Dict[str, Any]],
+                ) -> None:
+            # The unconfirmed points of the children count, if the student
+            # has passed any level confirmation exercise among them.
+            confirmed = [False] * matrix.size
+            for entry in children:
+                if entry['submittable'] and entry['confirm_the_level']:
+                    points, passed = exercise_columns(entry)
+                    matrix.passed_exercises[entry['id']] = passed
+                    confirmed = [a or b for a, b in zip(confirmed, passed)]
+            for entry in children:
+                if entry['submittable'] and not entry['confirm_the_level']:
+                    points, passed = exercise_columns(entry)
+                    matrix.passed_exercises[entry['id']] = passed
+                    for row in range(matrix.size):
+                        module_passed[row] = module_passed[row] and passed[row]
+                    if entry.get('unconfirmed', False):
+                        official = [p if c else 0 for p, c in zip(points, confirmed)]
+                        unconfirmed = [0 if c else p for p, c in zip(points, confirmed)]
+                        matrix.add_points(matrix.unconfirmed_points_by_difficulty, entry['difficulty'], unconfirmed)
+                    else:
+                        official = points
+                    for row, value in enumerate(official):
+                        module_points[row] += value
+                        category_points[entry['category_id']][row] += value
+                        matrix.points[row] += value
+                    matrix.add_points(matrix.points_by_difficulty, entry['difficulty'], official)
+                collect(module_points, module_passed, entry.get('children', []))
+
+        for module in content.modules():
+            module_points = matrix.zeros()
+            module_passed = [True] * matrix.size
+            collect(module_points, module_passed, module['children'])
+            matrix.passed_modules[module['id']] = [
+                passed and points >= module['points_to_pass']
+                for passed, points in zip(module_passed, module_points)
+            ]
+        for category_id, points in category_points.items():
+            points_to_pass = categories[category_id]['points_to_pass']
+            matrix.passed_categories[category_id] = [p >= points_to_pass for p in points]
+
+        return matrix
+
+
+def _passing_rows(
+        matrix: PointsMatrix,
+        d_points: Dict[str, Column],
+        rows: List[int],
+        limits: Sequence[Sequence[Any]],
+        consume_harder_points: bool,
+        blank_is_total: bool,
+        ) -> List[int]:
+    """
+    Returns the rows that pass all [difficulty, limit] pairs. This is the
+    column-wise version of the difficulty padding in
+    `Threshold._are_points_passed` and `diploma.grade.calculate_grade`:
+    the rows below a limit consume the points of the harder difficulties in
+    order. `d_points` is modified like the per-student dict is.
+    """
+    ds = [d for d, _ in limits]
+    for i, (d, limit) in enumerate(limits):
+        if blank_is_total and not d:
+            rows = [row for row in rows if matrix.points[row] >= limit]
+            continue
+        column = d_points.setdefault(d, matrix.zeros())
+        if consume_harder_points:
+            # The points gathered so far by each row below the limit
+            short = {row: column[row] for row in rows if column[row] < limit}
+            for jd in ds[i + 1:]:
+                if not short:
+                    break
+                j_column = d_points.setdefault(jd, matrix.zeros())
+                still_short = {}
+                for row, p in short.items():
+                    jp = j_column[row]
+                    if jp > limit - p:
+                        j_column[row] -= limit - p
+                        column[row] = limit
+                    else:
+                        p += jp
+                        column[row] = p
+                        j_column[row] = 0
+                        still_short[row] = p
+                short = still_short
+        rows = [row for row in rows if column[row] >= limit]
+    return rows
+
+
+def _copy_columns(columns: Dict[str, Column]) -> Dict[str, Column]:
+    return {d: list(column) for d, column in columns.items()}
+
+
+def evaluate_threshold(
+        matrix: PointsMatrix,
+        compiled: Dict[str, Any],
+        unconfirmed: bool = False,
+        ) -> List[bool]:
+    """
+    Evaluates a threshold compiled with `Threshold.compile` for all rows of
+    the matrix. Same as `Threshold.is_passed` for each student.
+    """
+    rows = list(range(matrix.size))
+    for key, passed_columns in (
+            ('modules', matrix.passed_modules),
+            ('categories', matrix.passed_categories),
+            ('exercises', matrix.passed_exercises),
+            ):
+        for object_id in compiled[key]:
+            passed = passed_columns.get(object_id)
+            if passed is None:
+                return [False] * matrix.size
+            rows = [row for row in rows if passed[row]]
+
+    d_points = _copy_columns(matrix.points_by_difficulty)
+    if unconfirmed:
+        for d, column in matrix.unconfirmed_points_by_difficulty.items():
+            matrix.add_points(d_points, d, column)
+    if compiled['points']:
+        rows = _passing_rows(
+            matrix,
+            d_points,
+            rows,
+            compiled['points'],
+            compiled['consume_harder_points'],
+            True,
+        )
+    result = [False] * matrix.size
+    for row in rows:
+        result[row] = True
+    return result
+
+
+def evaluate_point_limits(
+        matrix: PointsMatrix,
+        point_limits: Iterable[Any],
+        pad_points: bool,
+        ) -> List[int]:
+    """
+    Calculates the grade from diploma `point_limits` for all rows of the
+    matrix. Same as `diploma.grade.calculate_grade` for each student.
+    """
+    grades = matrix.zeros()
+    d_points = _copy_columns(matrix.points_by_difficulty)
+    rows = list(range(matrix.size))
+    for bound in point_limits:
+        if isinstance(bound, list):
+            rows = _passing_rows(matrix, d_points, rows, bound, pad_points, False)
+        else:
+            rows = [row for row in rows if matrix.points[row] >= bound]
+        for row in rows:
+            grades[row] += 1
+    return grades
+
+
+def evaluate_diploma(matrix: PointsMatrix, diploma_design) -> List[int]:
+    """
+    Calculates the diploma grades for all rows of the matrix. Same as
+    `diploma.grade.assign_grade` for each student who is not course staff.
+    """
+    opt = diploma_design.USERGROUP
+    grades = evaluate_point_limits(matrix, diploma_design.point_limits, diploma_design.pad_points)
+    passed_columns = (
+        [matrix.passed_modules.get(m.id) for m in diploma_design.modules_to_pass.all()]
+        + [matrix.passed_exercises.get(e.id) for e in diploma_design.exercises_to_pass.all()]
+    )
+    for row, profile in enumerate(matrix.profiles):
+        external = profile.is_external
+        if (
+            (diploma_design.availability == opt.EXTERNAL_USERS and not external)
+            or (diploma_design.availability == opt.INTERNAL_USERS and external)
+        ):
+            grades[row] = -1
+        elif not all(passed is not None and passed[row] for passed in passed_columns):
+            grades[row] = 0
+    return grades
+
+
+def grade_students(
+        instance: CourseInstance,
+        profiles: Optional[Sequence[UserProfile]] = None,
+        ) -> List[Dict[str, Any]]:
+    """
+    Evaluates every threshold of the course instance and the diploma grade,
+    if the course has a diploma design, for the given students or all
+    students of the course. Returns one dict per student.
+    """
+    from diploma.models import CourseDiplomaDesign
+
+    if profiles is None:
+        profiles = instance.students.select_related('user')
+    matrix = PointsMatrix.from_submissions(instance, profiles)
+    thresholds = list(
+        instance.thresholds
+        .prefetch_related('passed_modules', 'passed_categories', 'passed_exercises', 'points')
+        .order_by('id')
+    )
+    threshold_results = [
+        (threshold.id, evaluate_threshold(matrix, threshold.compile()))
+        for threshold in thresholds
+    ]
+    design = (
+        CourseDiplomaDesign.objects
+        .filter(course=instance)
+        .prefetch_related('modules_to_pass', 'exercises_to_pass')
+        .first()
+    )
+    diploma_grades = evaluate_diploma(matrix, design) if design else None
+    return [
+        {
+            'user_id': profile.user.id,
+            'student_id': profile.student_id,
+            'thresholds': {
+                threshold_id: passed[row]
+                for threshold_id, passed in threshold_results
+            },
+            'diploma_grade': diploma_grades[row] if diploma_grades else None,
+        }
+        for row, profile in enumerate(matrix.profiles)
+    ]
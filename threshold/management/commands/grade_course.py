@@ -0,0 +1,40 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from course.models import CourseInstance
+from ...grading import grade_students
+
+
+class Command(BaseCommand):
+    help = (
+        "Evaluates the thresholds and the diploma grade of all students of "
+        "a course instance and prints them as CSV."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'instance_id',
+            type=int,
+            help="Id of the course instance",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            instance = CourseInstance.objects.get(id=options['instance_id'])
+        except CourseInstance.DoesNotExist:
+            raise CommandError("Course instance {} not found.".format(options['instance_id']))
+
+        thresholds = list(instance.thresholds.order_by('id'))
+        writer = csv.writer(self.stdout)
+        writer.writerow(
+            ['UserID', 'StudentID']
+            + [t.name for t in thresholds]
+            + ['DiplomaGrade']
+        )
+        for result in grade_students(instance):
+            writer.writerow(
+                [result['user_id'], result['student_id']]
+                + [int(result['thresholds'][t.id]) for t in thresholds]
+                + ['' if result['diploma_grade'] is None else result['diploma_grade']]
+            )
@@ -1,6 +1,7 @@
-from typing import Dict
+from typing import Any, Dict, List
 
 from django.db import models
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.utils.text import format_lazy
 from django.utils.translation import gettext_lazy as _
 
@@ -9,6 +10,7 @@ from course.models import (
     CourseModule,
     LearningObjectCategory,
 )
+from exercise.cache.content import CachedContent
 from exercise.cache.hierarchy import NoSuchContent
 from exercise.models import BaseExercise
 
@@ -54,17 +56,36 @@ class Threshold(models.Model):
         ]
         return " ".join(checks)
 
+    def compile(self) -> Dict[str, Any]:
+        """
+        Returns the checks of the threshold as plain data that can be stored
+        in the cache and evaluated with `is_compiled_passed` without queries.
+        The point limits are lists instead of tuples, because CachedPoints
+        uses tuples for separating the staff and student values.
+        """
+        return {
+            'modules': [m.id for m in self.passed_modules.all()],
+            'categories': [c.id for c in self.passed_categories.all()],
+            'exercises': [e.id for e in self.passed_exercises.all()],
+            'points': [[p.difficulty, p.limit] for p in self.points.all()],
+            'consume_harder_points': self.consume_harder_points,
+        }
+
     def is_passed(self, cached_points, unconfirmed=False):
+        return self.is_compiled_passed(self.compile(), cached_points, unconfirmed)
+
+    @classmethod
+    def is_compiled_passed(cls, compiled: Dict[str, Any], cached_points, unconfirmed=False) -> bool:
         try:
-            for module in self.passed_modules.all():
-                entry,_,_,_ = cached_points.find(module)
+            for module_id in compiled['modules']:
+                entry,_,_,_ = cached_points.find({'type': 'module', 'id': module_id})
                 if not entry["passed"]:
                     return False
-            for category in self.passed_categories.all():
-                if not cached_points.find_category(category.id)["passed"]:
+            for category_id in compiled['categories']:
+                if not cached_points.find_category(category_id)["passed"]:
                     return False
-            for exercise in self.passed_exercises.all():
-                entry,_,_,_ = cached_points.find(exercise)
+            for exercise_id in compiled['exercises']:
+                entry,_,_,_ = cached_points.find({'type': 'exercise', 'id': exercise_id})
                 if not entry["passed"]:
                     return False
         except NoSuchContent:
@@ -79,17 +100,22 @@ class Threshold(models.Model):
                     d_points[key] += value
                 else:
                     d_points[key] = value
-        return self._are_points_passed(total["points"], d_points)
-
-    def _are_points_passed(self, points: int, points_by_difficulty: Dict[str, int]) -> bool:
-        if not self.points.exists():
+        return cls._are_points_passed(compiled, total["points"], d_points)
+
+    @staticmethod
+    def _are_points_passed(
+            compiled: Dict[str, Any],
+            points: int,
+            points_by_difficulty: Dict[str, int],
+            ) -> bool:
+        if not compiled['points']:
             return True
         d_points = points_by_difficulty.copy()
-        ds,ls = zip(*list((p.difficulty,p.limit) for p in self.points.all()))
+        ds,ls = zip(*compiled['points'])
         for i,d in enumerate(ds):
             if d:
 
-                if self.consume_harder_points:
+                if compiled['consume_harder_points']:
                     p = d_points.get(d, 0)
                     l = ls[i]
                     if p < l:
@@ -143,10 +169,10 @@ class ThresholdPoints(models.Model):
     def __str__(self):
         if self.difficulty:
             return "{} {:d}".format(self.difficulty, self.limit)
-        return format_lazy(
+        return str(format_lazy(
             _('POINTS -- {:d}'),
             self.limit
-        )
+        ))
 
 
 class CourseModuleRequirement(models.Model):
@@ -173,10 +199,51 @@ class CourseModuleRequirement(models.Model):
             return "< " + self.threshold.checks_str()
         return self.threshold.checks_str()
 
+    def compile(self) -> Dict[str, Any]:
+        return {
+            'threshold': self.threshold.compile(),
+            'negative': self.negative,
+        }
+
     def is_passed(self, cached_points):
-        passed = self.threshold.is_passed(cached_points, True)
-        return not passed if self.negative else passed
+        return self.is_compiled_passed(self.compile(), cached_points)
+
+    @staticmethod
+    def is_compiled_passed(compiled: Dict[str, Any], cached_points) -> bool:
+        passed = Threshold.is_compiled_passed(compiled['threshold'], cached_points, True)
+        return not passed if compiled['negative'] else passed
+
+
+def are_requirements_passed(compiled_requirements: List[Dict[str, Any]], cached_points) -> bool:
+    """
+    Evaluates the module requirements compiled into CachedContent against
+    the CachedPoints of a user without any database queries.
+    """
+    return all(
+        CourseModuleRequirement.is_compiled_passed(r, cached_points)
+        for r in compiled_requirements
+    )
 
 
 # TODO: should implement course grades using thresholds
 # TODO: should refactor diploma to use course grades
+
+
+def invalidate_content(sender, instance, **kwargs):
+    # The module requirements are compiled into the cached course content.
+    if isinstance(instance, ThresholdPoints):
+        instance = instance.threshold
+    elif isinstance(instance, CourseModuleRequirement):
+        instance = instance.module
+    CachedContent.invalidate(instance.course_instance)
+
+
+post_save.connect(invalidate_content, sender=Threshold)
+post_delete.connect(invalidate_content, sender=Threshold)
+post_save.connect(invalidate_content, sender=ThresholdPoints)
+post_delete.connect(invalidate_content, sender=ThresholdPoints)
+post_save.connect(invalidate_content, sender=CourseModuleRequirement)
+post_delete.connect(invalidate_content, sender=CourseModuleRequirement)
+m2m_changed.connect(invalidate_content, sender=Threshold.passed_modules.through)
+m2m_changed.connect(invalidate_content, sender=Threshold.passed_categories.through)
+m2m_changed.connect(invalidate_content, sender=Threshold.passed_exercises.through)
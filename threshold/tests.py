@@ -1,8 +1,10 @@
 from lib.testdata import CourseTestCase
 
+from diploma.grade import calculate_grade
 from exercise.cache.content import CachedContent
 from exercise.cache.points import CachedPoints
-from .models import Threshold
+from .grading import PointsMatrix, evaluate_point_limits, evaluate_threshold, grade_students
+from .models import CourseModuleRequirement, Threshold, are_requirements_passed
 
 
 class ThresholdTest(CourseTestCase):
@@ -147,3 +149,129 @@ class ThresholdTest(CourseTestCase):
         self.submission3.save()
         points = CachedPoints(self.instance, self.student, content)
         self.assertTrue(t.is_passed(points))
+
+    def test_compiled_module_requirements(self):
+        t = Threshold.objects.create(course_instance=self.instance, name="test")
+        t.passed_modules.add(self.module)
+        t.points.create(limit=1)
+        CourseModuleRequirement.objects.create(module=self.module2, threshold=t)
+        CourseModuleRequirement.objects.create(module=self.module0, threshold=t, negative=True)
+
+        # The requirements were compiled into the regenerated content.
+        content = CachedContent(self.instance)
+        entry, _, _, _ = content.find(self.module2)
+        self.assertEqual(entry['requirement_checks'], [{
+            'threshold': {
+                'modules': [self.module.id],
+                'categories': [],
+                'exercises': [],
+                'points': [['', 1]],
+                'consume_harder_points': False,
+            },
+            'negative': False,
+        }])
+        negative_entry, _, _, _ = content.find(self.module0)
+
+        points = CachedPoints(self.instance, self.student, content)
+        with self.assertNumQueries(0):
+            self.assertFalse(are_requirements_passed(entry['requirement_checks'], points))
+            self.assertTrue(are_requirements_passed(negative_entry['requirement_checks'], points))
+        self.assertEqual(
+            are_requirements_passed(entry['requirement_checks'], points),
+            self.module2.are_requirements_passed(points),
+        )
+
+        self.submission3.set_points(2,2)
+        self.submission3.set_ready()
+        self.submission3.save()
+        points = CachedPoints(self.instance, self.student, content)
+        with self.assertNumQueries(0):
+            self.assertTrue(are_requirements_passed(entry['requirement_checks'], points))
+            self.assertFalse(are_requirements_passed(negative_entry['requirement_checks'], points))
+        self.assertEqual(
+            are_requirements_passed(entry['requirement_checks'], points),
+            self.module2.are_requirements_passed(points),
+        )
+
+    def _points_matrix(self, grades):
+        matrix = PointsMatrix([None] * len(grades))
+        for row, grade in enumerate(grades):
+            total = grade.total()
+            matrix.points[row] = total['points']
+            for d, p in total['points_by_difficulty'].items():
+                matrix.points_by_difficulty.setdefault(d, matrix.zeros())[row] = p
+            for d, p in total.get('unconfirmed_points_by_difficulty', {}).items():
+                matrix.unconfirmed_points_by_difficulty.setdefault(d, matrix.zeros())[row] = p
+        return matrix
+
+    def test_batch_evaluation(self):
+        grades = [self.GRADE_0, self.GRADE_1, self.GRADE_2, self.GRADE_3, self.GRADE_4, self.GRADE_5]
+        matrix = self._points_matrix(grades)
+        self._create_difficulty_thresholds()
+        self.grades[2].points.create(limit=30, order=4)
+        for consume in (False, True):
+            for t in self.grades:
+                t.consume_harder_points = consume
+                t.save()
+                self.assertEqual(
+                    evaluate_threshold(matrix, t.compile()),
+                    [t.is_passed(g) for g in grades],
+                )
+                self.assertEqual(
+                    evaluate_threshold(self._points_matrix([self.GRADE_0]), t.compile(), True),
+                    [t.is_passed(self.GRADE_0, True)],
+                )
+
+        normal_bounds = [10, 20, 30, 40, 50]
+        difficulty_bounds = [
+            [['A',1800],['B',0],['C',0]],
+            [['A',1900],['B',400],['C',0]],
+            [['A',1900],['B',875],['C',0]],
+            [['A',1900],['B',875],['C',350]],
+            [['A',1900],['B',875],['C',600]],
+        ]
+        for bounds in (normal_bounds, difficulty_bounds):
+            for pad_points in (False, True):
+                self.assertEqual(
+                    evaluate_point_limits(matrix, bounds, pad_points),
+                    [calculate_grade(g.total(), bounds, pad_points) for g in grades],
+                )
+
+    def test_batch_points_matrix(self):
+        content = CachedContent(self.instance)
+        profiles = [self.student.userprofile, self.user.userprofile]
+        t = Threshold.objects.create(course_instance=self.instance, name="test")
+        t.passed_categories.add(self.category)
+        t.passed_modules.add(self.module)
+        t.points.create(limit=2)
+
+        def assert_same_as_cached_points():
+            matrix = PointsMatrix.from_submissions(self.instance, profiles, content)
+            for row, profile in enumerate(profiles):
+                points = CachedPoints(self.instance, profile.user, content, True)
+                total = points.total()
+                self.assertEqual(matrix.points[row], total['points'])
+                for d, column in matrix.points_by_difficulty.items():
+                    self.assertEqual(column[row], total['points_by_difficulty'].get(d, 0))
+                for module_id, passed in matrix.passed_modules.items():
+                    entry, _, _, _ = points.find({'type': 'module', 'id': module_id})
+                    self.assertEqual(passed[row], entry['passed'])
+                for exercise_id, passed in matrix.passed_exercises.items():
+                    entry, _, _, _ = points.find({'type': 'exercise', 'id': exercise_id})
+                    self.assertEqual(passed[row], entry['passed'])
+                for category_id, passed in matrix.passed_categories.items():
+                    self.assertEqual(passed[row], points.find_category(category_id)['passed'])
+                self.assertEqual(evaluate_threshold(matrix, t.compile())[row], t.is_passed(points))
+
+        assert_same_as_cached_points()
+        self.submission3.set_points(2,2)
+        self.submission3.set_ready()
+        self.submission3.save()
+        assert_same_as_cached_points()
+
+        results = grade_students(self.instance)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['user_id'], self.student.id)
+        self.assertTrue(results[0]['thresholds'][t.id])
+        self.assertEqual(len(results[0]['thresholds']), 1 + len(self.grades))
+        self.assertIsNone(results[0]['diploma_grade'])